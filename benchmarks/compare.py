@@ -0,0 +1,46 @@
+"""
+Compare two benchmark result files written by `benchmarks.run`:
+
+    python -m benchmarks.compare baseline.json results.json
+
+Prints the ratio of median timings (new / old) for every benchmark and phase found in both files.
+"""
+import argparse
+import json
+import typing as ty
+from pathlib import Path
+
+
+def compare(old: ty.Dict[str, ty.Any], new: ty.Dict[str, ty.Any]) -> ty.List[ty.Tuple[str, str, float, float]]:
+    """(benchmark, phase, old median, new median) for every benchmark and phase in both results."""
+    old_benchmarks = {b["name"]: b for b in old["benchmarks"]}
+    rows = []
+    for benchmark in new["benchmarks"]:
+        baseline = old_benchmarks.get(benchmark["name"])
+        if baseline is None:
+            continue
+        if baseline["spec"] != benchmark["spec"] or baseline["reasoner"] != benchmark["reasoner"]:
+            print(f"Warning: {benchmark['name']} was run with different settings")
+        for phase, median in benchmark["median"].items():
+            if phase in baseline["median"]:
+                rows.append((benchmark["name"], phase, baseline["median"][phase], median))
+    return rows
+
+
+def main(argv: ty.Optional[ty.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    args = parser.parse_args(argv)
+
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+    print(f"{old.get('commit') or '?'} -> {new.get('commit') or '?'}")
+    print(f"{'benchmark':<16} {'phase':<26} {'old (s)':>10} {'new (s)':>10} {'new/old':>8}")
+    for name, phase, old_median, new_median in compare(old, new):
+        ratio = new_median / old_median if old_median else float("inf")
+        print(f"{name:<16} {phase:<26} {old_median:>10.4f} {new_median:>10.4f} {ratio:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Differential correctness harness. Generates random ontologies from the constructs pydmsd emits (min, max and
+exactly cardinalities, `only`, superclasses and AllDisjoint), asks every decision path for the compatibility
+of a few pairs of classes, and compares each answer with the reference path (HermiT-backed
+`check_compatibility`). Disagreements are shrunk to a minimal set of axioms and reported as a
+stand-alone Python reproducer, together with the time each path took relative to the reference:
+
+    python -m benchmarks.differential --trials 50 --output differential.json
+
+A path may decline to answer (the structural tier) or reject a model outside its fragment (the in-process
+reasoner); neither counts as a disagreement.
+"""
+import argparse
+import contextlib
+import json
+import random
+import sys
+import time
+import typing as ty
+from pathlib import Path
+
+import attrs
+
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.backends import PythonBackend
+from pydmsd.ontology.daemon import shared_daemon
+from pydmsd.ontology.session import CompatibilitySession
+from pydmsd.ontology.types import Ontology, OntologyClass
+
+from .run import environment
+
+# ("superclass", sub, sup)
+# ("min" | "max" | "exactly", cls, prop, cardinality, filler or None)
+# ("only", cls, prop, filler)
+# ("disjoint", (cls, cls, ...))
+Axiom = ty.Tuple[ty.Any, ...]
+Pair = ty.Tuple[OntologyClass, OntologyClass]
+DecisionPath = ty.Callable[[Ontology, ty.List[Pair]], ty.List[ty.Optional[bool]]]
+
+CARDINALITY_KINDS = ("min", "max", "exactly")
+
+
+@attrs.define
+class Case:
+    """A random model: message classes, filler classes, properties, axioms and the pairs to compare."""
+    messages: ty.List[str]
+    fillers: ty.List[str]
+    properties: ty.List[str]
+    axioms: ty.List[Axiom]
+    pairs: ty.List[ty.Tuple[str, str]]
+
+    def build(self) -> ty.Tuple[Ontology, ty.Dict[str, OntologyClass]]:
+        """Build the model in a fresh ontology."""
+        ontology = Ontology("http://example.org/differential.owl")
+        classes = {name: ontology.define_class(name) for name in self.messages + self.fillers}
+        props = {name: ontology.define_object_property(name) for name in self.properties}
+        for axiom in self.axioms:
+            kind = axiom[0]
+            if kind == "superclass":
+                classes[axiom[1]].add_superclass(classes[axiom[2]])
+            elif kind in CARDINALITY_KINDS:
+                _, cls, prop, cardinality, filler = axiom
+                add = getattr(classes[cls], f"add_{kind}_cardinality")
+                add(props[prop], cardinality, classes[filler].owl_cls if filler else None)
+            elif kind == "only":
+                classes[axiom[1]].add_only(props[axiom[2]], classes[axiom[3]].owl_cls)
+            elif kind == "disjoint":
+                ontology.declare_all_disjoint([classes[name] for name in axiom[1]])
+        return ontology, classes
+
+    def source(self) -> str:
+        """A stand-alone script that builds the model with the pydmsd API."""
+        lines = [
+            "from pydmsd.ontology import reasoner",
+            "from pydmsd.ontology.types import Ontology",
+            "",
+            'ontology = Ontology("http://example.org/reproducer.owl")',
+        ]
+        lines += [f'{name} = ontology.define_class("{name}")' for name in self.messages + self.fillers]
+        lines += [f'{name} = ontology.define_object_property("{name}")' for name in self.properties]
+        for axiom in self.axioms:
+            kind = axiom[0]
+            if kind == "superclass":
+                lines.append(f"{axiom[1]}.add_superclass({axiom[2]})")
+            elif kind in CARDINALITY_KINDS:
+                _, cls, prop, cardinality, filler = axiom
+                filler = f", {filler}.owl_cls" if filler else ""
+                lines.append(f"{cls}.add_{kind}_cardinality({prop}, {cardinality}{filler})")
+            elif kind == "only":
+                lines.append(f"{axiom[1]}.add_only({axiom[2]}, {axiom[3]}.owl_cls)")
+            elif kind == "disjoint":
+                lines.append(f"ontology.declare_all_disjoint([{', '.join(axiom[1])}])")
+        lines += [f"print(reasoner.check_compatibility({a}, {b}))" for a, b in self.pairs]
+        return "\n".join(lines)
+
+    def without_unused_entities(self) -> "Case":
+        """The same case, dropping classes and properties no axiom or pair mentions."""
+        used = {name for axiom in self.axioms for term in axiom[1:] for name in
+                (term if isinstance(term, tuple) else (term,))}
+        used.update(name for pair in self.pairs for name in pair)
+        return attrs.evolve(
+            self,
+            messages=[name for name in self.messages if name in used],
+            fillers=[name for name in self.fillers if name in used],
+            properties=[name for name in self.properties if name in used],
+        )
+
+
+def random_case(
+        rng: random.Random,
+        messages: int = 5,
+        fillers: int = 3,
+        properties: int = 3,
+        axioms: int = 12,
+        pairs: int = 3,
+) -> Case:
+    message_names = [f"M{i}" for i in range(messages)]
+    filler_names = [f"V{i}" for i in range(fillers)]
+    property_names = [f"p{i}" for i in range(properties)]
+    generated: ty.List[Axiom] = []
+    for _ in range(axioms):
+        kind = rng.choices(["superclass", "min", "max", "exactly", "only", "disjoint"], [2, 2, 2, 2, 1, 1])[0]
+        if kind == "superclass":
+            # superclasses always have lower indices, so the hierarchy is acyclic
+            names = rng.choice([message_names, filler_names])
+            if len(names) < 2:
+                continue
+            sub, sup = sorted(rng.sample(range(len(names)), 2), reverse=True)
+            axiom = ("superclass", names[sub], names[sup])
+        elif kind in CARDINALITY_KINDS:
+            filler = rng.choice(filler_names) if filler_names and rng.random() < 0.5 else None
+            axiom = (kind, rng.choice(message_names), rng.choice(property_names), rng.randint(0, 3), filler)
+        elif kind == "only":
+            if not filler_names:
+                continue
+            axiom = ("only", rng.choice(message_names), rng.choice(property_names), rng.choice(filler_names))
+        else:
+            names = rng.choice([message_names, filler_names])
+            if len(names) < 2:
+                continue
+            axiom = ("disjoint", tuple(rng.sample(names, rng.randint(2, min(3, len(names))))))
+        if axiom not in generated:
+            generated.append(axiom)
+    chosen = [tuple(rng.sample(message_names, 2)) for _ in range(pairs)]
+    return Case(message_names, filler_names, property_names, generated, chosen)
+
+
+# Decision paths
+
+
+def _hermit(ontology, pairs):
+    return [reasoner.check_compatibility(a, b, reasoner="hermit") for a, b in pairs]
+
+
+def _structural(ontology, pairs):
+    results = [reasoner._structural_verdict(a, b) for a, b in pairs]
+    return [None if result is None else result.is_compatible for result in results]
+
+
+def _tiered(ontology, pairs):
+    return [reasoner.decide_compatibility(a, b, reasoner="hermit").is_compatible for a, b in pairs]
+
+
+def _matrix(ontology, pairs):
+    classes = list({cls.name: cls for pair in pairs for cls in pair}.values())
+    matrix = reasoner.check_compatibility_matrix(classes, structural=True, reasoner="hermit")
+    return [matrix[a.name, b.name] for a, b in pairs]
+
+
+def _module(ontology, pairs):
+    return [reasoner.check_compatibility(a, b, module=True, reasoner="hermit") for a, b in pairs]
+
+
+def _session(ontology, pairs):
+    with CompatibilitySession(ontology, reasoner="hermit") as session:
+        session.register(pairs)
+        return [session.check_compatibility(a, b) for a, b in pairs]
+
+
+def _find_compatible(ontology, pairs):
+    return [b in reasoner.find_compatible(a, [b], reasoner="hermit") for a, b in pairs]
+
+
+def _python(ontology, pairs):
+    backend = PythonBackend(fallback=None)
+    return [reasoner.check_compatibility(a, b, reasoner=backend) for a, b in pairs]
+
+
+def _daemon(ontology, pairs):
+    daemon = shared_daemon()
+    return [reasoner.check_compatibility(a, b, reasoner=daemon) for a, b in pairs]
+
+
+PATHS: ty.Dict[str, DecisionPath] = {
+    "hermit": _hermit,
+    "structural": _structural,
+    "tiered": _tiered,
+    "matrix": _matrix,
+    "module": _module,
+    "session": _session,
+    "find_compatible": _find_compatible,
+    "python": _python,
+    "daemon": _daemon,
+}
+REFERENCE_PATH = "hermit"
+
+
+def available_paths() -> ty.List[str]:
+    """Every path that can run here (the daemon needs JPype and Java)."""
+    return [name for name in PATHS if name != "daemon" or shared_daemon() is not None]
+
+
+def decide(case: Case, path: str) -> ty.Tuple[ty.List[ty.Optional[bool]], float]:
+    """Answers of `path` for every pair of `case` (None where it declined), and the seconds it took."""
+    ontology, classes = case.build()
+    pairs = [(classes[a], classes[b]) for a, b in case.pairs]
+    try:
+        start = time.perf_counter()
+        verdicts = PATHS[path](ontology, pairs)
+        return verdicts, time.perf_counter() - start
+    finally:
+        ontology.close()
+
+
+def _disagrees(case: Case, path: str, reference: str) -> bool:
+    try:
+        actual, _ = decide(case, path)
+    except NotImplementedError:
+        return False
+    expected, _ = decide(case, reference)
+    return actual[0] is not None and actual[0] != expected[0]
+
+
+def minimize(case: Case, pair: ty.Tuple[str, str], path: str, reference: str = REFERENCE_PATH) -> Case:
+    """Shrink `case` to one `pair` and a set of axioms from which no single axiom can be removed."""
+    case = attrs.evolve(case, pairs=[pair])
+    shrunk = True
+    while shrunk:
+        shrunk = False
+        for k in range(len(case.axioms)):
+            candidate = attrs.evolve(case, axioms=case.axioms[:k] + case.axioms[k + 1:])
+            if _disagrees(candidate, path, reference):
+                case, shrunk = candidate, True
+                break
+    return case.without_unused_entities()
+
+
+@attrs.define
+class PathReport:
+    agree: int = 0
+    disagree: int = 0
+    undecided: int = 0  # the path declined to answer
+    unsupported: int = 0  # pairs of models outside the path's fragment
+    seconds: float = 0.0
+    reference_seconds: float = 0.0  # reference time on the models the path answered
+
+    @property
+    def speedup(self) -> ty.Optional[float]:
+        return self.reference_seconds / self.seconds if self.seconds else None
+
+
+def run_differential(
+        trials: int,
+        seed: int = 0,
+        paths: ty.Optional[ty.Sequence[str]] = None,
+        reference: str = REFERENCE_PATH,
+        **case_options,
+) -> ty.Dict[str, ty.Any]:
+    """Compare `paths` (default: every available one) with `reference` on `trials` random cases."""
+    paths = [path for path in (paths or available_paths()) if path != reference]
+    reports = {path: PathReport() for path in paths}
+    disagreements = []
+    for trial in range(trials):
+        case = random_case(random.Random(f"{seed}-{trial}"), **case_options)
+        expected, reference_seconds = decide(case, reference)
+        for path in paths:
+            report = reports[path]
+            try:
+                actual, seconds = decide(case, path)
+            except NotImplementedError:
+                report.unsupported += len(case.pairs)
+                continue
+            report.seconds += seconds
+            report.reference_seconds += reference_seconds
+            for pair, want, got in zip(case.pairs, expected, actual):
+                if got is None:
+                    report.undecided += 1
+                elif got == want:
+                    report.agree += 1
+                else:
+                    report.disagree += 1
+                    reproducer = minimize(case, pair, path, reference)
+                    disagreements.append({
+                        "path": path,
+                        "trial": trial,
+                        "pair": list(pair),
+                        "expected": want,
+                        "actual": got,
+                        "axioms": len(reproducer.axioms),
+                        "reproducer": reproducer.source(),
+                    })
+    return {
+        "trials": trials,
+        "seed": seed,
+        "reference": reference,
+        "paths": {path: {**attrs.asdict(report), "speedup": report.speedup} for path, report in reports.items()},
+        "disagreements": disagreements,
+    }
+
+
+def main(argv: ty.Optional[ty.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare pydmsd's decision paths with HermiT on random models")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--path", choices=sorted(PATHS), action="append", help="paths to check (default: all)")
+    parser.add_argument("--messages", type=int, default=5, help="message classes per model")
+    parser.add_argument("--axioms", type=int, default=12, help="axioms per model")
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # keep progress messages out of JSON written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_differential(
+            args.trials, args.seed, args.path, messages=args.messages, axioms=args.axioms
+        )
+    for path, report in results["paths"].items():
+        speedup = f"{report['speedup']:.1f}x" if report["speedup"] else "-"
+        print(f"{path:<16} agree {report['agree']:>4}  disagree {report['disagree']:>3}  "
+              f"undecided {report['undecided']:>4}  unsupported {report['unsupported']:>4}  speedup {speedup}",
+              file=sys.stderr)
+
+    text = json.dumps({**environment(), **results}, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+    if results["disagreements"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Seeded generator of synthetic FACE and FHIR models, shaped like the large scenarios in
+`docs/large_face_model_are_they_compatible.md`.
+
+Each of `spec.entities` root entities (FHIR: base resources) gets `spec.characteristics` characteristics
+(FHIR: elements) with random bounds, and two specialization chains (FHIR: profiles) of `spec.depth` levels,
+each level adding an optional characteristic of its own. The leaves of the two chains form one pair to
+compare. In `round(spec.conflict_rate * spec.entities)` of the pairs, one leaf caps an inherited
+characteristic at 1 and the other requires at least 2, so exactly those pairs are incompatible.
+"""
+import random
+import typing as ty
+
+import attrs
+
+from pydmsd.face.types import FaceDataModel
+from pydmsd.fhir.fhir_types import FhirDataModel
+
+# (lower_bound, upper_bound) of generated characteristics, as FACE/FHIR multiplicities 0..*, 1..1, 0..1, 1..*
+BOUNDS = [(0, None), (1, 1), (0, 1), (1, None)]
+
+
+@attrs.define(frozen=True)
+class ModelSpec:
+    entities: int = 10
+    characteristics: int = 5  # per entity
+    depth: int = attrs.field(default=2, validator=attrs.validators.ge(1))  # specialization levels per chain
+    conflict_rate: float = 0.3  # fraction of pairs given a cardinality conflict
+    value_types: int = 5  # size of the observable (FHIR: datatype) pool
+    seed: int = 0
+
+
+@attrs.define
+class SyntheticModel:
+    """A generated model with the pairs to compare and the indices of the pairs that must be incompatible."""
+    spec: ModelSpec
+    model: ty.Any  # FaceDataModel or FhirDataModel
+    pairs: ty.List[ty.Tuple[ty.Any, ty.Any]]
+    conflicts: ty.Set[int]
+
+    @property
+    def ontology(self):
+        return self.model.ontology
+
+
+def _conflicting_pairs(spec: ModelSpec, rng: random.Random) -> ty.Set[int]:
+    count = min(spec.entities, round(spec.conflict_rate * spec.entities))
+    return set(rng.sample(range(spec.entities), count))
+
+
+def _add_conflict(first, second, prop) -> None:
+    first.ontology_class.add_max_cardinality(prop, 1)
+    second.ontology_class.add_min_cardinality(prop, 2)
+
+
+def generate_face_model(spec: ModelSpec) -> SyntheticModel:
+    rng = random.Random(spec.seed)
+    model = FaceDataModel()
+    observables = [model.create_observable(f"Observable{k}") for k in range(spec.value_types)]
+    conflicts = _conflicting_pairs(spec, rng)
+
+    pairs = []
+    for i in range(spec.entities):
+        entity = model.create_entity(f"Entity{i}")
+        characteristics = [
+            entity.create_characteristic(f"char{j}", *rng.choice(BOUNDS), value_type=rng.choice(observables))
+            for j in range(spec.characteristics)
+        ]
+        leaves = []
+        for side in "AB":
+            leaf = entity
+            for level in range(1, spec.depth + 1):
+                leaf = leaf.create_specialization(f"Entity{i}{side}{level}")
+                leaf.create_characteristic(f"extra{level}", 0, 1, value_type=rng.choice(observables))
+            leaves.append(leaf)
+        if i in conflicts:
+            _add_conflict(*leaves, rng.choice(characteristics))
+        pairs.append(tuple(leaves))
+
+    return SyntheticModel(spec=spec, model=model, pairs=pairs, conflicts=conflicts)
+
+
+def generate_fhir_model(spec: ModelSpec) -> SyntheticModel:
+    rng = random.Random(spec.seed)
+    model = FhirDataModel()
+    datatypes = [model.create_datatype(f"Datatype{k}") for k in range(spec.value_types)]
+    conflicts = _conflicting_pairs(spec, rng)
+
+    pairs = []
+    for i in range(spec.entities):
+        resource = model.create_resource(f"Resource{i}")
+        elements = []
+        for j in range(spec.characteristics):
+            name = f"Resource{i}_element{j}"
+            resource.create_element(name, *rng.choice(BOUNDS), value_type=rng.choice(datatypes))
+            elements.append(model.ontology.owl_ontology[name])
+        leaves = []
+        for side in "AB":
+            leaf = resource
+            for level in range(1, spec.depth + 1):
+                profile = model.create_resource(f"Resource{i}{side}{level}")
+                profile.ontology_class.add_superclass(leaf.ontology_class)
+                profile.create_element(f"Resource{i}{side}{level}_extra", 0, 1, value_type=rng.choice(datatypes))
+                leaf = profile
+            leaves.append(leaf)
+        if i in conflicts:
+            _add_conflict(*leaves, rng.choice(elements))
+        pairs.append(tuple(leaves))
+
+    return SyntheticModel(spec=spec, model=model, pairs=pairs, conflicts=conflicts)
+
+
+GENERATORS: ty.Dict[str, ty.Callable[[ModelSpec], SyntheticModel]] = {
+    "face": generate_face_model,
+    "fhir": generate_fhir_model,
+}
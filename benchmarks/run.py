@@ -0,0 +1,198 @@
+"""
+Benchmark suite. Times model construction, `check_compatibility`, `explain_incompatibilities` and
+save/load on synthetic models (see `benchmarks.generate`) and writes the results as JSON, e.g.
+
+    python -m benchmarks.run --scenario small --reasoner python --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Every phase is repeated `--repeat` times on a freshly generated model and all samples are kept, so
+results from different commits can be compared by their medians.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as ty
+from pathlib import Path
+
+import attrs
+import owlready2 as owl
+
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.types import Ontology
+
+from .generate import GENERATORS, ModelSpec, SyntheticModel
+
+RESULTS_FORMAT_VERSION = 1
+
+SCENARIOS: ty.Dict[str, ModelSpec] = {
+    "small": ModelSpec(entities=5, characteristics=5, depth=2, conflict_rate=0.4),
+    "medium": ModelSpec(entities=20, characteristics=10, depth=3, conflict_rate=0.3),
+    "large": ModelSpec(entities=50, characteristics=20, depth=4, conflict_rate=0.2),
+}
+
+PHASES = [
+    "construct",
+    "check_compatibility",
+    "explain_incompatibilities",
+    "save",
+    "load",
+    "save_snapshot",
+    "load_snapshot",
+]
+
+
+class _Timer:
+    def __init__(self):
+        self.samples: ty.Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.samples[name] = time.perf_counter() - start
+
+
+def _model_size(ontology: Ontology) -> ty.Dict[str, int]:
+    return {
+        "classes": len(list(ontology.owl_ontology.classes())),
+        "properties": len(list(ontology.owl_ontology.properties())),
+    }
+
+
+def run_once(kind: str, spec: ModelSpec, reasoner_name: ty.Optional[str], workdir: Path) -> ty.Dict[str, ty.Any]:
+    """Time every phase once on a fresh model. Returns the samples, model size and verdicts."""
+    timer = _Timer()
+    with timer.phase("construct"):
+        synthetic: SyntheticModel = GENERATORS[kind](spec)
+    ontology = synthetic.ontology
+
+    with timer.phase("check_compatibility"):
+        verdicts = [reasoner.check_compatibility(a, b, reasoner=reasoner_name) for a, b in synthetic.pairs]
+    with timer.phase("explain_incompatibilities"):
+        for a, b in synthetic.pairs:
+            reasoner.explain_incompatibilities(a, b)
+
+    path = workdir / f"{kind}.owl"
+    with timer.phase("save"):
+        ontology.save(str(path))
+    with timer.phase("load"):
+        loaded = Ontology.load(path)
+    loaded.close()
+
+    snapshot = workdir / f"{kind}.sqlite3"
+    with timer.phase("save_snapshot"):
+        ontology.save_snapshot(snapshot)
+    with timer.phase("load_snapshot"):
+        restored = Ontology.load_snapshot(snapshot)
+    restored.close()
+
+    size = _model_size(ontology)
+    ontology.close()
+    return {
+        "samples": timer.samples,
+        "size": {**size, "pairs": len(synthetic.pairs)},
+        "incompatible": sorted(i for i, compatible in enumerate(verdicts) if not compatible),
+        "expected_incompatible": sorted(synthetic.conflicts),
+    }
+
+
+def run_benchmark(
+        kind: str,
+        spec: ModelSpec,
+        name: str,
+        reasoner_name: ty.Optional[str] = None,
+        repeat: int = 3,
+) -> ty.Dict[str, ty.Any]:
+    """Run `repeat` rounds of every phase on `kind` ("face" or "fhir") models generated from `spec`."""
+    timings: ty.Dict[str, ty.List[float]] = {phase: [] for phase in PHASES}
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            result = run_once(kind, spec, reasoner_name, Path(workdir))
+            for phase, sample in result["samples"].items():
+                timings[phase].append(sample)
+    return {
+        "name": f"{kind}-{name}",
+        "model": kind,
+        "spec": attrs.asdict(spec),
+        "reasoner": reasoner_name or "default",
+        "repeat": repeat,
+        "size": result["size"],
+        "correct": result["incompatible"] == result["expected_incompatible"],
+        "incompatible": result["incompatible"],
+        "expected_incompatible": result["expected_incompatible"],
+        "timings": timings,
+        "median": {phase: statistics.median(samples) for phase, samples in timings.items()},
+    }
+
+
+def _git_commit() -> ty.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> ty.Dict[str, ty.Any]:
+    return {
+        "format": RESULTS_FORMAT_VERSION,
+        "commit": _git_commit(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "owlready2": owl.VERSION,
+        "platform": platform.platform(),
+    }
+
+
+def main(argv: ty.Optional[ty.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", choices=sorted(GENERATORS), action="append",
+                        help="model kinds to benchmark (default: all)")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="preset model sizes (default: small)")
+    parser.add_argument("--entities", type=int, help="override the scenario's entity count")
+    parser.add_argument("--characteristics", type=int, help="override characteristics per entity")
+    parser.add_argument("--depth", type=int, help="override the specialization depth")
+    parser.add_argument("--conflict-rate", type=float, help="override the cardinality conflict rate")
+    parser.add_argument("--seed", type=int, help="override the generator seed")
+    parser.add_argument("--reasoner", help="reasoner backend (default: the ontology's, i.e. HermiT)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    overrides = {
+        field: value for field, value in {
+            "entities": args.entities,
+            "characteristics": args.characteristics,
+            "depth": args.depth,
+            "conflict_rate": args.conflict_rate,
+            "seed": args.seed,
+        }.items() if value is not None
+    }
+    results = {**environment(), "benchmarks": []}
+    for scenario in args.scenario or ["small"]:
+        spec = attrs.evolve(SCENARIOS[scenario], **overrides)
+        for kind in args.model or sorted(GENERATORS):
+            print(f"Benchmarking {kind}-{scenario}...", file=sys.stderr)
+            # keep progress messages out of JSON written to stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                results["benchmarks"].append(run_benchmark(kind, spec, scenario, args.reasoner, args.repeat))
+
+    text = json.dumps(results, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
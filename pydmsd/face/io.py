@@ -0,0 +1,177 @@
+"""
+Bulk import of FACE data models from JSON or CSV specifications. The whole model is built in one
+`Ontology.batch()`, and every element is registered by name on the returned `FaceDataModel`.
+
+A JSON specification lists each kind of element; bounds default to 0 and unbounded (`null` or `"*"`):
+
+    {
+      "observables": ["RotorSpeed"],
+      "units": ["RotationsPerMinute"],
+      "measurement_systems": [{"name": "RotorSpeedRPM", "observable": "RotorSpeed", "unit": "RotationsPerMinute"}],
+      "entities": [
+        {"name": "Helicopter",
+         "characteristics": [{"name": "rotorSpeed", "type": "RotorSpeed", "lower": 1, "upper": 1}]},
+        {"name": "Helicopter_A", "specializes": "Helicopter"}
+      ]
+    }
+
+A CSV specification has one row per element, with the columns of `CSV_COLUMNS` (only those a kind needs must
+be filled in):
+
+    kind,name,entity,specializes,type,observable,unit,lower,upper
+    observable,RotorSpeed,,,,,,,
+    entity,Helicopter,,,,,,,
+    entity,Helicopter_A,,Helicopter,,,,,
+    characteristic,rotorSpeed,Helicopter,,RotorSpeed,,,1,1
+
+Elements may refer to elements defined later in the file. Characteristic types name an observable, a measurement
+system or an entity.
+"""
+import csv
+import json
+import typing as ty
+from pathlib import Path
+
+from pydmsd.face.types import Entity, FaceDataModel
+
+Specification = ty.Dict[str, ty.List[ty.Any]]
+
+CSV_COLUMNS = ["kind", "name", "entity", "specializes", "type", "observable", "unit", "lower", "upper"]
+
+
+def _bound(value) -> ty.Optional[int]:
+    return None if value in (None, "", "*") else int(value)
+
+
+def read_json(path: ty.Union[str, Path]) -> Specification:
+    """Read a JSON specification (see the module documentation)."""
+    return json.loads(Path(path).read_text())
+
+
+def read_csv(path: ty.Union[str, Path]) -> Specification:
+    """Read a CSV specification (see the module documentation) into the JSON layout."""
+    spec: Specification = {"observables": [], "units": [], "measurement_systems": [], "entities": []}
+    entities: ty.Dict[str, ty.Dict[str, ty.Any]] = {}
+    characteristics = []
+    with open(path, newline="") as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            kind, name = row.get("kind"), row.get("name")
+            if not name:
+                raise ValueError(f"{path}:{line}: missing name")
+            if kind == "observable":
+                spec["observables"].append(name)
+            elif kind == "unit":
+                spec["units"].append(name)
+            elif kind == "measurement_system":
+                spec["measurement_systems"].append({"name": name, "observable": row["observable"], "unit": row["unit"]})
+            elif kind == "entity":
+                entity = {"name": name, "specializes": row.get("specializes") or None, "characteristics": []}
+                spec["entities"].append(entity)
+                entities.setdefault(name, entity)
+            elif kind == "characteristic":
+                characteristics.append((line, row))
+            else:
+                raise ValueError(f"{path}:{line}: unknown kind {kind!r}")
+
+    for line, row in characteristics:
+        if row.get("entity") not in entities:
+            raise ValueError(f"{path}:{line}: characteristic {row['name']} of unknown entity {row.get('entity')!r}")
+        entities[row["entity"]]["characteristics"].append(
+            {"name": row["name"], "type": row["type"], "lower": row.get("lower"), "upper": row.get("upper")}
+        )
+    return spec
+
+
+def _check_unique(spec: Specification) -> None:
+    seen = set()
+    for kind in ("observables", "units", "measurement_systems", "entities"):
+        for item in spec.get(kind, []):
+            name = item if isinstance(item, str) else item["name"]
+            if name in seen:
+                raise ValueError(f"{name} is defined more than once")
+            seen.add(name)
+
+
+def _value_type(model: FaceDataModel, name: str):
+    """The observable, measurement system or entity called `name`, or None."""
+    for elements in (model.observables, model.measurement_systems, model.entities):
+        if name in elements:
+            return elements[name]
+    return None
+
+
+def _specialization_order(entities: ty.List[ty.Dict[str, ty.Any]]) -> ty.List[ty.Dict[str, ty.Any]]:
+    """`entities` ordered so that every entity comes after the one it specializes."""
+    by_name = {entity["name"]: entity for entity in entities}
+    ordered, done, visiting = [], set(), set()
+    for entity in entities:
+        chain = []
+        while entity is not None and entity["name"] not in done:
+            if entity["name"] in visiting:
+                raise ValueError(f"Specialization cycle through {entity['name']}")
+            visiting.add(entity["name"])
+            chain.append(entity)
+            parent = entity.get("specializes")
+            if parent is not None and parent not in by_name:
+                raise ValueError(f"{entity['name']} specializes unknown entity {parent}")
+            entity = by_name.get(parent)
+        for entity in reversed(chain):
+            ordered.append(entity)
+            done.add(entity["name"])
+    return ordered
+
+
+def build_model(spec: Specification, model: ty.Optional[FaceDataModel] = None) -> FaceDataModel:
+    """Add everything in `spec` (the JSON layout) to `model` (by default a new one), in one ontology batch."""
+    if model is None:
+        model = FaceDataModel()
+    _check_unique(spec)
+    entities = _specialization_order(spec.get("entities", []))
+
+    with model.ontology.batch():
+        for name in spec.get("observables", []):
+            model.create_observable(name)
+        for name in spec.get("units", []):
+            model.create_unit(name)
+        for item in spec.get("measurement_systems", []):
+            try:
+                observable, unit = model.observables[item["observable"]], model.units[item["unit"]]
+            except KeyError as e:
+                raise ValueError(f"Measurement system {item['name']} refers to unknown {e.args[0]}") from None
+            model.create_measurement_system(item["name"], observable=observable, unit=unit)
+
+        for item in entities:
+            parent = item.get("specializes")
+            if parent is not None:
+                model.entities[parent].create_specialization(item["name"])
+            else:
+                model.create_entity(item["name"])
+
+        for item in entities:
+            entity: Entity = model.entities[item["name"]]
+            for characteristic in item.get("characteristics", []):
+                value_type = _value_type(model, characteristic["type"])
+                if value_type is None:
+                    raise ValueError(
+                        f"Characteristic {entity.name}.{characteristic['name']} has unknown type "
+                        f"{characteristic['type']} (not an observable, measurement system or entity)"
+                    )
+                entity.create_characteristic(
+                    name=characteristic["name"],
+                    lower_bound=_bound(characteristic.get("lower")),
+                    upper_bound=_bound(characteristic.get("upper")),
+                    value_type=value_type,
+                )
+    return model
+
+
+def load(path: ty.Union[str, Path], model: ty.Optional[FaceDataModel] = None) -> FaceDataModel:
+    """Build a FACE data model from the JSON or CSV specification at `path` (chosen by its suffix)."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        spec = read_csv(path)
+    elif path.suffix.lower() == ".json":
+        spec = read_json(path)
+    else:
+        raise ValueError(f"Expected a .json or .csv specification, got {path}")
+    return build_model(spec, model)
@@ -4,7 +4,7 @@ Core FACE data model. Defines the minimal representation of FACE concepts needed
 import attrs
 import typing as ty
 
-from pydmsd.ontology.types import Ontology, OntologyProperty
+from pydmsd.ontology.types import Ontology, OntologyClass, OntologyProperty
 
 
 class FaceElement:
@@ -35,13 +35,18 @@ class Entity:
 
         # Create the underlying ontology class
         self.ontology_class = self.model.ontology.define_class(name)
+        # Characteristic name -> the ontology property created for it
+        self.characteristics: ty.Dict[str, ty.Any] = {}
 
 
     def create_characteristic(self, name, lower_bound, upper_bound, value_type):
+        # `value_type` is an observable or entity, or the ontology class of a measurement system
+        value_class = value_type if isinstance(value_type, OntologyClass) else value_type.ontology_class
         # Create the underlying ontology property and restrictions
-        owl_prop = self.model.ontology.define_object_property(f"{self.name}_{name}", range_=value_type.ontology_class)
+        owl_prop = self.model.ontology.define_object_property(f"{self.name}_{name}", range_=value_class)
+        self.characteristics[name] = owl_prop
 
-        owl_range_type = value_type.ontology_class.owl_cls
+        owl_range_type = value_class.owl_cls
 
         if lower_bound and upper_bound and lower_bound == upper_bound:
             self.ontology_class.add_exactly_cardinality(owl_prop, lower_bound)
@@ -90,26 +95,48 @@ class MeasurementSystem:
 
 
 class FaceDataModel:
-    def __init__(self):
-        self.ontology = Ontology()
-
-    def _create_element(self, cls, name: str):
+    """
+    A FACE data model built on an `Ontology` (by default a new in-memory one). Call `close()`, or use the
+    model as a context manager, to release the ontology's World once the model is no longer needed.
+    """
+    def __init__(self, ontology: ty.Optional[Ontology] = None):
+        self.ontology = ontology if ontology is not None else Ontology()
+        # Everything created through this model, by name
+        self.entities: ty.Dict[str, Entity] = {}
+        self.observables: ty.Dict[str, Observable] = {}
+        self.units: ty.Dict[str, Unit] = {}
+        self.measurement_systems: ty.Dict[str, ty.Any] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Close the model's ontology (see `Ontology.close`)."""
+        self.ontology.close()
+
+    def _create_element(self, cls, name: str, registry: ty.Dict[str, ty.Any]):
         element = cls(name, model=self)
+        registry[name] = element
         return element
 
     # Conceptual
     def create_entity(self, name: str) -> Entity:
-        return self._create_element(Entity, name)
+        return self._create_element(Entity, name, self.entities)
 
     def create_observable(self, name: str) -> Observable:
-        return self._create_element(Observable, name)
+        return self._create_element(Observable, name, self.observables)
 
     # Logical
     def create_unit(self, name) -> Unit:
-        return self._create_element(Unit, name)
+        return self._create_element(Unit, name, self.units)
 
     def create_measurement_system(self, name, observable, unit) -> MeasurementSystem:
-        return self.ontology.define_measurement_system(name, observable.ontology_class, unit.ontology_class)
+        measurement_system = self.ontology.define_measurement_system(name, observable.ontology_class, unit.ontology_class)
+        self.measurement_systems[name] = measurement_system
+        return measurement_system
 
     def create_measurement_system_b(self, name, observable, unit) -> MeasurementSystem:
         return self.ontology.define_measurement_system_b(name, observable.ontology_class, unit.ontology_class)
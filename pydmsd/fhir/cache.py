@@ -0,0 +1,350 @@
+"""
+On-disk cache of FHIR StructureDefinitions, so models can be built repeatedly (and on machines without
+network access) without downloading the same definitions again.
+
+Definitions are stored content-addressed (`objects/<sha256>.json`) and indexed by canonical URI and version
+in `index.sqlite3`. A cached definition is used as is while it is younger than `max_age`, and revalidated
+with a conditional request (ETag / Last-Modified) after that. Version-pinned URIs (`<canonical>|<version>`)
+are downloaded from the canonical URI, which must serve the pinned version, and are never revalidated.
+`get_many` fetches many definitions concurrently over pooled keep-alive connections (retrying failed
+requests with backoff) and prefetches the definitions they depend on. In `offline` mode the network is
+never used and a definition missing from the cache raises `OfflineCacheMiss`.
+
+The default cache lives in `$XDG_CACHE_HOME/pydmsd/fhir` (override with `PYDMSD_FHIR_CACHE`), and
+`PYDMSD_FHIR_OFFLINE=1` switches it to offline mode. Seed it where the network is available, then copy
+the directory to air-gapped machines:
+
+    python -m pydmsd.fhir.cache seed http://hl7.org/fhir/StructureDefinition/Patient
+    python -m pydmsd.fhir.cache import package/StructureDefinition-*.json
+    python -m pydmsd.fhir.cache list
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing as ty
+from pathlib import Path
+
+import attrs
+import requests
+import requests.adapters
+import urllib3.util
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("PYDMSD_FHIR_CACHE")
+    or Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "pydmsd" / "fhir"
+)
+DEFAULT_MAX_AGE = 24 * 60 * 60  # seconds before a cached definition is revalidated
+DEFAULT_TIMEOUT = 30  # seconds per HTTP request
+DEFAULT_RETRIES = 3  # retries of failed requests, with exponential backoff
+DEFAULT_BACKOFF = 0.5  # seconds before the first retry
+DEFAULT_WORKERS = 8  # concurrent requests of `get_many`
+
+HEADERS = {"Accept": "application/json"}
+
+
+class OfflineCacheMiss(LookupError):
+    """A definition was requested in offline mode but is not in the cache."""
+
+
+class PinnedVersionUnavailable(LookupError):
+    """A version-pinned definition is not cached and its canonical URI serves a different version."""
+
+
+def _new_session(retries: int, backoff: float, connections: int) -> requests.Session:
+    """A session keeping up to `connections` connections per host alive, retrying failures with backoff."""
+    retry = urllib3.util.Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=connections, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def dependencies(definition: ty.Dict[str, ty.Any]) -> ty.Set[str]:
+    """Canonical URIs a StructureDefinition builds on: its `baseDefinition` and the profiles of its types."""
+    uris = set()
+    if (base := definition.get("baseDefinition")) is not None:
+        uris.add(base)
+    for view in ("snapshot", "differential"):
+        for element in definition.get(view, {}).get("element", []):
+            for element_type in element.get("type", []):
+                uris.update(element_type.get("profile", []))
+    return uris
+
+
+def split_canonical(uri: str) -> ty.Tuple[str, str]:
+    """Split `<canonical>|<version>` into canonical URI and version ("" if unversioned)."""
+    canonical, _, version = uri.partition("|")
+    return canonical, version
+
+
+@attrs.define
+class CacheEntry:
+    uri: str
+    version: str  # "" for the unversioned (latest) entry
+    digest: str  # sha256 of the stored definition
+    etag: ty.Optional[str] = None
+    last_modified: ty.Optional[str] = None
+    fetched: float = 0.0  # time.time() of the last download or revalidation
+
+
+class StructureDefinitionCache:
+    """Content-addressed cache of StructureDefinition JSON in `directory`, see the module documentation."""
+    def __init__(
+            self,
+            directory: ty.Union[str, Path] = DEFAULT_CACHE_DIR,
+            offline: bool = False,
+            max_age: float = DEFAULT_MAX_AGE,
+            session: ty.Optional[requests.Session] = None,
+            timeout: float = DEFAULT_TIMEOUT,
+            retries: int = DEFAULT_RETRIES,
+            backoff: float = DEFAULT_BACKOFF,
+    ):
+        self.directory = Path(directory)
+        self.offline = offline
+        self.max_age = max_age
+        self.session = session if session is not None else _new_session(retries, backoff, DEFAULT_WORKERS)
+        self.timeout = timeout
+        (self.directory / "objects").mkdir(parents=True, exist_ok=True)
+        # shared by `get_many`'s worker threads, every use holds the lock
+        self._connection = sqlite3.connect(self.directory / "index.sqlite3", check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "uri TEXT, version TEXT, digest TEXT, etag TEXT, last_modified TEXT, fetched REAL, "
+                "PRIMARY KEY (uri, version))"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def entries(self) -> ty.List[CacheEntry]:
+        with self._lock:
+            rows = self._connection.execute("SELECT * FROM entries ORDER BY uri, version").fetchall()
+        return [CacheEntry(*row) for row in rows]
+
+    def entry(self, uri: str) -> ty.Optional[CacheEntry]:
+        canonical, version = split_canonical(uri)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT * FROM entries WHERE uri = ? AND version = ?", (canonical, version)
+            ).fetchone()
+        return None if row is None else CacheEntry(*row)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.directory / "objects" / f"{digest}.json"
+
+    def _store_object(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            temporary.write_bytes(content)
+            os.replace(temporary, path)
+        return digest
+
+    def _load_object(self, entry: CacheEntry) -> ty.Dict[str, ty.Any]:
+        return json.loads(self._object_path(entry.digest).read_bytes())
+
+    def _put(self, entry: CacheEntry) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", attrs.astuple(entry)
+            )
+
+    def add(
+            self,
+            content: bytes,
+            uri: ty.Optional[str] = None,
+            etag=None,
+            last_modified=None,
+            latest: ty.Optional[bool] = None,
+    ) -> ty.Dict[str, ty.Any]:
+        """
+        Store a StructureDefinition (raw JSON `content`) under `uri` and under its own `url` and `url|version`,
+        and under the unversioned URIs too if it is the `latest` version (by default, unless `uri` is pinned).
+        Returns the parsed definition.
+        """
+        definition = json.loads(content)
+        digest = self._store_object(content)
+        if latest is None:
+            latest = uri is None or not split_canonical(uri)[1]
+        keys = set()
+        if uri is not None:
+            keys.add(split_canonical(uri))
+            if latest:
+                keys.add((split_canonical(uri)[0], ""))
+        if (url := definition.get("url")) is not None:
+            if latest:
+                keys.add((url, ""))
+            if (version := definition.get("version")) is not None:
+                keys.add((url, version))
+        if not keys:
+            raise ValueError("StructureDefinition has no 'url', pass the URI to store it under")
+        now = time.time()
+        for canonical, version in keys:
+            self._put(CacheEntry(canonical, version, digest, etag, last_modified, now))
+        return definition
+
+    def _fresh(self, entry: CacheEntry) -> bool:
+        return entry.version != "" or time.time() - entry.fetched < self.max_age
+
+    def get(self, uri: str) -> ty.Dict[str, ty.Any]:
+        """The StructureDefinition JSON for `uri`, from the cache or downloaded (and then cached)."""
+        entry = self.entry(uri)
+        if entry is not None and (self.offline or self._fresh(entry)):
+            return self._load_object(entry)
+        if self.offline:
+            raise OfflineCacheMiss(f"{uri} is not in the FHIR cache at {self.directory} and the cache is offline")
+        return self._download(uri, entry)
+
+    def _download(self, uri: str, entry: ty.Optional[CacheEntry]) -> ty.Dict[str, ty.Any]:
+        canonical, version = split_canonical(uri)
+        headers = dict(HEADERS)
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        try:
+            response = self.session.get(canonical, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if entry is None:
+                raise
+            _LOGGER.warning("Could not revalidate %s (%s), using the cached copy", uri, e)
+            return self._load_object(entry)
+
+        if response.status_code == 304 and entry is not None:
+            self._put(attrs.evolve(entry, fetched=time.time()))
+            return self._load_object(entry)
+
+        # the canonical URI serves the latest version, which is only stored under the pin if it matches
+        served = json.loads(response.content).get("version")
+        matches = not version or served == version
+        definition = self.add(
+            response.content,
+            uri=uri if matches else canonical,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            latest=True,
+        )
+        if matches:
+            return definition
+        if entry is not None:
+            return self._load_object(entry)
+        raise PinnedVersionUnavailable(f"{canonical} serves version {served!r}, not the pinned version {version!r}")
+
+    def _fetch(self, uri: str, revalidate: bool) -> ty.Dict[str, ty.Any]:
+        if revalidate and not self.offline:
+            return self._download(uri, self.entry(uri))
+        return self.get(uri)
+
+    def get_many(
+            self,
+            uris: ty.Iterable[str],
+            max_workers: int = DEFAULT_WORKERS,
+            follow_dependencies: bool = True,
+            revalidate: bool = False,
+    ) -> ty.Dict[str, ty.Dict[str, ty.Any]]:
+        """
+        Like `get` for every URI in `uris`, with up to `max_workers` requests in flight. With
+        `follow_dependencies`, the definitions each one builds on (see `dependencies`) are fetched into the
+        cache as well, transitively; those that fail are only logged. With `revalidate`, cached definitions
+        are revalidated regardless of their age.
+
+        Returns the definitions of `uris`, by URI. Raises the first error of any of `uris`.
+        """
+        requested = list(dict.fromkeys(uris))
+        wanted = set(requested)
+        results: ty.Dict[str, ty.Dict[str, ty.Any]] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+            pending = {pool.submit(self._fetch, uri, revalidate): uri for uri in requested}
+            seen = set(wanted)
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    uri = pending.pop(future)
+                    try:
+                        definition = future.result()
+                    except Exception as e:
+                        if uri not in wanted:
+                            _LOGGER.warning("Could not prefetch %s: %s", uri, e)
+                            continue
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    if uri in wanted:
+                        results[uri] = definition
+                    for dependency in dependencies(definition) if follow_dependencies else ():
+                        if dependency not in seen:
+                            seen.add(dependency)
+                            pending[pool.submit(self._fetch, dependency, revalidate)] = dependency
+        return {uri: results[uri] for uri in requested}
+
+    def seed(self, uris: ty.Iterable[str], follow_dependencies: bool = True) -> None:
+        """Download every URI in `uris`, and what they depend on, into the cache (revalidating cached ones)."""
+        self.get_many(uris, follow_dependencies=follow_dependencies, revalidate=True)
+
+
+_default_cache: ty.Optional[StructureDefinitionCache] = None
+
+
+def default_cache() -> StructureDefinitionCache:
+    """The shared cache in `DEFAULT_CACHE_DIR`, offline if `PYDMSD_FHIR_OFFLINE` is set."""
+    global _default_cache
+    if _default_cache is None:
+        offline = os.environ.get("PYDMSD_FHIR_OFFLINE", "").lower() not in ("", "0", "false", "no")
+        _default_cache = StructureDefinitionCache(offline=offline)
+    return _default_cache
+
+
+def main(argv: ty.Optional[ty.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed = commands.add_parser("seed", help="download StructureDefinitions by canonical URI")
+    seed.add_argument("uris", nargs="+")
+    import_ = commands.add_parser("import", help="add StructureDefinition JSON files")
+    import_.add_argument("paths", nargs="+", type=Path)
+    commands.add_parser("list", help="list the cached URIs")
+    args = parser.parse_args(argv)
+
+    with StructureDefinitionCache(args.cache_dir) as cache:
+        if args.command == "seed":
+            cache.seed(args.uris)
+        elif args.command == "import":
+            for path in args.paths:
+                cache.add(path.read_bytes())
+        else:
+            for entry in cache.entries():
+                print(f"{entry.uri}|{entry.version}" if entry.version else entry.uri)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,33 @@
-import requests
 import json
 import typing as ty
 
+from pydmsd.fhir.cache import DEFAULT_WORKERS, StructureDefinitionCache, default_cache
+
+
+def download_fhir_structuredefinition(uri, cache: ty.Optional[StructureDefinitionCache] = None):
+    """
+    Download FHIR StructureDefinition JSON from a canonical URI, through `cache`
+    (by default the shared on-disk cache, see `pydmsd.fhir.cache`).
+    """
+    if cache is None:
+        cache = default_cache()
+    return cache.get(uri)
+
+
+def fetch_many(
+        uris,
+        cache: ty.Optional[StructureDefinitionCache] = None,
+        max_workers: int = DEFAULT_WORKERS,
+        follow_dependencies: bool = True,
+):
+    """
+    Download many StructureDefinitions concurrently through `cache`, prefetching the base definitions and
+    type profiles they build on. Returns the definitions of `uris` by URI, see `StructureDefinitionCache.get_many`.
+    """
+    if cache is None:
+        cache = default_cache()
+    return cache.get_many(uris, max_workers=max_workers, follow_dependencies=follow_dependencies)
 
-def download_fhir_structuredefinition(uri):
-    """Download FHIR StructureDefinition JSON from a canonical URI."""
-    headers = {"Accept": "application/json"}
-    response = requests.get(uri, headers=headers)
-    response.raise_for_status()
-    return response.json()
 
 # All FHIR resources inherit these elements from DomainResource,
 # which we ignore for compatibility checking
@@ -105,9 +124,9 @@ def parse_structuredefinition(struct_def_json):
         elements=elements
     )
 
-def fetch_and_parse_fhir_resource(uri):
-    """Download and parse a FHIR resource from its canonical URI."""
-    struct_def = download_fhir_structuredefinition(uri)
+def fetch_and_parse_fhir_resource(uri, cache: ty.Optional[StructureDefinitionCache] = None):
+    """Download (or take from `cache`) and parse a FHIR resource from its canonical URI."""
+    struct_def = download_fhir_structuredefinition(uri, cache)
     return parse_structuredefinition(struct_def)
 
 if __name__ == "__main__":
@@ -5,7 +5,9 @@ import attrs
 import typing as ty
 
 from pydmsd.ontology.types import Ontology
-from pydmsd.fhir.download import fetch_and_parse_fhir_resource, RawFhirResource
+from pydmsd.fhir.cache import StructureDefinitionCache
+from pydmsd.fhir.download import fetch_and_parse_fhir_resource, fetch_many, RawFhirResource
+from pydmsd.fhir.package import FhirPackage, read_package
 
 
 class Datatype:
@@ -43,9 +45,31 @@ class Resource:
 
 
 class FhirDataModel:
-    def __init__(self):
+    """
+    A FHIR data model built on an `Ontology` (by default a new in-memory one). Call `close()`, or use the
+    model as a context manager, to release the ontology's World once the model is no longer needed.
+    """
+    def __init__(
+            self,
+            ontology: ty.Optional[Ontology] = None,
+            cache: ty.Optional[StructureDefinitionCache] = None,
+    ):
         self.entities = {}
-        self.ontology = Ontology()
+        self.ontology = ontology if ontology is not None else Ontology()
+        # StructureDefinition cache for the *_from_uri methods, None for the shared default cache
+        self.cache = cache
+        # packages loaded with `load_package`, searched before the cache and the network
+        self.packages: ty.List[FhirPackage] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Close the model's ontology (see `Ontology.close`)."""
+        self.ontology.close()
 
     def create_resource(self, name: str):
         resource = Resource(name, model=self)
@@ -57,26 +81,56 @@ class FhirDataModel:
         self.entities[name] = datatype
         return datatype
 
+    def load_package(self, path) -> FhirPackage:
+        """
+        Read a FHIR NPM package (`.tgz`) so that the `*_from_uri` methods find its StructureDefinitions
+        locally. Definitions are only parsed once a resource is created from them, e.g. to import them all:
+
+            package = model.load_package("hl7.fhir.us.core.tgz")
+            profiles = [model.create_resource_from_uri(url) for url in package.urls]
+        """
+        package = read_package(path)
+        self.packages.append(package)
+        return package
+
+    def _fetch_and_parse(self, uri: str) -> RawFhirResource:
+        for package in self.packages:
+            if uri in package:
+                return package.resource(uri)
+        return fetch_and_parse_fhir_resource(uri, self.cache)
+
     def create_resource_from_uri(self, uri: str):
-        """Create a resource from a FHIR StructureDefinition URI."""
-        raw_resource: RawFhirResource = fetch_and_parse_fhir_resource(uri)
-        resource = self.create_resource(raw_resource.name)
-
-        for element in raw_resource.elements:
-            lower_bound = int(element.min)
-            upper_bound = None if (max := element.max) == "*" else int(max)
-            # TODO - not strictly necessary, because repeated class definitions are meaningless in OWL
-            datatype = self.entities.get(element.type_name) or self.create_datatype(element.type_name)
-
-            resource.create_element(
-                name=element.name,
-                lower_bound=lower_bound,
-                upper_bound=upper_bound,
-                value_type=datatype,
-            )
+        """Create a resource from a FHIR StructureDefinition URI (found in a loaded package, or downloaded)."""
+        raw_resource: RawFhirResource = self._fetch_and_parse(uri)
+        with self.ontology.batch():
+            resource = self.create_resource(raw_resource.name)
+
+            for element in raw_resource.elements:
+                lower_bound = int(element.min)
+                upper_bound = None if (max := element.max) == "*" else int(max)
+                # TODO - not strictly necessary, because repeated class definitions are meaningless in OWL
+                datatype = self.entities.get(element.type_name) or self.create_datatype(element.type_name)
+
+                resource.create_element(
+                    name=element.name,
+                    lower_bound=lower_bound,
+                    upper_bound=upper_bound,
+                    value_type=datatype,
+                )
 
         return resource
 
+    def create_resources_from_uris(self, uris: ty.Iterable[str]) -> ty.List[Resource]:
+        """
+        Create a resource from each URI. Definitions not in a loaded package are downloaded concurrently
+        first, together with the definitions they build on (see `download.fetch_many`), and all resources are
+        built in one `Ontology.batch()`.
+        """
+        uris = list(uris)
+        fetch_many([uri for uri in uris if not any(uri in package for package in self.packages)], self.cache)
+        with self.ontology.batch():
+            return [self.create_resource_from_uri(uri) for uri in uris]
+
     def create_profile_from_uri(self, uri: str, base_resource: Resource):
         resource = self.create_resource_from_uri(uri)
         resource.ontology_class.add_superclass(base_resource.ontology_class)
@@ -0,0 +1,105 @@
+"""
+FHIR NPM packages. Implementation Guides ship as `.tgz` packages holding one JSON file per conformance
+resource under `package/`. `read_package` streams the tarball once, without unpacking it to disk, and keeps
+the raw StructureDefinitions indexed by canonical URL. A definition is only parsed when it is asked for.
+
+The package's `.index.json` (if present) names the StructureDefinitions and their URLs, so nothing else needs
+to be parsed; without it, each candidate file is parsed once to read its URL.
+"""
+import json
+import re
+import tarfile
+import typing as ty
+from pathlib import Path
+
+import attrs
+
+from pydmsd.fhir.cache import split_canonical
+from pydmsd.fhir.download import RawFhirResource, parse_structuredefinition
+
+PACKAGE_DIR = "package/"
+INDEX_FILE = PACKAGE_DIR + ".index.json"
+MANIFEST_FILE = PACKAGE_DIR + "package.json"
+
+# cheap test for StructureDefinitions, without parsing the file
+_STRUCTURE_DEFINITION = re.compile(rb'"resourceType"\s*:\s*"StructureDefinition"')
+
+
+@attrs.define
+class FhirPackage:
+    """The StructureDefinitions of a FHIR NPM package, parsed on demand."""
+    path: Path
+    name: ty.Optional[str]
+    version: ty.Optional[str]
+    _raw: ty.Dict[str, bytes]  # canonical URL -> StructureDefinition JSON
+    _versions: ty.Dict[str, ty.Optional[str]]  # canonical URL -> business version
+    _parsed: ty.Dict[str, RawFhirResource] = attrs.Factory(dict)
+
+    @property
+    def urls(self) -> ty.List[str]:
+        """Canonical URLs of every StructureDefinition in the package."""
+        return sorted(self._raw)
+
+    def __contains__(self, uri: str) -> bool:
+        canonical, version = split_canonical(uri)
+        return canonical in self._raw and (not version or self._versions[canonical] == version)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def structure_definition(self, uri: str) -> ty.Dict[str, ty.Any]:
+        """The StructureDefinition JSON for `uri` (`<canonical>` or `<canonical>|<version>`)."""
+        if uri not in self:
+            raise KeyError(f"{uri} is not in package {self.name}")
+        return json.loads(self._raw[split_canonical(uri)[0]])
+
+    def resource(self, uri: str) -> RawFhirResource:
+        """The parsed StructureDefinition for `uri`, see `download.parse_structuredefinition`."""
+        canonical = split_canonical(uri)[0]
+        if canonical not in self._parsed:
+            self._parsed[canonical] = parse_structuredefinition(self.structure_definition(uri))
+        return self._parsed[canonical]
+
+
+def _is_resource_file(name: str) -> bool:
+    """Conformance resources are the JSON files directly in `package/` (examples live in subdirectories)."""
+    return name.startswith(PACKAGE_DIR) and "/" not in name[len(PACKAGE_DIR):] and name.endswith(".json")
+
+
+def read_package(path: ty.Union[str, Path]) -> FhirPackage:
+    """Read the StructureDefinitions of the FHIR NPM package (`.tgz`) at `path` in a single pass."""
+    path = Path(path)
+    candidates: ty.Dict[str, bytes] = {}  # file name -> content
+    index, manifest = None, {}
+    with tarfile.open(path, mode="r|gz") as archive:
+        for member in archive:
+            if not member.isfile() or not _is_resource_file(member.name):
+                continue
+            content = archive.extractfile(member).read()
+            if member.name == INDEX_FILE:
+                index = json.loads(content)
+            elif member.name == MANIFEST_FILE:
+                manifest = json.loads(content)
+            elif _STRUCTURE_DEFINITION.search(content):
+                candidates[member.name[len(PACKAGE_DIR):]] = content
+
+    raw, versions = {}, {}
+    if index is not None:
+        for entry in index.get("files", []):
+            if entry.get("resourceType") == "StructureDefinition" and entry.get("filename") in candidates:
+                raw[entry["url"]] = candidates[entry["filename"]]
+                versions[entry["url"]] = entry.get("version")
+    else:
+        for content in candidates.values():
+            definition = json.loads(content)
+            if definition.get("resourceType") == "StructureDefinition" and "url" in definition:
+                raw[definition["url"]] = content
+                versions[definition["url"]] = definition.get("version")
+
+    return FhirPackage(
+        path=path,
+        name=manifest.get("name"),
+        version=manifest.get("version"),
+        raw=raw,
+        versions=versions,
+    )
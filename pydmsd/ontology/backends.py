@@ -0,0 +1,253 @@
+"""
+Reasoner backends. A backend classifies an ontology and records every unsatisfiable class it finds as
+equivalent to owl:Nothing, the way owlready2 records HermiT's inferences, so callers can read the result
+back from the model regardless of which reasoner produced it. Run on a `types.ScratchOntology`, backends
+record their inferences in it, so they are dropped together with the scratch ontology.
+
+Backends are selected by name ("hermit", "pellet", "daemon", "python") or by instance, either per `Ontology`
+(`Ontology(..., reasoner="python")`) or per call (`check_compatibility(..., reasoner="python")`).
+Every backend stops its reasoner and raises `ReasonerTimeout` when the run's `Deadline` passes.
+"""
+import logging
+import subprocess
+import threading
+import time
+import typing as ty
+
+import owlready2 as owl
+import owlready2.reasoning
+
+from . import instrument
+from .budget import Deadline, ReasonerTimeout
+from .daemon import DaemonError, DaemonTimeout, ReasonerDaemon, shared_daemon
+from .pyreasoner import FragmentReasoner, UnsupportedConstruct
+from .types import ScratchOntology
+
+_LOGGER = logging.getLogger(__name__)
+
+# owlready2 stores the reasoners' inferences in this ontology
+INFERENCES_IRI = "http://inferrences/"
+
+
+def record_unsatisfiable(
+        world: owl.World,
+        owl_classes: ty.Iterable[owl.ThingClass],
+        into: ty.Optional[owl.Ontology] = None,
+) -> None:
+    """
+    Assert each of `owl_classes` equivalent to owl:Nothing in the ontology `into`, by default the World's
+    inference ontology.
+    """
+    with into if into is not None else world.get_ontology(INFERENCES_IRI):
+        for owl_cls in owl_classes:
+            if owl.Nothing not in owl_cls.equivalent_to:
+                owl_cls.equivalent_to.append(owl.Nothing)
+
+
+def _inferences(ontology) -> ty.Optional[owl.Ontology]:
+    """Where to record inferences: a scratch ontology keeps them, so they are dropped with it."""
+    return ontology.owl_ontology if isinstance(ontology, ScratchOntology) else None
+
+
+def _target_classes(ontology, classes) -> ty.List[owl.ThingClass]:
+    if classes is None:
+        return list(ontology.owl_ontology.classes())
+    return [cls.owl_cls for cls in classes]
+
+
+class _ReasonerSubprocess:
+    """
+    Stands in for the `subprocess` module in owlready2's reasoning code: adds up the time Java runs, and
+    kills Java (subprocess' own timeout handling) when the deadline passes.
+    """
+    def __init__(self, deadline: Deadline):
+        self.deadline = deadline
+        self.start: ty.Optional[float] = None
+        self.seconds = 0.0
+
+    def __getattr__(self, name):
+        return getattr(subprocess, name)
+
+    def _timed(self, function, *args, **kwargs):
+        start = time.perf_counter()
+        if self.start is None:
+            self.start = start
+        try:
+            return function(*args, timeout=self.deadline.remaining(), **kwargs)
+        except subprocess.TimeoutExpired as e:
+            raise ReasonerTimeout("The reasoner did not finish within its time budget and was stopped") from e
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def run(self, *args, **kwargs):
+        return self._timed(subprocess.run, *args, **kwargs)
+
+    def check_output(self, *args, **kwargs):
+        return self._timed(subprocess.check_output, *args, **kwargs)
+
+
+class _JavaLauncher:
+    """
+    Installed once, for good, as the `subprocess` module of owlready2's reasoning code. While a thread runs
+    `_run_owlready_reasoner`, its Java calls go through that run's `_ReasonerSubprocess`; every other call goes
+    straight to `subprocess`. Runs in different threads never see each other's deadline or timings.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(getattr(self._local, "java", None) or subprocess, name)
+
+    def run_with(self, java: _ReasonerSubprocess, function: ty.Callable, *args) -> None:
+        self._local.java = java
+        try:
+            function(*args)
+        finally:
+            self._local.java = None
+
+
+_JAVA_LAUNCHER = _JavaLauncher()
+_INSTALL_LOCK = threading.Lock()
+
+
+def _install_java_launcher() -> None:
+    with _INSTALL_LOCK:
+        if owlready2.reasoning.subprocess is not _JAVA_LAUNCHER:
+            owlready2.reasoning.subprocess = _JAVA_LAUNCHER
+
+
+def _run_owlready_reasoner(sync: ty.Callable, ontology, deadline: Deadline) -> None:
+    """
+    Run one of owlready2's `sync_reasoner*` functions on the ontology's World, within `deadline`. When
+    instrumentation is enabled, its time is split into `reasoner.jvm` (the Java process) and
+    `reasoner.parse` (the rest).
+    """
+    deadline.check()
+    if not instrument.enabled() and deadline.at is None:
+        with ontology.owl_ontology:
+            sync(ontology.world)
+        return
+    _install_java_launcher()
+    java = _ReasonerSubprocess(deadline)
+    start = time.perf_counter()
+    try:
+        with ontology.owl_ontology:
+            _JAVA_LAUNCHER.run_with(java, sync, ontology.world)
+    finally:
+        if instrument.enabled():
+            seconds = time.perf_counter() - start
+            instrument.emit("reasoner.jvm", java.start if java.start is not None else start, java.seconds)
+            instrument.emit("reasoner.parse", start, seconds - java.seconds)
+
+
+class ReasonerBackend:
+    """Interface of reasoner backends."""
+    name = ""
+
+    def run(self, ontology, classes=None, deadline: Deadline = Deadline()) -> None:
+        """
+        Classify `ontology` and record its unsatisfiable classes. `classes` (OntologyClass objects) are
+        the ones the caller needs answers for; backends may restrict their work to these.
+        Raises `ReasonerTimeout` if the run cannot finish before `deadline`.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class HermitBackend(ReasonerBackend):
+    """HermiT, run by owlready2 in a fresh JVM."""
+    name = "hermit"
+
+    def run(self, ontology, classes=None, deadline: Deadline = Deadline()) -> None:
+        _run_owlready_reasoner(owl.sync_reasoner, ontology, deadline)
+
+
+class PelletBackend(ReasonerBackend):
+    """Pellet, run by owlready2 in a fresh JVM."""
+    name = "pellet"
+
+    def run(self, ontology, classes=None, deadline: Deadline = Deadline()) -> None:
+        _run_owlready_reasoner(owl.sync_reasoner_pellet, ontology, deadline)
+
+
+class DaemonBackend(ReasonerBackend):
+    """
+    HermiT kept warm in a `ReasonerDaemon` (by default the `shared_daemon()`), falling back to a one-shot
+    HermiT run if the daemon fails or cannot be started. A daemon that exceeds the deadline is killed
+    (`shared_daemon()` starts a new one on next use).
+    """
+    name = "daemon"
+
+    def __init__(self, daemon: ty.Optional[ReasonerDaemon] = None):
+        self.daemon = daemon
+
+    def run(self, ontology, classes=None, deadline: Deadline = Deadline()) -> None:
+        daemon = self.daemon if self.daemon is not None else shared_daemon()
+        if daemon is None:
+            HermitBackend().run(ontology, classes, deadline)
+            return
+        try:
+            if classes is None:
+                iris = daemon.unsatisfiable_classes(ontology.world, deadline=deadline)
+                unsatisfiable = [ontology.world[iri] for iri in iris]
+            else:
+                iris = [cls.owl_cls.iri for cls in classes]
+                satisfiable = daemon.is_satisfiable(ontology.world, iris, deadline=deadline)
+                unsatisfiable = [cls.owl_cls for cls in classes if not satisfiable[cls.owl_cls.iri]]
+        except DaemonTimeout as e:
+            raise ReasonerTimeout(str(e)) from e
+        except DaemonError as e:
+            _LOGGER.warning("Reasoner daemon failed (%s), falling back to a one-shot reasoner run", e)
+            HermitBackend().run(ontology, classes, deadline)
+            return
+        with instrument.timed("reasoner.parse"):
+            record_unsatisfiable(ontology.world, [cls for cls in unsatisfiable if cls is not None], _inferences(ontology))
+
+
+class PythonBackend(ReasonerBackend):
+    """
+    The in-process `FragmentReasoner`. Ontologies outside its fragment are handed to `fallback`
+    (HermiT by default), or raise `UnsupportedConstruct` if `fallback` is None.
+    """
+    name = "python"
+
+    def __init__(self, fallback: ty.Optional[ReasonerBackend] = HermitBackend()):
+        self.fallback = fallback
+
+    def run(self, ontology, classes=None, deadline: Deadline = Deadline()) -> None:
+        try:
+            reasoner = FragmentReasoner(ontology.world, deadline)
+            unsatisfiable = reasoner.unsatisfiable(_target_classes(ontology, classes))
+        except UnsupportedConstruct:
+            if self.fallback is None:
+                raise
+            self.fallback.run(ontology, classes, deadline)
+            return
+        record_unsatisfiable(ontology.world, unsatisfiable, _inferences(ontology))
+
+
+BACKENDS: ty.Dict[str, ty.Type[ReasonerBackend]] = {
+    HermitBackend.name: HermitBackend,
+    PelletBackend.name: PelletBackend,
+    DaemonBackend.name: DaemonBackend,
+    PythonBackend.name: PythonBackend,
+}
+DEFAULT_BACKEND = HermitBackend.name
+
+
+def get_backend(reasoner: ty.Union[str, ReasonerBackend, ReasonerDaemon, None] = None) -> ReasonerBackend:
+    """Resolve a backend name, backend or daemon (None meaning the default backend) to a backend."""
+    if reasoner is None:
+        reasoner = DEFAULT_BACKEND
+    if isinstance(reasoner, ReasonerBackend):
+        return reasoner
+    if isinstance(reasoner, ReasonerDaemon):
+        return DaemonBackend(reasoner)
+    if isinstance(reasoner, str):
+        try:
+            return BACKENDS[reasoner]()
+        except KeyError:
+            raise ValueError(f"Unknown reasoner {reasoner!r}, expected one of {sorted(BACKENDS)}") from None
+    raise TypeError(f"Unsupported reasoner: {reasoner!r}")
@@ -0,0 +1,35 @@
+"""
+Time budgets for reasoner runs. A `Deadline` is handed to the reasoner backend, which stops the reasoner
+(killing its Java process, or abandoning the in-process search) and raises `ReasonerTimeout` once the
+deadline has passed.
+"""
+import time
+import typing as ty
+
+import attrs
+
+
+class ReasonerTimeout(TimeoutError):
+    """A reasoner run exceeded its time budget and was stopped."""
+
+
+@attrs.define(frozen=True)
+class Deadline:
+    at: ty.Optional[float] = None  # time.monotonic() value, None for no limit
+
+    @classmethod
+    def after(cls, seconds: ty.Optional[float]) -> "Deadline":
+        """The deadline `seconds` from now (no limit if None)."""
+        return cls(None if seconds is None else time.monotonic() + seconds)
+
+    def remaining(self) -> ty.Optional[float]:
+        """Seconds left, or None without a limit. Raises `ReasonerTimeout` once the deadline has passed."""
+        if self.at is None:
+            return None
+        left = self.at - time.monotonic()
+        if left <= 0:
+            raise ReasonerTimeout("The reasoner's time budget is exhausted")
+        return left
+
+    def check(self) -> None:
+        self.remaining()
@@ -0,0 +1,248 @@
+"""
+Persistent on-disk cache of compatibility verdicts and explanations.
+
+Classes are identified by a content hash of every axiom that can influence their satisfiability: their own
+and their ancestors' superclass and equivalence axioms, the restrictions on them, the definitions of the
+properties and filler classes those restrictions mention, the model's defined classes, and the disjointness
+axioms touching any of these (the signature a module is extracted for, see `modules.module_signature`).
+A cached verdict is reused whenever both classes of a pair hash to the same values again, in either order,
+even across runs.
+"""
+import hashlib
+import importlib.metadata
+import json
+import os
+import sqlite3
+import time
+import typing as ty
+from pathlib import Path
+
+import attrs
+import owlready2 as owl
+
+from .modules import module_signature
+from .types import OntologyClass
+
+# Bump whenever the fingerprint or the stored format changes
+CACHE_FORMAT_VERSION = 3
+
+DEFAULT_CACHE_PATH = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "pydmsd" / "verdicts.sqlite3"
+DEFAULT_MAX_ENTRIES = 100_000
+# Cache hits are written back in batches of this many (and when the cache is closed)
+USAGE_FLUSH_SIZE = 1000
+
+# The modules of this package that take part in deciding a verdict: the decision engine, the backends and
+# reasoners, how closed world intersections and the restriction index are built, and the fingerprints
+VERDICT_MODULES = ("reasoner", "backends", "pyreasoner", "daemon", "modules", "types", "cache")
+
+
+def _render(expr) -> str:
+    """Render a class expression in a canonical, namespace-independent form."""
+    if isinstance(expr, (owl.ThingClass, owl.PropertyClass)):
+        return expr.iri
+    if isinstance(expr, owl.Restriction):
+        return f"({_render(expr.property)} {expr.type} {expr.cardinality} {_render(expr.value)})"
+    if isinstance(expr, (owl.And, owl.Or)):
+        operands = " ".join(sorted(_render(c) for c in expr.Classes))
+        return f"({type(expr).__name__} {operands})"
+    if isinstance(expr, owl.Not):
+        return f"(Not {_render(expr.Class)})"
+    if isinstance(expr, owl.Inverse):
+        return f"(Inverse {_render(expr.property)})"
+    if isinstance(expr, owl.OneOf):
+        return f"(OneOf {' '.join(sorted(_render(i) for i in expr.instances))})"
+    if isinstance(expr, owl.Thing):
+        return expr.iri
+    if isinstance(expr, type):
+        return f"{expr.__module__}.{expr.__qualname__}"
+    return repr(expr)
+
+
+def relevant_axioms(owl_cls: owl.ThingClass, owl_ontology: owl.Ontology) -> ty.Set[str]:
+    """
+    Collect the rendered axioms that can influence the satisfiability of `owl_cls` in `owl_ontology`,
+    i.e. the axioms about every entity in the signature of its module (see `modules.module_signature`).
+    """
+    axioms: ty.Set[str] = set()
+    for entity in module_signature([owl_cls], owl_ontology):
+        if isinstance(entity, owl.ThingClass):
+            for sup in entity.is_a:
+                axioms.add(f"{entity.iri} SubClassOf {_render(sup)}")
+            for equivalent in entity.equivalent_to:
+                axioms.add(f"{entity.iri} EquivalentTo {_render(equivalent)}")
+            for disjoint in entity.disjoints():
+                axioms.add(f"DisjointClasses {' '.join(sorted(_render(e) for e in disjoint.entities))}")
+        else:
+            for sup in entity.is_a:
+                axioms.add(f"{entity.iri} SubPropertyOf {_render(sup)}")
+            for domain in entity.domain:
+                axioms.add(f"{entity.iri} Domain {_render(domain)}")
+            for range_type in entity.range:
+                axioms.add(f"{entity.iri} Range {_render(range_type)}")
+            inverse = getattr(entity, "inverse_property", None)
+            if inverse is not None:
+                axioms.add(f"{entity.iri} InverseOf {inverse.iri}")
+    return axioms
+
+
+def class_fingerprint(ontology_class: OntologyClass) -> str:
+    """Content hash of `ontology_class` and every axiom relevant to its satisfiability."""
+    digest = hashlib.sha256(ontology_class.owl_cls.iri.encode())
+    for axiom in sorted(relevant_axioms(ontology_class.owl_cls, ontology_class.ontology.owl_ontology)):
+        digest.update(b"\n")
+        digest.update(axiom.encode())
+    return digest.hexdigest()
+
+
+def verdict_key(class1: OntologyClass, class2: OntologyClass) -> ty.Tuple[str, str]:
+    """Cache key of the verdict on a pair. Compatibility is symmetric, so both orders share one entry."""
+    key1, key2 = sorted((class_fingerprint(class1), class_fingerprint(class2)))
+    return key1, key2
+
+
+def _pydmsd_version() -> str:
+    try:
+        return importlib.metadata.version("PyDMSD")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def environment_fingerprint() -> str:
+    """
+    Identify everything outside the model that a verdict depends on: the cache format, the pydmsd release
+    and the source of every module in `VERDICT_MODULES`, and the owlready2 release (which bundles the reasoners).
+    """
+    digest = hashlib.sha256(
+        f"format={CACHE_FORMAT_VERSION};pydmsd={_pydmsd_version()};owlready2={owl.VERSION}".encode()
+    )
+    for name in VERDICT_MODULES:
+        digest.update(f"\n{name}\n".encode())
+        digest.update((Path(__file__).parent / f"{name}.py").read_bytes())
+    return digest.hexdigest()
+
+
+@attrs.define
+class CachedVerdict:
+    is_compatible: ty.Optional[bool] = None
+    explanation: ty.Optional[ty.Dict[str, ty.Any]] = None
+
+
+class VerdictCache:
+    """
+    SQLite-backed cache of verdicts and explanations keyed by a pair of class fingerprints.
+
+    Holds at most `max_entries` pairs, evicting the least recently used ones first. Lookups only record
+    when an entry was used; these times are written in batches, before evicting and on `close()`. All
+    entries are dropped when the cache is opened from a different environment (see `environment_fingerprint`).
+    """
+    def __init__(
+            self,
+            path: ty.Union[str, Path] = DEFAULT_CACHE_PATH,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            environment: ty.Optional[str] = None,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.environment = environment if environment is not None else environment_fingerprint()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key1 TEXT, key2 TEXT, is_compatible INTEGER, explanation TEXT, last_used REAL, "
+                "PRIMARY KEY (key1, key2))"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used)")
+        # last use of the entries looked up since the last flush
+        self._used: ty.Dict[ty.Tuple[str, str], float] = {}
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'environment'").fetchone()
+        if row is None or row[0] != self.environment:
+            self.clear()
+        else:
+            self._size = len(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    def flush(self) -> None:
+        """Write the recorded usage of looked-up entries to the database."""
+        if not self._used:
+            return
+        with self._connection:
+            self._connection.executemany(
+                "UPDATE verdicts SET last_used = ? WHERE key1 = ? AND key2 = ?",
+                [(last_used, key1, key2) for (key1, key2), last_used in self._used.items()],
+            )
+        self._used.clear()
+
+    def clear(self) -> None:
+        """Drop every cached entry, e.g. after upgrading the reasoner."""
+        with self._connection:
+            self._connection.execute("DELETE FROM verdicts")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('environment', ?)", (self.environment,)
+            )
+        self._used.clear()
+        self._size = 0
+
+    def get(self, key1: str, key2: str) -> ty.Optional[CachedVerdict]:
+        row = self._connection.execute(
+            "SELECT is_compatible, explanation FROM verdicts WHERE key1 = ? AND key2 = ?", (key1, key2)
+        ).fetchone()
+        if row is None:
+            return None
+        self._used[key1, key2] = time.time()
+        if len(self._used) >= USAGE_FLUSH_SIZE:
+            self.flush()
+        is_compatible, explanation = row
+        return CachedVerdict(
+            is_compatible=None if is_compatible is None else bool(is_compatible),
+            explanation=None if explanation is None else json.loads(explanation),
+        )
+
+    def put_verdict(self, key1: str, key2: str, is_compatible: bool) -> None:
+        self._put(key1, key2, "is_compatible", int(is_compatible))
+
+    def put_explanation(self, key1: str, key2: str, explanation: ty.Dict[str, ty.Any]) -> None:
+        self._put(key1, key2, "explanation", json.dumps(explanation))
+
+    def _put(self, key1: str, key2: str, column: str, value) -> None:
+        self._used.pop((key1, key2), None)
+        with self._connection:
+            inserted = self._connection.execute(
+                f"INSERT OR IGNORE INTO verdicts (key1, key2, {column}, last_used) VALUES (?, ?, ?, ?)",
+                (key1, key2, value, time.time()),
+            ).rowcount
+            if not inserted:
+                self._connection.execute(
+                    f"UPDATE verdicts SET {column} = ?, last_used = ? WHERE key1 = ? AND key2 = ?",
+                    (value, time.time(), key1, key2),
+                )
+        self._size += inserted
+        if self._size > self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        self.flush()
+        with self._connection:
+            # other processes may share the file, so only trust the count kept here to trigger eviction
+            self._size = len(self)
+            excess = self._size - self.max_entries
+            if excess > 0:
+                self._connection.execute(
+                    "DELETE FROM verdicts WHERE rowid IN (SELECT rowid FROM verdicts ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._size -= excess
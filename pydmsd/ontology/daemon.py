@@ -0,0 +1,320 @@
+"""
+Long-lived reasoner process. `owl.sync_reasoner()` starts a fresh JVM, loads HermiT and parses the whole
+ontology on every call, which dominates the cost of reasoning over small models. `ReasonerDaemon` instead
+keeps HermiT warm in a subprocess (hosting the JVM through JPype) and only sends it the triples that changed
+since the previous request.
+
+The subprocess speaks JSON lines over stdin/stdout. Requests are objects with an "op" key:
+    {"op": "ping"}
+    {"op": "add", "triples": "<N-Triples>"}      add the axioms in a fragment
+    {"op": "remove", "triples": "<N-Triples>"}   remove the logical axioms in a fragment
+    {"op": "reset"}                              drop every axiom
+    {"op": "satisfiable", "iris": [...]}         satisfiability of named classes
+    {"op": "unsatisfiable"}                      all unsatisfiable named classes
+    {"op": "shutdown"}
+Responses are {"ok": true, ...} or {"ok": false, "error": "<message>"}.
+
+JPype is an optional dependency (the `daemon` extra, and one of the Pipfile's dev packages). When it (or Java)
+is missing, `shared_daemon()` returns None and callers fall back to the one-shot `owl.sync_reasoner()` path.
+"""
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import typing as ty
+
+import owlready2 as owl
+
+from . import instrument
+from .budget import Deadline, ReasonerTimeout
+
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+OWL_IMPORTS = "<http://www.w3.org/2002/07/owl#imports>"
+
+
+class DaemonError(RuntimeError):
+    """The reasoner daemon failed to answer a request."""
+
+
+class DaemonUnavailable(DaemonError):
+    """The reasoner daemon could not be started (e.g. JPype or Java is not installed)."""
+
+
+class DaemonTimeout(DaemonError):
+    """A request exceeded its deadline; the daemon was killed."""
+
+
+def _serialize_world(world: owl.World) -> ty.List[str]:
+    """
+    Every triple of `world` except its imports: the whole World is sent, so an import (e.g. a scratch
+    ontology's import of its model) would only make the daemon try to download the imported ontology.
+    """
+    buffer = io.BytesIO()
+    world.save(file=buffer, format="ntriples")
+    lines = buffer.getvalue().decode("utf-8").splitlines()
+    return [line for line in lines if line.split(" ", 2)[1:2] != [OWL_IMPORTS]]
+
+
+def _terms(line: str) -> ty.List[str]:
+    """Subject, predicate and object of an N-Triples line (literals are returned unparsed)."""
+    subject, predicate, rest = line.split(" ", 2)
+    return [subject, predicate, rest.rstrip(" .")]
+
+
+def _fragment(changed: ty.Set[str], lines: ty.Iterable[str]) -> str:
+    """
+    Complete the `changed` triples into a fragment that parses on its own: add every triple describing a blank
+    node they mention (restrictions, lists, ...) and the type declarations of every named entity they mention.
+    """
+    by_subject: ty.Dict[str, ty.List[str]] = {}
+    for line in lines:
+        by_subject.setdefault(line.split(" ", 1)[0], []).append(line)
+
+    fragment = set(changed)
+    pending = list(changed)
+    named = set()
+    while pending:
+        for term in _terms(pending.pop()):
+            if term.startswith("_:"):
+                for line in by_subject.get(term, ()):
+                    if line not in fragment:
+                        fragment.add(line)
+                        pending.append(line)
+            elif term.startswith("<"):
+                named.add(term)
+    for term in named:
+        fragment.update(line for line in by_subject.get(term, ()) if line.split(" ", 2)[1] == RDF_TYPE)
+    return "\n".join(sorted(fragment))
+
+
+class ReasonerDaemon:
+    """Client for a reasoner subprocess that keeps HermiT loaded between requests."""
+    def __init__(self, java_memory: ty.Optional[int] = None):
+        command = [sys.executable, "-m", "pydmsd.ontology.daemon"]
+        if java_memory is not None:
+            command.append(f"-Xmx{java_memory}M")
+        try:
+            self._process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8"
+            )
+        except OSError as e:
+            raise DaemonUnavailable(f"Could not start reasoner daemon: {e}") from e
+        self._lock = threading.Lock()
+        self._world: ty.Optional[owl.World] = None
+        self._lines: ty.Set[str] = set()
+        try:
+            self._request(op="ping")
+        except DaemonError as e:
+            self.close()
+            raise DaemonUnavailable(str(e)) from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def _kill(self, expired: threading.Event) -> None:
+        expired.set()
+        self._process.kill()
+
+    def _request(self, deadline: Deadline = Deadline(), **request) -> ty.Dict[str, ty.Any]:
+        """Send `request` and wait for the response, killing the daemon if `deadline` passes first."""
+        try:
+            timeout = deadline.remaining()
+        except ReasonerTimeout as e:
+            raise DaemonTimeout(str(e)) from e
+        expired = threading.Event()
+        timer = threading.Timer(timeout, self._kill, [expired]) if timeout is not None else None
+        with self._lock, instrument.timed("reasoner.jvm", op=request["op"]):
+            if timer is not None:
+                timer.start()
+            try:
+                self._process.stdin.write(json.dumps(request) + "\n")
+                self._process.stdin.flush()
+                line = self._process.stdout.readline()
+            except (BrokenPipeError, ValueError) as e:
+                raise DaemonError("Reasoner daemon is not running") from e
+            finally:
+                if timer is not None:
+                    timer.cancel()
+        if expired.is_set():
+            self._process.wait()
+            raise DaemonTimeout(f"Reasoner daemon did not answer {request['op']!r} within {timeout:.3g}s and was stopped")
+        if not line:
+            raise DaemonError("Reasoner daemon exited unexpectedly")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "unknown error"))
+        return response
+
+    def sync(self, world: owl.World, deadline: Deadline = Deadline()) -> None:
+        """Bring the daemon's copy of the axioms up to date with `world`, sending only the differences."""
+        lines = _serialize_world(world)
+        current = set(lines)
+        if world is not self._world:
+            self._request(deadline, op="reset")
+            self._world, self._lines = world, set()
+
+        removed = self._lines - current
+        added = current - self._lines
+        if removed:
+            self._request(deadline, op="remove", triples=_fragment(removed, self._lines))
+        if added:
+            self._request(deadline, op="add", triples=_fragment(added, lines))
+        self._lines = current
+
+    def is_satisfiable(
+            self, world: owl.World, iris: ty.Iterable[str], deadline: Deadline = Deadline(),
+    ) -> ty.Dict[str, bool]:
+        """Satisfiability of each named class in `iris`, after syncing `world`."""
+        self.sync(world, deadline)
+        return self._request(deadline, op="satisfiable", iris=list(iris))["satisfiable"]
+
+    def unsatisfiable_classes(self, world: owl.World, deadline: Deadline = Deadline()) -> ty.Set[str]:
+        """IRIs of every unsatisfiable named class in `world`."""
+        self.sync(world, deadline)
+        return set(self._request(deadline, op="unsatisfiable")["iris"])
+
+    def close(self) -> None:
+        if self.alive:
+            try:
+                self._request(op="shutdown")
+            except DaemonError:
+                pass
+        if self.alive:
+            self._process.kill()
+        self._process.wait()
+
+
+_shared_daemon: ty.Optional[ReasonerDaemon] = None
+_shared_daemon_failed = False
+
+
+def shared_daemon() -> ty.Optional[ReasonerDaemon]:
+    """A process-wide daemon, started on first use. Returns None if no daemon can be started."""
+    global _shared_daemon, _shared_daemon_failed
+    if _shared_daemon is not None and _shared_daemon.alive:
+        return _shared_daemon
+    if _shared_daemon_failed:
+        return None
+    try:
+        _shared_daemon = ReasonerDaemon()
+    except DaemonUnavailable:
+        _shared_daemon_failed = True
+        return None
+    return _shared_daemon
+
+
+# Server side (runs in the subprocess)
+
+
+def _jvm_path() -> str:
+    """Locate libjvm for the Java executable owlready2 is configured to use."""
+    import jpype
+
+    java = owl.JAVA_EXE if os.path.isabs(owl.JAVA_EXE) else shutil.which(owl.JAVA_EXE)
+    if java:
+        java_home = os.path.dirname(os.path.dirname(os.path.realpath(java)))
+        for candidate in ("lib/server/libjvm.so", "lib/server/libjvm.dylib", "bin/server/jvm.dll"):
+            path = os.path.join(java_home, candidate)
+            if os.path.exists(path):
+                return path
+    return jpype.getDefaultJVMPath()
+
+
+class _HermitServer:
+    def __init__(self, jvm_args: ty.List[str]):
+        import jpype
+        import jpype.imports  # noqa: F401 (enables Java imports)
+
+        hermit_jar = os.path.join(os.path.dirname(owl.__file__), "hermit", "HermiT.jar")
+        # native access is granted to JPype itself; older JVMs ignore the option
+        jpype.startJVM(
+            _jvm_path(), "--enable-native-access=ALL-UNNAMED", *jvm_args,
+            classpath=[hermit_jar], ignoreUnrecognized=True,
+        )
+        # keep the protocol channel clean of anything Java prints
+        jpype.java.lang.System.setOut(jpype.java.lang.System.err)
+
+        from org.semanticweb.owlapi.apibinding import OWLManager
+        from org.semanticweb.owlapi.io import StringDocumentSource
+        from org.semanticweb.owlapi.model import IRI
+        from org.semanticweb.HermiT import Reasoner
+
+        self._IRI = IRI
+        self._StringDocumentSource = StringDocumentSource
+        self._manager = OWLManager.createOWLOntologyManager()
+        self._factory = self._manager.getOWLDataFactory()
+        self._ontology = self._manager.createOntology()
+        self._reasoner = Reasoner.ReasonerFactory().createReasoner(self._ontology)
+
+    def _parse(self, triples: str):
+        fragment = self._manager.loadOntologyFromOntologyDocument(self._StringDocumentSource(triples))
+        axioms = fragment.getAxioms()
+        self._manager.removeOntology(fragment)
+        return axioms
+
+    def handle(self, request: ty.Dict[str, ty.Any]) -> ty.Dict[str, ty.Any]:
+        op = request["op"]
+        if op == "ping":
+            return {}
+        if op == "add":
+            self._manager.addAxioms(self._ontology, self._parse(request["triples"]))
+            return {}
+        if op == "remove":
+            axioms = [a for a in self._parse(request["triples"]) if a.isLogicalAxiom()]
+            for axiom in axioms:
+                self._manager.removeAxiom(self._ontology, axiom)
+            return {}
+        if op == "reset":
+            self._manager.removeAxioms(self._ontology, self._ontology.getAxioms())
+            return {}
+        if op == "satisfiable":
+            self._reasoner.flush()
+            return {"satisfiable": {
+                iri: bool(self._reasoner.isSatisfiable(self._factory.getOWLClass(self._IRI.create(iri))))
+                for iri in request["iris"]
+            }}
+        if op == "unsatisfiable":
+            self._reasoner.flush()
+            classes = self._reasoner.getUnsatisfiableClasses().getEntitiesMinusBottom()
+            return {"iris": [str(cls.getIRI().toString()) for cls in classes]}
+        raise ValueError(f"Unknown op {op!r}")
+
+
+def serve(jvm_args: ty.List[str]) -> None:
+    """Answer requests from stdin until shutdown or end of input."""
+    protocol = sys.stdout
+    sys.stdout = sys.stderr  # anything else printed must not corrupt the protocol
+
+    def respond(response):
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+    try:
+        server = _HermitServer(jvm_args)
+    except Exception as e:
+        respond({"ok": False, "error": f"Could not start HermiT: {e}"})
+        return
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request["op"] == "shutdown":
+            respond({"ok": True})
+            return
+        try:
+            respond({"ok": True, **server.handle(request)})
+        except Exception as e:
+            respond({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1:])
@@ -0,0 +1,188 @@
+"""
+Model diffs and incremental re-checks. `diff_models` compares two versions of a model entity by entity and
+works out which classes changed, either directly or through anything their satisfiability depends on (an
+ancestor, a restricted property, a filler class; see `modules.signature`). `recheck` then decides only the
+pairs involving changed classes and carries every other result over from the previous matrix:
+
+    matrix = check_compatibility_matrix(classes_v1)
+    ...  # edit the model, or load its next version
+    result = recheck(classes_v2, diff_models(model_v1, model_v2), matrix)
+
+Entities are matched by name, and axioms are compared by IRI, so both versions must use the same namespace.
+"""
+import typing as ty
+
+import attrs
+import owlready2 as owl
+
+from .cache import _render
+from .modules import signature
+from .reasoner import (
+    CompatibilityMatrix,
+    DecisionTier,
+    IncompatibilityExplanation,
+    Reasoner,
+    _assemble_matrix,
+    _matrix_pairs,
+    _reasoner_pass,
+    _structural_pass,
+    _unwrap_ontology_class,
+    explain_incompatibilities,
+)
+from .types import Ontology, OntologyClass
+
+
+def _unwrap_ontology(model) -> Ontology:
+    return model if isinstance(model, Ontology) else model.ontology
+
+
+def _own_axioms(entity) -> ty.FrozenSet[str]:
+    """The rendered axioms about `entity` itself (not its ancestors)."""
+    axioms = set()
+    if isinstance(entity, owl.ThingClass):
+        axioms.update(f"SubClassOf {_render(sup)}" for sup in entity.is_a)
+        axioms.update(f"EquivalentTo {_render(equivalent)}" for equivalent in entity.equivalent_to)
+        for disjoint in entity.disjoints():
+            axioms.add(f"DisjointClasses {' '.join(sorted(_render(e) for e in disjoint.entities))}")
+    else:
+        axioms.update(f"SubPropertyOf {_render(sup)}" for sup in entity.is_a)
+        axioms.update(f"Domain {_render(domain)}" for domain in entity.domain)
+        axioms.update(f"Range {_render(range_type)}" for range_type in entity.range)
+        inverse = getattr(entity, "inverse_property", None)
+        if inverse is not None:
+            axioms.add(f"InverseOf {inverse.iri}")
+    return frozenset(axioms)
+
+
+def _entities(ontology: Ontology) -> ty.Dict[str, ty.Any]:
+    entities = {prop.name: prop for prop in ontology.owl_ontology.properties()}
+    entities.update((owl_cls.name, owl_cls) for owl_cls in ontology.owl_ontology.classes())
+    return entities
+
+
+@attrs.define
+class ModelDiff:
+    """Names of the classes that differ between two versions of a model."""
+    added: ty.Set[str]
+    removed: ty.Set[str]
+    modified: ty.Set[str]  # own superclasses, restrictions, equivalences or disjointness changed
+    inherited: ty.Set[str]  # unchanged themselves, but something in their signature changed
+
+    @property
+    def changed(self) -> ty.Set[str]:
+        """Every class whose compatibility results may differ from the previous version's."""
+        return self.added | self.removed | self.modified | self.inherited
+
+    def __bool__(self):
+        return bool(self.changed)
+
+    def __str__(self):
+        parts = []
+        for label, names in (("added", self.added), ("removed", self.removed),
+                             ("modified", self.modified), ("changed through dependencies", self.inherited)):
+            if names:
+                parts.append(f"{label}: {', '.join(sorted(names))}")
+        return "\n".join(parts) if parts else "no changes"
+
+
+def diff_models(old, new) -> ModelDiff:
+    """Compare two versions of a model (`Ontology` objects, or FACE/FHIR data models)."""
+    old_entities = _entities(_unwrap_ontology(old))
+    new_entities = _entities(_unwrap_ontology(new))
+
+    changed_entities = (old_entities.keys() ^ new_entities.keys()) | {
+        name for name in old_entities.keys() & new_entities.keys()
+        if _own_axioms(old_entities[name]) != _own_axioms(new_entities[name])
+    }
+
+    def is_class(entities, name):
+        return isinstance(entities.get(name), owl.ThingClass)
+
+    added = {name for name in new_entities.keys() - old_entities.keys() if is_class(new_entities, name)}
+    removed = {name for name in old_entities.keys() - new_entities.keys() if is_class(old_entities, name)}
+    modified = {
+        name for name in changed_entities - added - removed
+        if is_class(old_entities, name) and is_class(new_entities, name)
+    }
+    inherited = set()
+    for name in old_entities.keys() & new_entities.keys():
+        if name in modified or not is_class(new_entities, name):
+            continue
+        # a link to a changed entity may have been added or dropped, so look in both versions' signatures
+        dependencies = {e.name for e in signature([old_entities[name]]) | signature([new_entities[name]])}
+        if dependencies & changed_entities:
+            inherited.add(name)
+    return ModelDiff(added=added, removed=removed, modified=modified, inherited=inherited)
+
+
+@attrs.define
+class RecheckResult:
+    matrix: CompatibilityMatrix
+    # explanation of every incompatible pair that was rechecked or had an explanation to carry over
+    explanations: ty.Dict[ty.Tuple[str, str], IncompatibilityExplanation]
+    rechecked: ty.List[ty.Tuple[str, str]]  # pairs decided anew, all others were carried over
+
+
+def _carried_explanation(explanations, first: str, second: str):
+    if (first, second) in explanations:
+        return explanations[first, second]
+    return explanations.get((second, first))
+
+
+def recheck(
+        classes,
+        diff: ModelDiff,
+        previous: CompatibilityMatrix,
+        explanations: ty.Optional[ty.Dict[ty.Tuple[str, str], IncompatibilityExplanation]] = None,
+        structural: bool = False,
+        reasoner: Reasoner = None,
+) -> RecheckResult:
+    """
+    Compatibility matrix of `classes` (from the new version of the model), deciding only the pairs that
+    involve a class in `diff.changed` or missing from `previous`, all with a single reasoner run. Other
+    pairs keep their `previous` results and are marked `DecisionTier.CACHED`.
+
+    Incompatible pairs that are rechecked are explained anew with `explain_incompatibilities`; those carried
+    over keep their explanation from `explanations` (keyed by pairs of class names), if given.
+    `structural` and `reasoner` are as for `check_compatibility_matrix`.
+    """
+    classes: ty.List[OntologyClass] = [_unwrap_ontology_class(cls) for cls in classes]
+    names = [cls.name for cls in classes]
+    known = set(previous.names)
+    stale = {name for name in names if name in diff.changed or name not in known}
+
+    carried, pairs = {}, []
+    for i, j in _matrix_pairs(len(classes)):
+        if names[i] in stale or names[j] in stale:
+            pairs.append((i, j))
+        else:
+            carried[i, j] = previous[names[i], names[j]]
+
+    if structural:
+        structural_results, pairs = _structural_pass(classes, pairs)
+    else:
+        structural_results = {}
+    reasoner_results = _reasoner_pass(classes, pairs, reasoner)
+    rechecked_results = {**structural_results, **reasoner_results}
+
+    matrix = _assemble_matrix(names, structural_results, reasoner_results)
+    for (i, j), is_compatible in carried.items():
+        matrix.values[i][j] = matrix.values[j][i] = is_compatible
+        matrix.tiers[i][j] = matrix.tiers[j][i] = DecisionTier.CACHED
+
+    new_explanations = {}
+    for (i, j), is_compatible in sorted({**carried, **rechecked_results}.items()):
+        if is_compatible or i == j:
+            continue
+        if (i, j) in carried:
+            explanation = _carried_explanation(explanations or {}, names[i], names[j])
+            if explanation is not None:
+                new_explanations[names[i], names[j]] = explanation
+        else:
+            new_explanations[names[i], names[j]] = explain_incompatibilities(classes[i], classes[j])
+
+    return RecheckResult(
+        matrix=matrix,
+        explanations=new_explanations,
+        rechecked=sorted((names[i], names[j]) for i, j in rechecked_results),
+    )
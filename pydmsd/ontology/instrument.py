@@ -0,0 +1,195 @@
+"""
+Instrumentation. Model construction, intersection classes and reasoner runs report timed events to every
+registered sink. Without sinks, instrumented code only pays for one list check.
+
+    with instrument.collect() as stats:
+        reasoner.check_compatibility(A, B)
+    print(stats)
+
+Events:
+    model.<method>        an `Ontology.define_*` or `OntologyClass.add_*` call (any `types.mutator` method)
+    intersection.build    defining a closed world intersection class
+    intersection.destroy  dropping the scratch ontology of intersection classes after a check
+    reasoner.run          a whole reasoner run; fields: backend, classes, restrictions and triples sent
+    reasoner.jvm          wall time of the Java reasoner (HermiT, Pellet or the daemon's request)
+    reasoner.parse        the rest of an owlready2 reasoner run (writing its input, reading and applying its
+                          results), or recording the daemon's answers in the model
+"""
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import typing as ty
+
+import attrs
+import owlready2 as owl
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@attrs.define
+class Event:
+    name: str
+    start: float  # time.perf_counter() at the start of the event
+    seconds: float
+    fields: ty.Dict[str, ty.Any] = attrs.Factory(dict)
+
+
+class Sink:
+    """Receives every event while registered with `add_sink`."""
+    def emit(self, event: Event) -> None:
+        raise NotImplementedError
+
+
+class LoggingSink(Sink):
+    """Logs each event (by default to the `pydmsd.ontology.instrument` logger at DEBUG level)."""
+    def __init__(self, logger: ty.Optional[logging.Logger] = None, level: int = logging.DEBUG):
+        self.logger = logger if logger is not None else _LOGGER
+        self.level = level
+
+    def emit(self, event: Event) -> None:
+        fields = " ".join(f"{key}={value}" for key, value in event.fields.items())
+        self.logger.log(self.level, "%s took %.4fs %s", event.name, event.seconds, fields)
+
+
+@attrs.define
+class EventStats:
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    totals: ty.Dict[str, float] = attrs.Factory(dict)  # sums of the events' numeric fields
+
+
+class Stats(Sink):
+    """Aggregates events by name: how often they happened, how long they took, and their numeric fields."""
+    def __init__(self):
+        self.events: ty.Dict[str, EventStats] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event: Event) -> None:
+        with self._lock:
+            stats = self.events.setdefault(event.name, EventStats())
+            stats.count += 1
+            stats.seconds += event.seconds
+            stats.max_seconds = max(stats.max_seconds, event.seconds)
+            for key, value in event.fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stats.totals[key] = stats.totals.get(key, 0) + value
+
+    def __getitem__(self, name: str) -> EventStats:
+        return self.events.get(name, EventStats())
+
+    def seconds(self, prefix: str = "") -> float:
+        """Total time of the events whose names start with `prefix`. Nested events are counted in full."""
+        return sum(stats.seconds for name, stats in self.events.items() if name.startswith(prefix))
+
+    def as_dict(self) -> ty.Dict[str, ty.Any]:
+        return {name: attrs.asdict(stats) for name, stats in sorted(self.events.items())}
+
+    def __str__(self):
+        width = max((len(name) for name in self.events), default=5)
+        rows = [f"{'event'.ljust(width)} {'count':>7} {'total (s)':>10} {'max (s)':>10}"]
+        for name, stats in sorted(self.events.items()):
+            rows.append(f"{name.ljust(width)} {stats.count:>7} {stats.seconds:>10.4f} {stats.max_seconds:>10.4f}")
+        return "\n".join(rows)
+
+
+class TraceFile(Sink):
+    """
+    Writes events to `path` in the Chrome trace event format, which chrome://tracing and Perfetto display as
+    nested spans. Events are appended as they happen; `close()` terminates the JSON array.
+    """
+    def __init__(self, path: ty.Union[str, os.PathLike]):
+        self._file = open(path, "w")
+        self._file.write("[\n")
+        self._first = True
+        self._lock = threading.Lock()
+
+    def emit(self, event: Event) -> None:
+        record = {
+            "name": event.name,
+            "ph": "X",
+            "ts": event.start * 1e6,
+            "dur": event.seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": event.fields,
+        }
+        with self._lock:
+            self._file.write(("" if self._first else ",\n") + json.dumps(record, default=str))
+            self._first = False
+            self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.write("\n]\n")
+            self._file.close()
+
+
+_sinks: ty.List[Sink] = []
+
+
+def add_sink(sink: Sink) -> Sink:
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink: Sink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def enabled() -> bool:
+    """True if any sink is registered, i.e. events will be recorded."""
+    return bool(_sinks)
+
+
+@contextlib.contextmanager
+def sink(sink: Sink) -> ty.Iterator[Sink]:
+    """Register `sink` for the duration of the block."""
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+
+@contextlib.contextmanager
+def collect() -> ty.Iterator[Stats]:
+    """Collect the events of the block into a `Stats` object."""
+    with sink(Stats()) as stats:
+        yield stats
+
+
+def emit(name: str, start: float, seconds: float, **fields) -> None:
+    event = Event(name, start, seconds, fields)
+    for registered in list(_sinks):
+        registered.emit(event)
+
+
+@contextlib.contextmanager
+def timed(name: str, **fields) -> ty.Iterator[ty.Dict[str, ty.Any]]:
+    """
+    Time the block as event `name`. Yields the event's fields, so the block can add to them
+    (e.g. sizes only known once it ran). Nothing is recorded if no sink is registered.
+    """
+    if not _sinks:
+        yield fields
+        return
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        emit(name, start, time.perf_counter() - start, **fields)
+
+
+def ontology_size(ontology) -> ty.Dict[str, int]:
+    """Size of what a reasoner run sends: classes, restrictions and RDF triples in the ontology's World."""
+    classes = list(ontology.world.classes())
+    return {
+        "classes": len(classes),
+        "restrictions": sum(1 for owl_cls in classes for sup in owl_cls.is_a if isinstance(sup, owl.Restriction)),
+        "triples": len(ontology.world.graph),
+    }
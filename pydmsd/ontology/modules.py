@@ -0,0 +1,199 @@
+"""
+Module extraction. A compatibility question only concerns the two classes, their ancestors, the properties
+they restrict and the classes those properties range over. Copying just that signature-closed subset of
+axioms into a private ontology lets the reasoner classify a handful of classes instead of the whole model.
+
+Extraction follows bottom-locality: an axiom mentioning an entity outside the signature is trivially
+satisfied when that entity is interpreted as empty, so it cannot affect the satisfiability of any class
+in the signature. Disjointness axioms are therefore copied restricted to their members in the signature,
+and defined classes (which are not local) are always added to the signature.
+"""
+import types
+import typing as ty
+
+import attrs
+import owlready2 as owl
+
+from .types import Ontology, OntologyClass
+
+
+def _is_builtin(entity) -> bool:
+    return entity.namespace is owl.owl
+
+
+def named_entities(expr) -> ty.Iterator[ty.Any]:
+    """Yield the named classes and properties mentioned in a class expression."""
+    if isinstance(expr, (owl.ThingClass, owl.PropertyClass)):
+        if not _is_builtin(expr):
+            yield expr
+    elif isinstance(expr, owl.Restriction):
+        yield from named_entities(expr.property)
+        yield from named_entities(expr.value)
+    elif isinstance(expr, (owl.And, owl.Or)):
+        for operand in expr.Classes:
+            yield from named_entities(operand)
+    elif isinstance(expr, owl.Not):
+        yield from named_entities(expr.Class)
+    elif isinstance(expr, owl.Inverse):
+        yield from named_entities(expr.property)
+
+
+def referenced_expressions(entity) -> ty.List[ty.Any]:
+    """Expressions in the axioms about `entity` whose entities must be part of any signature containing it."""
+    if isinstance(entity, owl.ThingClass):
+        return list(entity.is_a) + list(entity.equivalent_to)
+    expressions = list(entity.is_a) + list(entity.domain) + list(entity.range)
+    inverse = getattr(entity, "inverse_property", None)
+    if inverse is not None:
+        expressions.append(inverse)
+    return expressions
+
+
+def signature(seeds: ty.Iterable[ty.Any]) -> ty.Set[ty.Any]:
+    """Close `seeds` under superclasses, restricted properties and fillers, and property domains and ranges."""
+    closure = set()
+    pending = [seed for seed in seeds if not _is_builtin(seed)]
+    while pending:
+        entity = pending.pop()
+        if entity in closure:
+            continue
+        closure.add(entity)
+        for expr in referenced_expressions(entity):
+            pending.extend(named_entities(expr))
+    return closure
+
+
+def _disjoint_groups(closure) -> ty.Set[ty.Tuple[owl.ThingClass, ...]]:
+    """Members of every AllDisjoint axiom restricted to `closure`, where at least two members remain."""
+    groups = set()
+    for entity in closure:
+        if isinstance(entity, owl.ThingClass):
+            for disjoint in entity.disjoints():
+                members = tuple(e for e in disjoint.entities if e in closure)
+                if len(members) >= 2:
+                    groups.add(members)
+    return groups
+
+
+def _defined_classes(owl_ontology: owl.Ontology) -> ty.List[owl.ThingClass]:
+    return [owl_cls for owl_cls in owl_ontology.classes() if owl_cls.equivalent_to]
+
+
+def module_signature(owl_classes: ty.Iterable[owl.ThingClass], owl_ontology: owl.Ontology) -> ty.Set[ty.Any]:
+    """The signature a module for `owl_classes` covers: the closure of theirs and every defined class'."""
+    return signature(list(owl_classes) + _defined_classes(owl_ontology))
+
+
+class _Copier:
+    """Copies entities and class expressions from one World into a target ontology, preserving IRIs."""
+    def __init__(self, target: owl.Ontology):
+        self.target = target
+        self.world = target.world
+
+    def entity(self, entity):
+        if _is_builtin(entity):
+            return entity
+        copied = self.world[entity.iri]
+        if copied is None:
+            namespace = self.target.get_namespace(entity.namespace.base_iri)
+            if isinstance(entity, owl.ObjectPropertyClass):
+                bases = (owl.ObjectProperty,)
+            elif isinstance(entity, owl.DataPropertyClass):
+                bases = (owl.DataProperty,)
+            else:
+                bases = (owl.Thing,)
+            with namespace:
+                copied = types.new_class(entity.name, bases)
+        return copied
+
+    def expression(self, expr):
+        if expr is None:
+            return None
+        if isinstance(expr, (owl.ThingClass, owl.PropertyClass)):
+            return self.entity(expr)
+        if isinstance(expr, owl.Restriction):
+            return owl.Restriction(
+                Property=self.expression(expr.property),
+                type=expr.type,
+                cardinality=expr.cardinality,
+                value=self.expression(expr.value),
+            )
+        if isinstance(expr, owl.And):
+            return owl.And([self.expression(c) for c in expr.Classes])
+        if isinstance(expr, owl.Or):
+            return owl.Or([self.expression(c) for c in expr.Classes])
+        if isinstance(expr, owl.Not):
+            return owl.Not(self.expression(expr.Class))
+        if isinstance(expr, owl.Inverse):
+            return owl.Inverse(self.expression(expr.property))
+        if isinstance(expr, (type, int, float, str, bool)):
+            return expr  # datatypes and literals
+        raise NotImplementedError(f"Cannot copy {expr!r} into a module")
+
+    def axioms(self, entity) -> None:
+        copied = self.entity(entity)
+        if isinstance(entity, owl.ThingClass):
+            for sup in entity.is_a:
+                if sup is not owl.Thing:
+                    copied.is_a.append(self.expression(sup))
+            for equivalent in entity.equivalent_to:
+                copied.equivalent_to.append(self.expression(equivalent))
+        else:
+            for sup in entity.is_a:
+                sup = self.expression(sup)
+                if sup not in copied.is_a:
+                    copied.is_a.append(sup)
+            copied.domain = [self.expression(d) for d in entity.domain]
+            copied.range = [self.expression(r) for r in entity.range]
+            inverse = getattr(entity, "inverse_property", None)
+            if inverse is not None:
+                copied.inverse_property = self.entity(inverse)
+
+
+@attrs.define
+class Module:
+    """
+    A private copy of the axioms relevant to `classes`, ready to be handed to the reasoner. Its World is only
+    released by `close()` (or by leaving the `with` block).
+    """
+    ontology: Ontology
+    classes: ty.List[OntologyClass]
+    size: int
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        self.ontology.close()
+
+
+def extract_module(classes: ty.Sequence[OntologyClass]) -> Module:
+    """
+    Copy the signature-closed subset of axioms relevant to `classes` into an ontology in a fresh World.
+    The returned module's classes correspond one-to-one with `classes` and keep their names and IRIs.
+    """
+    source = classes[0].ontology
+    closure = module_signature([cls.owl_cls for cls in classes], source.owl_ontology)
+    # read everything from the source world before the target becomes the current ontology
+    disjoint_groups = _disjoint_groups(closure)
+
+    world = owl.World()
+    target = world.get_ontology(source.iri)
+    copier = _Copier(target)
+    with target:
+        for entity in closure:
+            copier.entity(entity)
+        for entity in closure:
+            copier.axioms(entity)
+        for members in disjoint_groups:
+            owl.AllDisjoint([copier.entity(e) for e in members])
+
+    module_ontology = Ontology(source.iri, world=world, reasoner=source.reasoner)
+    return Module(
+        ontology=module_ontology,
+        classes=[OntologyClass(cls.name, copier.entity(cls.owl_cls), module_ontology) for cls in classes],
+        size=len(closure),
+    )
@@ -0,0 +1,86 @@
+"""
+Parallel compatibility checking. Each worker process loads a serialized copy of the model into its own
+owlready2 World, so reasoner runs on different shards of the class pairs do not block each other.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+import typing as ty
+
+import owlready2 as owl
+
+from .reasoner import (
+    CompatibilityMatrix,
+    Reasoner,
+    _assemble_matrix,
+    _matrix_pairs,
+    _reasoner_pass,
+    _structural_pass,
+    _unwrap_ontology_class,
+)
+from .types import Ontology
+
+SERIALIZATION_FORMAT = "ntriples"
+
+
+def serialize_ontology(ontology: Ontology) -> bytes:
+    """Serialize the OWL ontology behind `ontology` so it can be shipped to another process."""
+    buffer = io.BytesIO()
+    ontology.owl_ontology.save(file=buffer, format=SERIALIZATION_FORMAT)
+    return buffer.getvalue()
+
+
+def load_serialized_ontology(data: bytes, iri: str, world: ty.Optional[owl.World] = None) -> Ontology:
+    """Load `data` produced by `serialize_ontology` into `world` (a fresh World by default)."""
+    world = world if world is not None else owl.World()
+    world.get_ontology(iri).load(fileobj=io.BytesIO(data))
+    return Ontology(iri, world=world)
+
+
+def _shard(items: ty.List, count: int) -> ty.List[ty.List]:
+    """Split `items` round-robin into at most `count` non-empty shards."""
+    return [shard for shard in (items[k::count] for k in range(count)) if shard]
+
+
+def _check_shard(data: bytes, iri: str, names: ty.List[str], pairs: ty.List[ty.Tuple[int, int]], reasoner=None):
+    """Worker entry point: decide `pairs` of the classes `names` against a private copy of the model."""
+    ontology = load_serialized_ontology(data, iri)
+    classes = [ontology.get_class(name) for name in names]
+    return _reasoner_pass(classes, pairs, reasoner)
+
+
+def check_compatibility_matrix_parallel(
+        classes,
+        processes: ty.Optional[int] = None,
+        structural: bool = False,
+        reasoner: Reasoner = None,
+) -> CompatibilityMatrix:
+    """
+    Parallel version of `reasoner.check_compatibility_matrix`.
+
+    The model is serialized once and the pairs left undecided (after the structural tier, if `structural`
+    is True) are split into one shard per worker process. Every worker runs the reasoner once on its shard
+    and the results are merged into a single matrix. `processes` defaults to the number of CPUs.
+    `reasoner` (default: the ontology's reasoner) is sent to the workers, so it must be picklable.
+    """
+    classes = [_unwrap_ontology_class(cls) for cls in classes]
+    names = [cls.name for cls in classes]
+    pairs = _matrix_pairs(len(classes))
+
+    if structural:
+        structural_results, pairs = _structural_pass(classes, pairs)
+    else:
+        structural_results = {}
+
+    reasoner_results = {}
+    shards = _shard(pairs, processes or os.cpu_count() or 1)
+    if shards:
+        ontology = classes[0].ontology
+        reasoner = reasoner if reasoner is not None else ontology.reasoner
+        data = serialize_ontology(ontology)
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [executor.submit(_check_shard, data, ontology.iri, names, shard, reasoner) for shard in shards]
+            for future in futures:
+                reasoner_results.update(future.result())
+
+    return _assemble_matrix(names, structural_results, reasoner_results)
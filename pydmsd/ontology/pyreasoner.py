@@ -0,0 +1,272 @@
+"""
+In-process reasoner for the OWL fragment pydmsd generates: named classes with subclass chains,
+min/max/exactly/some/only restrictions on object (and simple data) properties, property domains and
+ranges, and AllDisjoint axioms between named classes.
+
+Satisfiability is decided on sets of named classes ("labels"). A label is unsatisfiable if it contains
+disjoint classes, or if for some property no multiset of satisfiable successor labels meets all of its
+number restrictions at once. Successor labels are explored lazily and refuted as a greatest fixpoint, so
+cyclic models are handled without a JVM. Anything outside the fragment raises `UnsupportedConstruct`.
+"""
+import itertools
+import typing as ty
+
+import attrs
+import owlready2 as owl
+
+from .budget import Deadline
+
+# Datatypes with disjoint value spaces in the OWL 2 datatype map
+DATATYPE_FAMILIES = {int: "numeric", float: "numeric", str: "string"}
+
+# Subsets of qualified fillers enumerated per property are 2 ** len(pool)
+MAX_FILLER_POOL = 12
+
+Atom = ty.Union[owl.ThingClass, type]
+Filler = ty.Optional[ty.FrozenSet[Atom]]  # a union of atoms, None meaning owl:Thing
+
+
+class UnsupportedConstruct(NotImplementedError):
+    """The ontology uses a construct outside the fragment the in-process reasoner decides."""
+
+
+@attrs.define
+class _SuccessorType:
+    label: ty.FrozenSet[Atom]
+    mins: ty.FrozenSet[int]  # indices of the min restrictions a successor of this type counts towards
+    maxes: ty.FrozenSet[int]
+
+
+@attrs.define
+class _PropertyConstraints:
+    mins: ty.List[ty.Tuple[int, Filler]] = attrs.Factory(list)
+    maxes: ty.List[ty.Tuple[int, Filler]] = attrs.Factory(list)
+    clauses: ty.List[ty.FrozenSet[Atom]] = attrs.Factory(list)
+    types: ty.List[_SuccessorType] = attrs.Factory(list)
+
+
+def _counts(filler: Filler, label: ty.FrozenSet[Atom]) -> bool:
+    return filler is None or not filler.isdisjoint(label)
+
+
+def _feasible(constraints: _PropertyConstraints, satisfiable: ty.Set[ty.FrozenSet[Atom]]) -> bool:
+    """Whether some multiset of satisfiable successor types meets every min and max restriction."""
+    if not constraints.mins:
+        return True
+    types = [t for t in constraints.types if t.label in satisfiable and t.mins]
+    # a type is useless if another one counts towards at least its mins and at most its maxes
+    types = [
+        t for k, t in enumerate(types)
+        if not any(
+            o.mins >= t.mins and o.maxes <= t.maxes and (o.mins != t.mins or o.maxes != t.maxes or m < k)
+            for m, o in enumerate(types) if m != k
+        )
+    ]
+    # no solution needs more successors of one type than the largest min
+    bound = max(n for n, _ in constraints.mins)
+    seen = set()
+
+    def search(k, needs, caps):
+        if all(need <= 0 for need in needs):
+            return True
+        if k == len(types) or (k, needs, caps) in seen:
+            return False
+        seen.add((k, needs, caps))
+        if any(need > 0 and not any(i in t.mins for t in types[k:]) for i, need in enumerate(needs)):
+            return False
+        t = types[k]
+        for count in range(bound + 1):
+            new_caps = tuple(cap - count if i in t.maxes else cap for i, cap in enumerate(caps))
+            if any(cap < 0 for cap in new_caps):
+                break
+            new_needs = tuple(need - count if i in t.mins else need for i, need in enumerate(needs))
+            if search(k + 1, new_needs, new_caps):
+                return True
+        return False
+
+    return search(0, tuple(n for n, _ in constraints.mins), tuple(n for n, _ in constraints.maxes))
+
+
+class FragmentReasoner:
+    """
+    Decides class satisfiability over one owlready2 World. Results are valid until the World changes.
+    Raises `ReasonerTimeout` when `deadline` passes mid-search.
+    """
+    def __init__(self, world: owl.World, deadline: Deadline = Deadline()):
+        self.world = world
+        self.deadline = deadline
+        self._check_world()
+        self._properties: ty.Dict[ty.FrozenSet[Atom], ty.Dict[ty.Any, _PropertyConstraints]] = {}
+        self._satisfiable: ty.Set[ty.FrozenSet[Atom]] = set()
+        self._closures: ty.Dict[ty.FrozenSet[Atom], ty.FrozenSet[Atom]] = {}
+
+    def _check_world(self) -> None:
+        for ontology in list(self.world.ontologies.values()):
+            if any(True for _ in ontology.general_class_axioms()):
+                raise UnsupportedConstruct(f"General class axioms in {ontology.base_iri}")
+        if any(True for _ in self.world.individuals()):
+            raise UnsupportedConstruct("Individuals")
+        for owl_cls in self.world.classes():
+            for equivalent in owl_cls.equivalent_to:
+                if not isinstance(equivalent, owl.ThingClass):
+                    raise UnsupportedConstruct(f"Defined class {owl_cls.iri}")
+
+    # Translation of the owlready2 model
+
+    def _filler(self, value) -> Filler:
+        if value is None or value is owl.Thing:
+            return None
+        if isinstance(value, owl.ThingClass) or value in DATATYPE_FAMILIES:
+            return frozenset([value])
+        if isinstance(value, owl.Or):
+            atoms = [self._filler(operand) for operand in value.Classes]
+            if any(atom is None for atom in atoms):
+                return None
+            return frozenset().union(*atoms)
+        raise UnsupportedConstruct(f"Filler {value!r}")
+
+    def _check_property(self, prop) -> None:
+        if not isinstance(prop, (owl.ObjectPropertyClass, owl.DataPropertyClass)):
+            raise UnsupportedConstruct(f"Property expression {prop!r}")
+        for sup in prop.is_a:
+            if sup not in (owl.ObjectProperty, owl.DataProperty, owl.FunctionalProperty):
+                raise UnsupportedConstruct(f"Property axiom {prop.iri} SubPropertyOf {sup!r}")
+        if isinstance(prop, owl.ObjectPropertyClass) and prop.inverse_property is not None:
+            raise UnsupportedConstruct(f"Inverse of {prop.iri}")
+
+    def _constraints(self, label: ty.FrozenSet[Atom]) -> ty.Dict[ty.Any, _PropertyConstraints]:
+        by_property: ty.Dict[ty.Any, _PropertyConstraints] = {}
+
+        def of(prop):
+            if prop not in by_property:
+                self._check_property(prop)
+                constraints = by_property[prop] = _PropertyConstraints()
+                if owl.FunctionalProperty in prop.is_a:
+                    constraints.maxes.append((1, None))
+                for range_type in prop.range:
+                    if (clause := self._filler(range_type)) is not None:
+                        constraints.clauses.append(clause)
+            return by_property[prop]
+
+        for atom in label:
+            if not isinstance(atom, owl.ThingClass) or atom is owl.Thing:
+                continue
+            for r in atom.is_a:
+                if not isinstance(r, owl.Restriction):
+                    continue
+                constraints = of(r.property)
+                filler = self._filler(r.value)
+                if r.type == owl.SOME:
+                    constraints.mins.append((1, filler))
+                elif r.type == owl.ONLY:
+                    if filler is not None:
+                        constraints.clauses.append(filler)
+                elif r.type in (owl.MIN, owl.MAX, owl.EXACTLY):
+                    if r.type in (owl.MIN, owl.EXACTLY) and r.cardinality > 0:
+                        constraints.mins.append((r.cardinality, filler))
+                    if r.type in (owl.MAX, owl.EXACTLY):
+                        constraints.maxes.append((r.cardinality, filler))
+                else:
+                    raise UnsupportedConstruct(f"Restriction {r!r}")
+        return by_property
+
+    def _closure(self, atoms: ty.Iterable[Atom]) -> ty.FrozenSet[Atom]:
+        """Close `atoms` under told superclasses, equivalences and the domains of required properties."""
+        atoms = frozenset(atoms)
+        if atoms in self._closures:
+            return self._closures[atoms]
+        closed: ty.Set[Atom] = set()
+        pending = list(atoms)
+        while pending:
+            while pending:
+                atom = pending.pop()
+                if atom in closed:
+                    continue
+                closed.add(atom)
+                if not isinstance(atom, owl.ThingClass) or atom is owl.Thing:
+                    continue
+                for sup in list(atom.is_a) + list(atom.equivalent_to):
+                    if isinstance(sup, owl.ThingClass):
+                        pending.append(sup)
+                    elif not isinstance(sup, owl.Restriction):
+                        raise UnsupportedConstruct(f"Axiom {atom.iri} SubClassOf {sup!r}")
+            for prop, constraints in self._constraints(frozenset(closed)).items():
+                if constraints.mins:
+                    for domain in prop.domain:
+                        if not isinstance(domain, owl.ThingClass):
+                            raise UnsupportedConstruct(f"Domain {domain!r} of {prop.iri}")
+                        if domain not in closed:
+                            pending.append(domain)
+        closure = self._closures[atoms] = frozenset(closed)
+        return closure
+
+    def _clash(self, label: ty.FrozenSet[Atom]) -> bool:
+        if owl.Nothing in label:
+            return True
+        if len({DATATYPE_FAMILIES[atom] for atom in label if atom in DATATYPE_FAMILIES}) > 1:
+            return True
+        if any(isinstance(atom, owl.ThingClass) for atom in label) and any(atom in DATATYPE_FAMILIES for atom in label):
+            return True
+        for atom in label:
+            if isinstance(atom, owl.ThingClass) and atom is not owl.Thing:
+                for disjoint in atom.disjoints():
+                    if sum(1 for member in disjoint.entities if member in label) >= 2:
+                        return True
+        return False
+
+    # Satisfiability
+
+    def _explore(self, root: ty.FrozenSet[Atom]) -> None:
+        """Build the constraints of `root` and every successor label reachable from it."""
+        pending = [root]
+        while pending:
+            self.deadline.check()
+            label = pending.pop()
+            if label in self._properties:
+                continue
+            if self._clash(label):
+                self._properties[label] = {}
+                continue
+            properties = self._properties[label] = self._constraints(label)
+            self._satisfiable.add(label)
+            for constraints in properties.values():
+                pool = sorted(
+                    {atom for _, filler in constraints.mins + constraints.maxes if filler for atom in filler},
+                    key=repr,
+                )
+                if len(pool) > MAX_FILLER_POOL:
+                    raise UnsupportedConstruct(f"More than {MAX_FILLER_POOL} qualified fillers on one property")
+                types = {}
+                for size in range(len(pool) + 1):
+                    for subset in itertools.combinations(pool, size):
+                        for choice in itertools.product(*constraints.clauses):
+                            successor = self._closure(subset + choice)
+                            if successor not in types:
+                                types[successor] = _SuccessorType(
+                                    label=successor,
+                                    mins=frozenset(i for i, (_, f) in enumerate(constraints.mins) if _counts(f, successor)),
+                                    maxes=frozenset(i for i, (_, f) in enumerate(constraints.maxes) if _counts(f, successor)),
+                                )
+                                pending.append(successor)
+                constraints.types = list(types.values())
+
+    def _refute(self) -> None:
+        """Remove labels whose restrictions cannot be met by satisfiable successors, until nothing changes."""
+        changed = True
+        while changed:
+            changed = False
+            self.deadline.check()
+            for label in list(self._satisfiable):
+                if not all(_feasible(c, self._satisfiable) for c in self._properties[label].values()):
+                    self._satisfiable.discard(label)
+                    changed = True
+
+    def is_satisfiable(self, owl_cls: owl.ThingClass) -> bool:
+        label = self._closure([owl_cls])
+        self._explore(label)
+        self._refute()
+        return label in self._satisfiable
+
+    def unsatisfiable(self, owl_classes: ty.Iterable[owl.ThingClass]) -> ty.List[owl.ThingClass]:
+        """The classes among `owl_classes` that are equivalent to owl:Nothing."""
+        return [owl_cls for owl_cls in owl_classes if not self.is_satisfiable(owl_cls)]
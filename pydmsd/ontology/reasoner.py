@@ -1,17 +1,37 @@
 import attrs
+import enum
+import logging
 import owlready2 as owl
 import typing as ty
 
 import pydmsd.face.types as face
 import pydmsd.fhir.fhir_types as fhir
-from .types import Cardinality, Ontology, OntologyClass
+from . import instrument
+from .cache import VerdictCache, class_fingerprint, verdict_key
+from .backends import PythonBackend, ReasonerBackend, get_backend
+from .budget import Deadline, ReasonerTimeout
+from .daemon import ReasonerDaemon
+from .modules import Module, extract_module, module_signature
+from .pyreasoner import FragmentReasoner, UnsupportedConstruct
+from .types import Cardinality, Ontology, OntologyClass, ScratchOntology
 
 
-def run_reasoner(ontology: Ontology):
-    """Run the HermiT reasoner on the given ontology."""
-    print("Running FHIR Profile interoperability analysis...")
-    with ontology.owl_ontology:
-        owl.sync_reasoner()
+_LOGGER = logging.getLogger(__name__)
+
+Reasoner = ty.Union[str, ReasonerBackend, ReasonerDaemon, None]
+
+
+def run_reasoner(ontology: Ontology, reasoner: Reasoner = None, classes=None, timeout: ty.Optional[float] = None):
+    """
+    Run a reasoner on the given ontology: `reasoner` if given, else the ontology's own (HermiT by default).
+    See `pydmsd.ontology.backends`. The run is reported as a `reasoner.run` event (see `instrument`).
+    If it takes longer than `timeout` seconds, the reasoner is stopped and `ReasonerTimeout` is raised.
+    """
+    backend = get_backend(reasoner if reasoner is not None else ontology.reasoner)
+    _LOGGER.info("Running %r on %s", backend, ontology.iri)
+    size = instrument.ontology_size(ontology) if instrument.enabled() else {}
+    with instrument.timed("reasoner.run", backend=backend.name, **size):
+        backend.run(ontology, classes, Deadline.after(timeout))
 
 
 def _unwrap_ontology_class(obj):
@@ -23,9 +43,9 @@ def _unwrap_ontology_class(obj):
         raise TypeError(f"Unsupported input: {obj}")
 
 
-def _get_closed_world_intersection(class1, class2):
+def _get_closed_world_intersection(class1, class2, scratch: ScratchOntology):
     """
-    Create and return an intersection of `class1` an `class2` with "max cardinality 0" property restrictions
+    Create (in `scratch`, a child ontology of the classes' model) and return an intersection of `class1` an `class2` with "max cardinality 0" property restrictions
     for all properties in the symmetric difference of the two classes' sets of properties.
 
     Under OWL semantics, omission does not imply negation. If one class A has a required property,
@@ -37,43 +57,329 @@ def _get_closed_world_intersection(class1, class2):
     adding explicit restrictions that properties in A but not in B have a max cardinality of 0 in B and vice-versa.
     Specifically, let the set of properties in A be P_A and the set of properties in B be P_B.
     We temporarily add (P_A - P_B) properties to B  and (P_B - P_A) properties to A, all with
-    max cardinality = 0 restrictions.
+    max cardinality = 0 restrictions. They disappear when `scratch` is closed.
     """
-    cwi = class1.ontology.define_class(name=f"cwi_{class1.name}_{class2.name}")
-    cwi.add_superclass(class1)
-    cwi.add_superclass(class2)
+    if class1.ontology.world is not class2.ontology.world:
+        raise ValueError(f"{class1.name} and {class2.name} belong to different models and cannot be compared")
+    with instrument.timed("intersection.build"):
+        cwi = scratch.define_class(name=f"cwi_{class1.name}_{class2.name}")
+        cwi.add_superclass(class1)
+        cwi.add_superclass(class2)
 
-    required1 = class1.required_properties
-    required2 = class2.required_properties
-    declared1 = class1.declared_properties
-    declared2 = class2.declared_properties
+        required1 = class1.required_properties
+        required2 = class2.required_properties
+        declared1 = class1.declared_properties
+        declared2 = class2.declared_properties
 
-    missing_from_2 = set(required1) - declared2
-    missing_from_1 = set(required2) - declared1
+        missing_from_2 = set(required1) - declared2
+        missing_from_1 = set(required2) - declared1
 
-    for prop in missing_from_1.union(missing_from_2):
-        cwi.add_max_cardinality(prop, 0)
-
-    for prop in required2:
-        cwi.add_max_cardinality(prop, 0)
+        for prop in missing_from_1.union(missing_from_2):
+            cwi.add_max_cardinality(prop, 0)
 
     return cwi
 
 
-def check_compatibility(class1, class2) -> bool:
+def _is_satisfiable(ontology_class: OntologyClass) -> bool:
+    """True unless the reasoner inferred `ontology_class` to be equivalent to owl:Nothing."""
+    return owl.Nothing not in ontology_class.owl_cls.equivalent_to
+
+
+def _classify(
+        ontology: Ontology,
+        test_classes: ty.Iterable[OntologyClass],
+        reasoner: Reasoner = None,
+        timeout: ty.Optional[float] = None,
+) -> ty.Dict[OntologyClass, bool]:
+    """Decide the satisfiability of every class in `test_classes` with a single reasoner run."""
+    test_classes = list(test_classes)
+    run_reasoner(ontology, reasoner, test_classes, timeout)
+    return {cls: _is_satisfiable(cls) for cls in test_classes}
+
+
+def _try_extract_module(classes) -> ty.Optional[Module]:
+    """Extract a module for `classes`, or return None if it contains constructs that cannot be copied."""
+    try:
+        return extract_module(classes)
+    except NotImplementedError:
+        return None
+
+
+def check_compatibility(
+        class1,
+        class2,
+        cache: ty.Optional[VerdictCache] = None,
+        module: bool = False,
+        reasoner: Reasoner = None,
+        timeout: ty.Optional[float] = None,
+) -> bool:
+    """
+    Determine if `class1` and `class2` are compatible (their closed world intersection is satisfiable).
+
+    If a `cache` is given, the reasoner is skipped whenever neither class' relevant axioms have changed
+    since the verdict was cached. If `module` is True, the reasoner only classifies the module of axioms
+    relevant to the two classes (see `pydmsd.ontology.modules`) instead of the whole ontology.
+    `reasoner` overrides the ontology's reasoner backend (see `run_reasoner`). If the reasoner takes longer
+    than `timeout` seconds it is stopped and `ReasonerTimeout` is raised (see `decide_compatibility` for
+    an "unknown" verdict instead). The temporary intersection class lives in a scratch ontology that is
+    dropped afterwards either way, so the model itself is never changed.
+    """
     class1 = _unwrap_ontology_class(class1)
     class2 = _unwrap_ontology_class(class2)
     ontology = class1.ontology
 
-    test_class = _get_closed_world_intersection(class1, class2)
+    if cache is not None:
+        key = verdict_key(class1, class2)
+        cached = cache.get(*key)
+        if cached is not None and cached.is_compatible is not None:
+            return cached.is_compatible
+
+    extracted = _try_extract_module([class1, class2]) if module else None
+    if extracted is not None:
+        ontology = extracted.ontology
+        class1, class2 = extracted.classes
+
+    scratch = ontology.scratch()
+    try:
+        test_class = _get_closed_world_intersection(class1, class2, scratch)
+        is_compatible = _classify(scratch, [test_class], reasoner, timeout)[test_class]
+    finally:
+        with instrument.timed("intersection.destroy", classes=1):
+            scratch.close()
+        if extracted is not None:
+            extracted.close()
+
+    if cache is not None:
+        cache.put_verdict(*key, is_compatible)
+
+    return is_compatible
 
-    run_reasoner(ontology)
 
-    is_compatible = owl.Nothing not in test_class.owl_cls.equivalent_to
+class DecisionTier(enum.Enum):
+    """Which tier of the tiered decision engine settled a compatibility question."""
+    CACHED = "cached"
+    STRUCTURAL = "structural"
+    REASONER = "reasoner"
 
-    ontology.destroy(test_class)
 
-    return is_compatible
+class Verdict(enum.Enum):
+    COMPATIBLE = "compatible"
+    INCOMPATIBLE = "incompatible"
+    UNKNOWN = "unknown"  # the reasoner ran out of time
+
+
+@attrs.define
+class CompatibilityResult:
+    """
+    Outcome of a single compatibility question, recording which tier decided it. `is_compatible` is None
+    if the question could not be decided in time; `reasons` then holds the evidence gathered so far.
+    """
+    class1: str
+    class2: str
+    is_compatible: ty.Optional[bool]
+    tier: DecisionTier
+    reasons: ty.List[str] = attrs.Factory(list)
+
+    @property
+    def verdict(self) -> Verdict:
+        if self.is_compatible is None:
+            return Verdict.UNKNOWN
+        return Verdict.COMPATIBLE if self.is_compatible else Verdict.INCOMPATIBLE
+
+    def __bool__(self):
+        if self.is_compatible is None:
+            raise ValueError(f"Compatibility of {self.class1} and {self.class2} is unknown, check `verdict`")
+        return self.is_compatible
+
+
+@attrs.define
+class CompatibilityMatrix:
+    """
+    Symmetric matrix of pairwise compatibility results.
+    Row/column `i` corresponds to `names[i]`. The diagonal records whether each class is satisfiable at all.
+    """
+    names: ty.List[str]
+    values: ty.List[ty.List[bool]]
+    tiers: ty.List[ty.List[DecisionTier]]
+
+    def _index(self, obj) -> int:
+        return self.names.index(obj if isinstance(obj, str) else obj.name)
+
+    def __getitem__(self, pair) -> bool:
+        """Look up a result by a pair of class names or classes, e.g. `matrix["A", "B"]`."""
+        first, second = pair
+        return self.values[self._index(first)][self._index(second)]
+
+    def tier(self, first, second) -> DecisionTier:
+        """The tier that decided the result for `first` and `second`."""
+        return self.tiers[self._index(first)][self._index(second)]
+
+    def as_dict(self) -> ty.Dict[str, ty.Any]:
+        """JSON-serializable form of the matrix, e.g. to store it for `diff.recheck` after the next change."""
+        return {
+            "names": self.names,
+            "values": self.values,
+            "tiers": [[tier.value for tier in row] for row in self.tiers],
+        }
+
+    @classmethod
+    def from_dict(cls, data: ty.Dict[str, ty.Any]) -> "CompatibilityMatrix":
+        return cls(
+            names=list(data["names"]),
+            values=[list(row) for row in data["values"]],
+            tiers=[[DecisionTier(tier) for tier in row] for row in data["tiers"]],
+        )
+
+    def incompatible_pairs(self) -> ty.List[ty.Tuple[str, str]]:
+        """All pairs of distinct classes that were found to be incompatible."""
+        return [
+            (self.names[i], self.names[j])
+            for i in range(len(self.names))
+            for j in range(i + 1, len(self.names))
+            if not self.values[i][j]
+        ]
+
+    def __str__(self):
+        width = max((len(name) for name in self.names), default=0)
+        rows = [" " * width + " " + " ".join(str(i) for i in range(len(self.names)))]
+        for i, name in enumerate(self.names):
+            row = " ".join("Y" if value else "N" for value in self.values[i])
+            rows.append(f"{name.ljust(width)} {row}")
+        return "\n".join(rows)
+
+
+def _matrix_pairs(n: int) -> ty.List[ty.Tuple[int, int]]:
+    """Index pairs of the upper triangle of an `n` x `n` matrix, diagonal included."""
+    return [(i, j) for i in range(n) for j in range(i, n)]
+
+
+def _structural_pass(classes, pairs):
+    """Split `pairs` of `classes` into those settled by the structural tier and those still undecided."""
+    decided: ty.Dict[ty.Tuple[int, int], bool] = {}
+    undecided: ty.List[ty.Tuple[int, int]] = []
+    for i, j in pairs:
+        result = _structural_verdict(classes[i], classes[j])
+        if result is None:
+            undecided.append((i, j))
+        else:
+            decided[i, j] = result.is_compatible
+    return decided, undecided
+
+
+def _reasoner_pass(classes, pairs, reasoner: Reasoner = None) -> ty.Dict[ty.Tuple[int, int], bool]:
+    """Decide all `pairs` of `classes` with a single reasoner run."""
+    if not pairs:
+        return {}
+    scratch = classes[0].ontology.scratch()
+    try:
+        # the diagonal only needs each class' own satisfiability, so no intersection class is required
+        test_classes = {
+            (i, j): classes[i] if i == j else _get_closed_world_intersection(classes[i], classes[j], scratch)
+            for i, j in pairs
+        }
+        satisfiable = _classify(scratch, test_classes.values(), reasoner)
+        return {pair: satisfiable[test_class] for pair, test_class in test_classes.items()}
+    finally:
+        with instrument.timed("intersection.destroy", classes=sum(i != j for i, j in pairs)):
+            scratch.close()
+
+
+def _assemble_matrix(names, structural_results, reasoner_results) -> CompatibilityMatrix:
+    n = len(names)
+    values = [[True] * n for _ in range(n)]
+    tiers = [[DecisionTier.REASONER] * n for _ in range(n)]
+    for tier, results in ((DecisionTier.STRUCTURAL, structural_results), (DecisionTier.REASONER, reasoner_results)):
+        for (i, j), is_compatible in results.items():
+            values[i][j] = values[j][i] = is_compatible
+            tiers[i][j] = tiers[j][i] = tier
+    return CompatibilityMatrix(names=list(names), values=values, tiers=tiers)
+
+
+def check_compatibility_matrix(
+        classes,
+        structural: bool = False,
+        module: bool = False,
+        reasoner: Reasoner = None,
+) -> CompatibilityMatrix:
+    """
+    Check every pair of `classes` for compatibility with a single reasoner run.
+
+    All closed world intersection classes are defined up front in a scratch ontology, the ontology is
+    classified once, and the scratch ontology is dropped afterward. Equivalent to calling `check_compatibility`
+    on every pair, but costs one reasoner run instead of one per pair.
+
+    If `structural` is True, pairs that the structural tier can settle (see `decide_compatibility`)
+    are never sent to the reasoner, and the reasoner is skipped entirely if every pair is settled.
+    If `module` is True, the reasoner only classifies the module of axioms relevant to `classes`.
+    `reasoner` overrides the ontology's reasoner backend (see `run_reasoner`).
+    """
+    classes = [_unwrap_ontology_class(cls) for cls in classes]
+    pairs = _matrix_pairs(len(classes))
+
+    if structural:
+        structural_results, pairs = _structural_pass(classes, pairs)
+    else:
+        structural_results = {}
+
+    extracted = _try_extract_module(classes) if module and pairs else None
+    if extracted is not None:
+        classes = extracted.classes
+    try:
+        reasoner_results = _reasoner_pass(classes, pairs, reasoner)
+    finally:
+        if extracted is not None:
+            extracted.close()
+
+    return _assemble_matrix([cls.name for cls in classes], structural_results, reasoner_results)
+
+
+def _prune_candidates(target: OntologyClass, candidates: ty.Sequence[OntologyClass]) -> ty.List[OntologyClass]:
+    """
+    Drop the candidates the closed world assumption already rules out, using the ontology's inverted
+    property index: a compatible candidate declares every property `target` requires and requires no
+    property `target` does not declare.
+    """
+    index = target.ontology.index
+    for candidate in candidates:
+        # index the whole ancestry, so restrictions a candidate inherits are found too
+        index.ancestors(candidate.owl_cls)
+    remaining = {candidate.owl_cls for candidate in candidates}
+
+    for prop in target.required_properties:
+        remaining.intersection_update(index.classes_restricting(prop))
+    declared = target.declared_properties
+    for prop in index.properties() - declared:
+        remaining.difference_update(
+            owl_cls for owl_cls, cardinality in index.classes_restricting(prop).items() if cardinality.min >= 1
+        )
+    return [candidate for candidate in candidates if candidate.owl_cls in remaining]
+
+
+def find_compatible(cls, candidates=None, reasoner: Reasoner = None) -> ty.List[ty.Any]:
+    """
+    Return the classes among `candidates` that are compatible with `cls`, in their original order.
+
+    `candidates` defaults to every other class of `cls`' ontology. Candidates that cannot match structurally
+    are pruned through the ontology's inverted property index, the structural tier settles what it can of
+    the rest, and the remaining pairs are decided with a single reasoner run.
+    """
+    target = _unwrap_ontology_class(cls)
+    if candidates is None:
+        candidates = [
+            OntologyClass(owl_cls.name, owl_cls, target.ontology)
+            for owl_cls in target.ontology.owl_ontology.classes() if owl_cls is not target.owl_cls
+        ]
+    unwrapped = [_unwrap_ontology_class(candidate) for candidate in candidates]
+
+    survivors = _prune_candidates(target, unwrapped)
+    classes = [target] + survivors
+    pairs = [(0, k) for k in range(1, len(classes))]
+    decided, pairs = _structural_pass(classes, pairs)
+    decided.update(_reasoner_pass(classes, pairs, reasoner))
+
+    compatible = {classes[k].owl_cls for (_, k), is_compatible in decided.items() if is_compatible}
+    return [candidate for candidate, unwrapped_candidate in zip(candidates, unwrapped)
+            if unwrapped_candidate.owl_cls in compatible]
 
 
 def _explain_explicit_disjointness(class1, class2):
@@ -161,17 +467,29 @@ class IncompatibilityExplanation:
         return "\n".join(parts)
 
 
-def explain_incompatibilities(class1, class2) -> IncompatibilityExplanation:
+def explain_incompatibilities(class1, class2, cache: ty.Optional[VerdictCache] = None) -> IncompatibilityExplanation:
     # TODO use singledispatch
     class1 = _unwrap_ontology_class(class1)
     class2 = _unwrap_ontology_class(class2)
 
-    return IncompatibilityExplanation(
+    if cache is not None:
+        # explanations name the classes in order, so unlike verdicts they are cached per ordered pair
+        key = (class_fingerprint(class1), class_fingerprint(class2))
+        cached = cache.get(*key)
+        if cached is not None and cached.explanation is not None:
+            return IncompatibilityExplanation(**cached.explanation)
+
+    explanation = IncompatibilityExplanation(
         explicit_disjoint_axioms=_explain_explicit_disjointness(class1, class2),
         cardinality_conflicts=_explain_cardinality_conflicts(class1, class2),
         property_presence_conflicts=_explain_property_presence_conflicts(class1, class2)
     )
 
+    if cache is not None:
+        cache.put_explanation(*key, attrs.asdict(explanation))
+
+    return explanation
+
 def detect_and_explain_incompatibilities(class1, class2):
     """
     Determine if `class1` and `class2` are compatible and
@@ -182,3 +500,500 @@ def detect_and_explain_incompatibilities(class1, class2):
         print(f"No incompatibilities detected between {class1.name} and {class2.name}.")
     else:
         print(explain_incompatibilities(class1, class2))
+
+
+# Whole-model scan
+#
+# `find_unsatisfiable_classes` audits every class of a model with one classification instead of a
+# pairwise check per class, then explains each unsatisfiable class with the structural analyses
+# below (which only need the told axioms).
+
+@attrs.define
+class UnsatisfiableClass:
+    """A class inferred equivalent to owl:Nothing, with the structural causes found for it."""
+    ontology_class: OntologyClass
+    reasons: ty.List[str]  # conflicts in the class' own and inherited axioms
+    inherited_from: ty.List[str]  # unsatisfiable told superclasses, which pass their conflicts on
+
+    @property
+    def name(self) -> str:
+        return self.ontology_class.name
+
+    def __str__(self):
+        parts = [f"{self.name} is unsatisfiable due to:"]
+        for reason in self.reasons:
+            parts.append(f"  - {reason}")
+        if self.inherited_from:
+            parts.append(f"  - It specializes unsatisfiable {', '.join(self.inherited_from)}.")
+        if not self.reasons and not self.inherited_from:
+            parts.append("  - No structural cause found; the reasoner derived it from other axioms.")
+        return "\n".join(parts)
+
+
+def _explain_unsatisfiable(cls: OntologyClass, unsatisfiable: ty.Set[owl.ThingClass]) -> UnsatisfiableClass:
+    ancestors = cls.ontology.index.ancestors(cls.owl_cls)
+    return UnsatisfiableClass(
+        ontology_class=cls,
+        reasons=_structural_disjointness_conflicts(cls, cls) + _structural_cardinality_conflicts(cls, cls),
+        inherited_from=sorted(a.name for a in ancestors if a is not cls.owl_cls and a in unsatisfiable),
+    )
+
+
+def find_unsatisfiable_classes(
+        ontology,
+        reasoner: Reasoner = None,
+        timeout: ty.Optional[float] = None,
+) -> ty.List[UnsatisfiableClass]:
+    """
+    Classify `ontology` (an `Ontology`, or a FACE/FHIR data model) once and return every unsatisfiable
+    class, sorted by name, each explained structurally. A class that merely specializes an unsatisfiable
+    class lists it in `inherited_from`, so root causes are easy to tell apart.
+
+    The run happens in a scratch ontology, so the model is not changed. `reasoner` and `timeout` are as
+    for `check_compatibility`; a run that exceeds `timeout` raises `ReasonerTimeout`.
+    """
+    if not isinstance(ontology, Ontology):
+        ontology = ontology.ontology
+    classes = [
+        OntologyClass(owl_cls.name, owl_cls, ontology)
+        for owl_cls in ontology.owl_ontology.classes() if owl_cls is not owl.Nothing
+    ]
+    with ontology.scratch() as scratch:
+        satisfiable = _classify(scratch, classes, reasoner, timeout)
+    unsatisfiable = {cls.owl_cls for cls, is_satisfiable in satisfiable.items() if not is_satisfiable}
+    return [
+        _explain_unsatisfiable(cls, unsatisfiable)
+        for cls in sorted(classes, key=lambda cls: cls.name) if cls.owl_cls in unsatisfiable
+    ]
+
+
+# Tiered decision engine
+#
+# Many compatibility questions can be settled from the told structure of the two classes alone.
+# The structural tier only answers when the answer is guaranteed to match the reasoner on the
+# closed world intersection built by `_get_closed_world_intersection`; everything else is undecided
+# and falls through to the reasoner tier.
+
+_CARDINALITY_TYPES = (owl.MIN, owl.MAX, owl.EXACTLY)
+
+
+def _covers_range(prop, filler) -> bool:
+    """True if every value of `prop` is told to be an instance of `filler` (via owl:Thing or the property range)."""
+    if filler is None or filler is owl.Thing:
+        return True
+    return bool(prop.range) and all(
+        r == filler or (isinstance(r, owl.ThingClass) and filler in r.ancestors())
+        for r in prop.range
+    )
+
+
+def _filler_subsumed(sub, sup, prop) -> bool:
+    """True if every `sub` value of `prop` is told to also be a `sup` value."""
+    if sub == sup or _covers_range(prop, sup):
+        return True
+    return isinstance(sub, owl.ThingClass) and isinstance(sup, owl.ThingClass) and sup in sub.ancestors()
+
+
+def _declared_disjoint_pairs(owl_classes) -> ty.Set[ty.FrozenSet[owl.ThingClass]]:
+    """All pairs of classes in `owl_classes` that an AllDisjoint axiom declares disjoint."""
+    pairs = set()
+    for owl_cls in owl_classes:
+        if owl_cls is owl.Thing:
+            continue
+        for axiom in owl_cls.disjoints():
+            for other in axiom.entities:
+                if other is not owl_cls and other in owl_classes:
+                    pairs.add(frozenset((owl_cls, other)))
+    return pairs
+
+
+def _structural_disjointness_conflicts(class1, class2) -> ty.List[str]:
+    """Detect disjointness axioms between any ancestors of the two classes."""
+    ancestors = class1.owl_cls.ancestors() | class2.owl_cls.ancestors()
+    conflicts = []
+    for pair in _declared_disjoint_pairs(ancestors):
+        first, second = sorted(cls.name for cls in pair)
+        conflicts.append(f"{first} is explicitly declared disjoint with {second}.")
+    return sorted(conflicts)
+
+
+def _structural_cardinality_conflicts(class1, class2) -> ty.List[str]:
+    """
+    Detect min > max contradictions on the same property, either within one class or across both.
+    Qualified restrictions only conflict when the min filler is told to be subsumed by the max filler.
+    """
+    conflicts = []
+    for holder_min, holder_max in ((class1, class2), (class2, class1), (class1, class1), (class2, class2)):
+        for r_min in holder_min.restrictions:
+            if r_min.type not in (owl.MIN, owl.EXACTLY):
+                continue
+            for r_max in holder_max.restrictions:
+                if r_max.type not in (owl.MAX, owl.EXACTLY) or r_max.property != r_min.property:
+                    continue
+                if r_min.cardinality > r_max.cardinality and _filler_subsumed(r_min.value, r_max.value, r_min.property):
+                    reason = (
+                        f"Characteristic {r_min.property.name} has conflicting cardinality restrictions: "
+                        f"{holder_min.name} requires min {r_min.cardinality}, "
+                        f"but {holder_max.name} requires max {r_max.cardinality}."
+                    )
+                    if reason not in conflicts:
+                        conflicts.append(reason)
+    return conflicts
+
+
+def _is_plain_property(prop) -> bool:
+    """True if `prop` has no characteristics, super/sub-properties, or inverse that could affect counting."""
+    return (
+        set(prop.is_a) <= {owl.ObjectProperty, owl.DataProperty}
+        and set(prop.descendants()) == {prop}
+        and not prop.equivalent_to
+        and getattr(prop, "inverse_property", None) is None
+    )
+
+
+def _is_plain_class(owl_cls) -> bool:
+    """True if `owl_cls` is constrained by nothing but named superclasses, so it is trivially satisfiable."""
+    ancestors = owl_cls.ancestors()
+    return (
+        all(not a.equivalent_to and all(isinstance(s, owl.ThingClass) for s in a.is_a) for a in ancestors)
+        and not _declared_disjoint_pairs(ancestors)
+    )
+
+
+def _structurally_compatible(class1, class2) -> bool:
+    """True if the closed world intersection of `class1` and `class2` is provably satisfiable."""
+    return _structural_obstacle(class1, class2) is None
+
+
+def _structural_obstacle(class1, class2) -> ty.Optional[str]:
+    """
+    Why the closed world intersection of `class1` and `class2` cannot be proven satisfiable structurally,
+    or None if it is provably satisfiable.
+
+    Only the fragment pydmsd generates for plain messages is accepted: named superclasses and
+    cardinality restrictions whose fillers add nothing beyond the property range, on plain properties
+    whose ranges are plain classes or datatypes. Anything else (only/some/value restrictions, defined
+    classes, disjointness among the ancestors, individuals, general class axioms) is left to the reasoner.
+    The caller must already have ruled out cardinality conflicts and missing required properties.
+    """
+    owl_ontology = class1.ontology.owl_ontology
+    if next(iter(owl_ontology.individuals()), None) is not None:
+        return "the ontology has individuals"
+    if next(iter(owl_ontology.general_class_axioms()), None) is not None:
+        return "the ontology has general class axioms"
+
+    ancestors = class1.owl_cls.ancestors() | class2.owl_cls.ancestors()
+    if _declared_disjoint_pairs(ancestors):
+        return "ancestors of the two classes are declared disjoint"
+
+    lower_bounds: ty.Dict[owl.PropertyClass, int] = {}
+    for ancestor in ancestors:
+        if ancestor.equivalent_to:
+            return f"{ancestor.name} is a defined class"
+        for sup in ancestor.is_a:
+            if isinstance(sup, owl.ThingClass):
+                continue
+            if not (
+                isinstance(sup, owl.Restriction)
+                and sup.type in _CARDINALITY_TYPES
+                and _covers_range(sup.property, sup.value)
+            ):
+                return f"{ancestor.name} has the restriction {sup}, which needs the reasoner"
+            if sup.type in (owl.MIN, owl.EXACTLY):
+                lower_bounds[sup.property] = max(lower_bounds.get(sup.property, 0), sup.cardinality)
+            else:
+                lower_bounds.setdefault(sup.property, 0)
+
+    for prop, lower_bound in lower_bounds.items():
+        if not _is_plain_property(prop):
+            return f"{prop.name} has property axioms that affect counting"
+        if lower_bound == 0:
+            continue
+        # values are required, so the domain and range of the property come into play
+        if any(domain not in ancestors for domain in prop.domain):
+            return f"the domain of {prop.name} is not among the classes' ancestors"
+        if len(prop.range) > 1:
+            return f"{prop.name} has several ranges"
+        for range_type in prop.range:
+            if isinstance(range_type, owl.ThingClass):
+                if not _is_plain_class(range_type):
+                    return f"the range {range_type.name} of {prop.name} is constrained"
+            elif not isinstance(range_type, type):
+                return f"the range {range_type} of {prop.name} is a class expression"
+
+    return None
+
+
+def _structural_verdict(class1, class2) -> ty.Optional[CompatibilityResult]:
+    """Settle compatibility from told structure alone, or return None if the reasoner is needed."""
+    reasons = (
+        _structural_disjointness_conflicts(class1, class2)
+        + _structural_cardinality_conflicts(class1, class2)
+        + _explain_property_presence_conflicts(class1, class2)
+    )
+    if reasons:
+        return CompatibilityResult(class1.name, class2.name, False, DecisionTier.STRUCTURAL, reasons)
+    if _structurally_compatible(class1, class2):
+        return CompatibilityResult(class1.name, class2.name, True, DecisionTier.STRUCTURAL)
+    return None
+
+
+def _unknown_result(class1, class2, timeout: ty.Optional[float]) -> CompatibilityResult:
+    """The verdict when the reasoner ran out of time, with the structural evidence gathered before."""
+    evidence = [f"No disjoint ancestors, cardinality conflicts or missing required properties between "
+                f"{class1.name} and {class2.name}."]
+    obstacle = _structural_obstacle(class1, class2)
+    if obstacle is not None:
+        evidence.append(f"Compatibility could not be proven structurally: {obstacle}.")
+    evidence.append(f"The reasoner did not finish within {timeout}s and was stopped.")
+    return CompatibilityResult(class1.name, class2.name, None, DecisionTier.REASONER, evidence)
+
+
+def decide_compatibility(
+        class1,
+        class2,
+        cache: ty.Optional[VerdictCache] = None,
+        reasoner: Reasoner = None,
+        timeout: ty.Optional[float] = None,
+) -> CompatibilityResult:
+    """
+    Tiered alternative to `check_compatibility`.
+
+    A verdict from `cache` (if given) is used first. Otherwise the structural tier answers "incompatible"
+    on disjoint ancestors, cardinality conflicts and missing required properties, and "compatible" when
+    the structure provably matches. Only undecided pairs pay for a reasoner run. The returned result
+    records which tier decided it.
+
+    If the reasoner needs more than `timeout` seconds it is stopped and the verdict is `Verdict.UNKNOWN`,
+    with the structural evidence as its reasons. Unknown verdicts are not cached.
+    """
+    class1 = _unwrap_ontology_class(class1)
+    class2 = _unwrap_ontology_class(class2)
+
+    if cache is not None:
+        key = verdict_key(class1, class2)
+        cached = cache.get(*key)
+        if cached is not None and cached.is_compatible is not None:
+            return CompatibilityResult(class1.name, class2.name, cached.is_compatible, DecisionTier.CACHED)
+
+    result = _structural_verdict(class1, class2)
+    if result is None:
+        try:
+            is_compatible = check_compatibility(class1, class2, reasoner=reasoner, timeout=timeout)
+        except ReasonerTimeout:
+            return _unknown_result(class1, class2, timeout)
+        result = CompatibilityResult(class1.name, class2.name, is_compatible, DecisionTier.REASONER)
+
+    if cache is not None:
+        cache.put_verdict(*key, result.is_compatible)
+
+    return result
+
+
+# Query planner
+#
+# Like a database planner, `plan_compatibility` inspects the two classes and the ontology and picks the
+# cheapest sound way to answer: a cached verdict, the structural tier, reasoning over an extracted module,
+# or a full classification. Reasoner costs are rough estimates (seconds, measured with `benchmarks.run`);
+# only their ratios matter. `explain_plan` shows the choice and the alternatives, like EXPLAIN.
+
+class Strategy(enum.Enum):
+    CACHED = "cached"
+    STRUCTURAL = "structural"
+    MODULE = "module"  # reason over the module extracted for the two classes
+    FULL = "full"  # classify the whole ontology
+
+
+# Fixed cost of a reasoner run, and cost per entity it has to load
+REASONER_STARTUP_COST = {"hermit": 1.2, "pellet": 1.5, "daemon": 0.05, "python": 0.0}
+REASONER_ENTITY_COST = {"hermit": 0.002, "pellet": 0.003, "daemon": 0.001, "python": 0.0005}
+MODULE_EXTRACTION_COST = 0.001  # per entity in the module
+# The in-process reasoner only explores what the queried classes reach, after scanning the World once
+GOAL_DIRECTED_BACKENDS = {"python"}
+SCAN_COST = 0.0001  # per entity in the World
+LOOKUP_COST = 0.001  # a cache lookup or the structural tier
+
+
+@attrs.define
+class PlanFeatures:
+    """What the planner knows about a query."""
+    ancestor_depth: int  # longest superclass chain above either class
+    restrictions: int  # restrictions on both classes, inherited ones included
+    quantified: bool  # `only` or `some` restrictions, which the structural tier rarely settles
+    datatypes: bool  # data properties or datatype fillers
+    ontology_size: int  # classes and properties in the World
+    module_size: int  # entities in the module of the two classes
+    in_process: bool  # the in-process reasoner supports the ontology
+
+
+@attrs.define
+class PlanStep:
+    strategy: Strategy
+    backend: ty.Optional[str]  # reasoner backend name for MODULE and FULL
+    cost: ty.Optional[float]  # estimated seconds, None if the strategy cannot answer this query
+    note: str = ""
+
+    @property
+    def label(self) -> str:
+        return self.strategy.value if self.backend is None else f"{self.strategy.value}/{self.backend}"
+
+
+@attrs.define
+class QueryPlan:
+    """The chosen strategy for one compatibility query, and the alternatives it was chosen from."""
+    class1: OntologyClass
+    class2: OntologyClass
+    features: PlanFeatures
+    steps: ty.List[PlanStep]  # every strategy considered, cheapest applicable first
+    cache: ty.Optional[VerdictCache] = None
+    reasoner: Reasoner = None
+    _result: ty.Optional[CompatibilityResult] = None  # verdict already known while planning
+
+    @property
+    def chosen(self) -> PlanStep:
+        return self.steps[0]
+
+    @property
+    def strategy(self) -> Strategy:
+        return self.chosen.strategy
+
+    @property
+    def estimated_seconds(self) -> float:
+        return self.chosen.cost
+
+    def execute(self, timeout: ty.Optional[float] = None) -> CompatibilityResult:
+        """Answer the query with the chosen strategy, giving up with an unknown verdict after `timeout` seconds."""
+        if self._result is not None:
+            return self._result
+        step = self.chosen
+        reasoner = self.reasoner if self.reasoner is not None else self.class1.ontology.reasoner
+        try:
+            is_compatible = check_compatibility(
+                self.class1,
+                self.class2,
+                cache=self.cache,
+                module=step.strategy is Strategy.MODULE,
+                reasoner=reasoner if reasoner is not None else step.backend,
+                timeout=timeout,
+            )
+        except ReasonerTimeout:
+            return _unknown_result(self.class1, self.class2, timeout)
+        return CompatibilityResult(self.class1.name, self.class2.name, is_compatible, DecisionTier.REASONER)
+
+    def __str__(self):
+        features = self.features
+        lines = [
+            f"Plan for {self.class1.name} x {self.class2.name}",
+            f"  -> {self.chosen.label} (estimated {self.chosen.cost:.4f}s){': ' + self.chosen.note if self.chosen.note else ''}",
+            f"  Features: ancestor depth {features.ancestor_depth}, {features.restrictions} restrictions, "
+            f"only/some {'yes' if features.quantified else 'no'}, datatypes {'yes' if features.datatypes else 'no'}, "
+            f"ontology {features.ontology_size} entities, module {features.module_size} entities",
+            "  Considered:",
+        ]
+        for step in self.steps:
+            cost = "n/a" if step.cost is None else f"{step.cost:.4f}s"
+            lines.append(f"    {step.label:<16} {cost:>10}  {step.note}".rstrip())
+        return "\n".join(lines)
+
+
+def _ancestor_depth(owl_cls: owl.ThingClass, depths: ty.Dict[owl.ThingClass, int]) -> int:
+    if owl_cls not in depths:
+        depths[owl_cls] = 0  # guards against cycles
+        supers = [sup for sup in owl_cls.is_a if isinstance(sup, owl.ThingClass) and sup is not owl.Thing]
+        depths[owl_cls] = 1 + max((_ancestor_depth(sup, depths) for sup in supers), default=-1)
+    return depths[owl_cls]
+
+
+def _supports_in_process(ontology: Ontology) -> bool:
+    try:
+        FragmentReasoner(ontology.world)
+    except UnsupportedConstruct:
+        return False
+    return True
+
+
+def _plan_features(class1: OntologyClass, class2: OntologyClass, consider_in_process: bool) -> PlanFeatures:
+    ontology = class1.ontology
+    restrictions = class1.restrictions | class2.restrictions
+    depths: ty.Dict[owl.ThingClass, int] = {}
+    datatypes = any(
+        isinstance(r.property, owl.DataPropertyClass) or not isinstance(r.value, (owl.ThingClass, type(None)))
+        for r in restrictions
+    )
+    return PlanFeatures(
+        ancestor_depth=max(_ancestor_depth(class1.owl_cls, depths), _ancestor_depth(class2.owl_cls, depths)),
+        restrictions=len(restrictions),
+        quantified=any(r.type in (owl.ONLY, owl.SOME) for r in restrictions),
+        datatypes=datatypes,
+        ontology_size=len(list(ontology.world.classes())) + len(list(ontology.world.properties())),
+        module_size=len(module_signature([class1.owl_cls, class2.owl_cls], ontology.owl_ontology)),
+        in_process=consider_in_process and not datatypes and _supports_in_process(ontology),
+    )
+
+
+def plan_compatibility(
+        class1,
+        class2,
+        cache: ty.Optional[VerdictCache] = None,
+        reasoner: Reasoner = None,
+) -> QueryPlan:
+    """
+    Choose the cheapest sound strategy for deciding whether `class1` and `class2` are compatible.
+    Call `execute()` on the returned plan to answer the query, or print it to see why it was chosen.
+
+    With an explicit `reasoner` (here or on the ontology) only that backend is considered. Otherwise the
+    in-process reasoner competes with HermiT whenever it supports the ontology.
+    """
+    class1 = _unwrap_ontology_class(class1)
+    class2 = _unwrap_ontology_class(class2)
+    explicit = reasoner if reasoner is not None else class1.ontology.reasoner
+    features = _plan_features(class1, class2, consider_in_process=explicit is None)
+
+    steps = []
+    result = None
+    cached = None
+    if cache is not None:
+        cached = cache.get(*verdict_key(class1, class2))
+    if cached is not None and cached.is_compatible is not None:
+        result = CompatibilityResult(class1.name, class2.name, cached.is_compatible, DecisionTier.CACHED)
+        steps.append(PlanStep(Strategy.CACHED, None, LOOKUP_COST, "verdict cached"))
+    else:
+        steps.append(PlanStep(Strategy.CACHED, None, None, "no cache" if cache is None else "not cached"))
+
+    structural = _structural_verdict(class1, class2)
+    if structural is not None:
+        verdict = "compatible" if structural.is_compatible else "incompatible"
+        steps.append(PlanStep(Strategy.STRUCTURAL, None, LOOKUP_COST, f"settles the query: {verdict}"))
+        if result is None:
+            result = structural
+    else:
+        steps.append(PlanStep(
+            Strategy.STRUCTURAL, None, None, "only/some restrictions" if features.quantified else "undecided",
+        ))
+
+    backends = [get_backend(explicit).name or "hermit"] if explicit is not None else ["hermit"]
+    if features.in_process:
+        backends.append(PythonBackend.name)
+    for backend in backends:
+        startup = REASONER_STARTUP_COST.get(backend, REASONER_STARTUP_COST["hermit"])
+        per_entity = REASONER_ENTITY_COST.get(backend, REASONER_ENTITY_COST["hermit"])
+        steps.append(PlanStep(
+            Strategy.MODULE, backend,
+            startup + (MODULE_EXTRACTION_COST + per_entity) * features.module_size,
+            f"{features.module_size} entities",
+        ))
+        if backend in GOAL_DIRECTED_BACKENDS:
+            full_cost = per_entity * features.module_size + SCAN_COST * features.ontology_size
+        else:
+            full_cost = per_entity * features.ontology_size
+        steps.append(PlanStep(Strategy.FULL, backend, startup + full_cost, f"{features.ontology_size} entities"))
+
+    # cheapest applicable step first; the order above breaks ties
+    order = {id(step): k for k, step in enumerate(steps)}
+    steps.sort(key=lambda step: (step.cost is None, step.cost or 0.0, order[id(step)]))
+    return QueryPlan(class1, class2, features, steps, cache=cache, reasoner=reasoner, result=result)
+
+
+def explain_plan(class1, class2, cache: ty.Optional[VerdictCache] = None, reasoner: Reasoner = None) -> str:
+    """Describe how `plan_compatibility` would answer the query, without answering it."""
+    return str(plan_compatibility(class1, class2, cache=cache, reasoner=reasoner))
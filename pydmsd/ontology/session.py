@@ -0,0 +1,136 @@
+"""
+Reasoning sessions. A `CompatibilitySession` keeps the closed world intersection classes of every pair it
+has been asked about in the model, classifies the ontology once for all of them, and answers compatibility,
+satisfiability and subsumption queries from that classification until the model changes.
+
+Only changes made through pydmsd (the `OntologyClass.add_*` and `Ontology.define_*` methods, see
+`types.mutator`) are detected. Edit the owlready2 objects directly and you must call `refresh()` yourself.
+The intersection classes, whose closed world restrictions depend on the whole model, and the reasoner's
+inferences live in a scratch ontology (see `types.ScratchOntology`), which is replaced whenever the model
+changes. The model itself is never changed by a session.
+"""
+import typing as ty
+
+import owlready2 as owl
+
+from . import instrument, reasoner
+from .types import Ontology, OntologyClass, ScratchOntology
+
+PairKey = ty.Tuple[owl.ThingClass, owl.ThingClass]
+
+
+def _pair_key(class1: OntologyClass, class2: OntologyClass) -> PairKey:
+    """Compatibility is symmetric, so both orders of a pair share one intersection class."""
+    return tuple(sorted((class1.owl_cls, class2.owl_cls), key=lambda owl_cls: owl_cls.iri))
+
+
+class CompatibilitySession:
+    """
+    Answers queries about `ontology` from a single classification until the model changes.
+
+    `reasoner` overrides the ontology's reasoner backend. Subsumption answers are as complete as the
+    backend's classification: HermiT and Pellet infer superclasses, the in-process backend only
+    unsatisfiability. Use the session as a context manager, or call `close()`, to drop its scratch
+    ontology.
+    """
+    def __init__(self, ontology: Ontology, reasoner: reasoner.Reasoner = None):
+        self.ontology = ontology
+        self.reasoner = reasoner
+        self.runs = 0  # number of classifications so far
+        self._pairs: ty.Dict[PairKey, ty.Tuple[OntologyClass, OntologyClass]] = {}
+        self._test_classes: ty.Dict[PairKey, OntologyClass] = {}
+        self._classes: ty.Dict[owl.ThingClass, OntologyClass] = {}  # model classes registered or queried
+        self._checked: ty.Set[owl.ThingClass] = set()  # classes the last classification decided
+        self._scratch: ty.Optional[ScratchOntology] = None
+        self._revision: ty.Optional[int] = None  # model revision the classification reflects
+        self._ancestors: ty.Dict[owl.ThingClass, ty.Set[owl.ThingClass]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def stale(self) -> bool:
+        """True if the model changed since the last classification."""
+        return self._revision != self.ontology.revision
+
+    def register(self, pairs: ty.Iterable[ty.Tuple[ty.Any, ty.Any]]) -> None:
+        """Add `pairs` of classes to the batch decided by the next classification."""
+        for class1, class2 in pairs:
+            class1 = reasoner._unwrap_ontology_class(class1)
+            class2 = reasoner._unwrap_ontology_class(class2)
+            self._pairs.setdefault(_pair_key(class1, class2), (class1, class2))
+            self._classes.setdefault(class1.owl_cls, class1)
+            self._classes.setdefault(class2.owl_cls, class2)
+
+    def _drop_scratch(self) -> None:
+        if self._scratch is not None:
+            with instrument.timed("intersection.destroy", classes=len(self._test_classes)):
+                self._scratch.close()
+            self._scratch = None
+        self._test_classes.clear()
+        self._checked.clear()
+
+    def refresh(self) -> None:
+        """Bring the classification up to date with the model and every registered pair."""
+        if self.stale:
+            # the intersections depend on the classes' restrictions, which may have changed
+            self._drop_scratch()
+        missing = [key for key in self._pairs if key not in self._test_classes]
+        if not missing and self._classes.keys() <= self._checked and not self.stale:
+            return
+        if self._scratch is None:
+            self._scratch = self.ontology.scratch()
+        for key in missing:
+            class1, class2 = self._pairs[key]
+            self._test_classes[key] = (
+                class1 if key[0] is key[1]
+                else reasoner._get_closed_world_intersection(class1, class2, self._scratch)
+            )
+        self._revision = self.ontology.revision
+        # name the classes to decide, backends that honour `classes` would only look at the scratch ontology's own
+        classes = {cls.owl_cls: cls for cls in self._test_classes.values()}
+        classes.update(self._classes)
+        reasoner.run_reasoner(self._scratch, self.reasoner, classes=list(classes.values()))
+        self._checked = set(classes)
+        self._ancestors.clear()
+        self.runs += 1
+
+    def check_compatibility(self, class1, class2) -> bool:
+        """Same as `reasoner.check_compatibility`, answered from the session's classification."""
+        class1 = reasoner._unwrap_ontology_class(class1)
+        class2 = reasoner._unwrap_ontology_class(class2)
+        self.register([(class1, class2)])
+        self.refresh()
+        return reasoner._is_satisfiable(self._test_classes[_pair_key(class1, class2)])
+
+    def _query(self, cls) -> OntologyClass:
+        """Unwrap `cls` and make sure the classification decides it."""
+        cls = reasoner._unwrap_ontology_class(cls)
+        self._classes.setdefault(cls.owl_cls, cls)
+        self.refresh()
+        return cls
+
+    def is_satisfiable(self, cls) -> bool:
+        return reasoner._is_satisfiable(self._query(cls))
+
+    def inferred_superclasses(self, cls) -> ty.Set[owl.ThingClass]:
+        """All named superclasses of `cls` (told or inferred), excluding itself."""
+        owl_cls = self._query(cls).owl_cls
+        if owl_cls not in self._ancestors:
+            self._ancestors[owl_cls] = {a for a in owl_cls.ancestors() if a is not owl_cls}
+        return self._ancestors[owl_cls]
+
+    def is_subclass(self, sub, sup) -> bool:
+        """True if `sub` is subsumed by `sup` (including when `sub` is unsatisfiable)."""
+        sup = reasoner._unwrap_ontology_class(sup)
+        return not self.is_satisfiable(sub) or sup.owl_cls in self.inferred_superclasses(sub)
+
+    def close(self) -> None:
+        """Drop the session's scratch ontology with its intersection classes and inferences."""
+        self._drop_scratch()
+        self._pairs.clear()
+        self._classes.clear()
+        self._revision = None
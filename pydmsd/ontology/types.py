@@ -1,13 +1,42 @@
 """
 Core ontology data model. Abstracts owlready2 to provide basic ontology operations.
 """
-from functools import cached_property
+from functools import wraps
+from pathlib import Path
 import attrs
 import collections
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
 import types
 import typing as ty
+import uuid
 import owlready2 as owl
 
+from . import instrument
+
+
+def mutator(method):
+    """
+    Mark a method that changes the model, so caches keyed on `Ontology.revision` see the change.
+    Calls are timed as `model.<method>` events when instrumentation is enabled.
+    """
+    event = f"model.{method.__name__}"
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if instrument.enabled():
+            with instrument.timed(event):
+                result = method(self, *args, **kwargs)
+        else:
+            result = method(self, *args, **kwargs)
+        getattr(self, "ontology", self).revision += 1
+        return result
+    return wrapper
+
 
 @attrs.define
 class Cardinality:
@@ -15,6 +44,145 @@ class Cardinality:
     max: ty.Optional[int] = None  # None means unbounded
 
 
+def _merge_restriction(cardinalities: ty.Dict[owl.PropertyClass, Cardinality], r: owl.Restriction) -> None:
+    """Tighten the cardinality of `r.property` in `cardinalities` to the largest min and smallest max."""
+    cardinality = cardinalities.setdefault(r.property, Cardinality())
+    if r.type in (owl.MIN, owl.EXACTLY) and r.cardinality > cardinality.min:
+        cardinality.min = r.cardinality
+    if r.type in (owl.MAX, owl.EXACTLY) and (cardinality.max is None or r.cardinality < cardinality.max):
+        cardinality.max = r.cardinality
+
+
+class RestrictionIndex:
+    """
+    Told superclasses and restrictions of every class, with each class' effective (own and inherited)
+    restrictions and cardinalities memoized.
+
+    A class is read from owlready2 the first time it is looked up. After that the index is kept current by
+    the `OntologyClass.add_*` methods, and a change only drops the memos of the class and its descendants.
+
+    The index is also inverted: `classes_restricting(prop)` gives every indexed class restricting `prop`
+    (directly or through an ancestor) with its effective cardinality.
+    """
+    def __init__(self):
+        self._parents: ty.Dict[owl.ThingClass, ty.Set[owl.ThingClass]] = {}
+        self._children: ty.DefaultDict[owl.ThingClass, ty.Set[owl.ThingClass]] = collections.defaultdict(set)
+        self._own: ty.Dict[owl.ThingClass, ty.Set[owl.Restriction]] = {}
+        self._ancestors: ty.Dict[owl.ThingClass, ty.FrozenSet[owl.ThingClass]] = {}
+        self._restrictions: ty.Dict[owl.ThingClass, ty.FrozenSet[owl.Restriction]] = {}
+        self._cardinalities: ty.Dict[owl.ThingClass, ty.Dict[owl.PropertyClass, Cardinality]] = {}
+        self._declaring: ty.DefaultDict[owl.PropertyClass, ty.Set[owl.ThingClass]] = collections.defaultdict(set)
+        self._by_property: ty.Dict[owl.PropertyClass, ty.Dict[owl.ThingClass, Cardinality]] = {}
+
+    def track(self, owl_cls: owl.ThingClass) -> None:
+        """Start indexing `owl_cls` (nothing happens if it is already indexed)."""
+        if owl_cls in self._own:
+            return
+        self._own[owl_cls] = {r for r in owl_cls.is_a if isinstance(r, owl.Restriction)}
+        for r in self._own[owl_cls]:
+            self._declaring[r.property].add(owl_cls)
+        self._parents[owl_cls] = set()
+        for sup in list(owl_cls.is_a) + list(owl_cls.equivalent_to):
+            if isinstance(sup, owl.ThingClass):
+                self._link(owl_cls, sup)
+        self._by_property.clear()
+
+    def _link(self, owl_cls: owl.ThingClass, sup: owl.ThingClass) -> None:
+        if sup is not owl.Thing and sup is not owl_cls:
+            self._parents[owl_cls].add(sup)
+            self._children[sup].add(owl_cls)
+
+    def _invalidate(self, owl_cls: owl.ThingClass, ancestors: bool = False) -> None:
+        """Drop the memos of `owl_cls` and every class below it."""
+        pending, seen = [owl_cls], set()
+        while pending:
+            cls = pending.pop()
+            if cls in seen:
+                continue
+            seen.add(cls)
+            if ancestors:
+                self._ancestors.pop(cls, None)
+            self._restrictions.pop(cls, None)
+            self._cardinalities.pop(cls, None)
+            pending.extend(self._children.get(cls, ()))
+        self._by_property.clear()
+
+    def add_restriction(self, owl_cls: owl.ThingClass, restriction: owl.Restriction) -> None:
+        self.track(owl_cls)
+        self._own[owl_cls].add(restriction)
+        self._declaring[restriction.property].add(owl_cls)
+        self._invalidate(owl_cls)
+
+    def add_superclass(self, owl_cls: owl.ThingClass, sup: owl.ThingClass) -> None:
+        self.track(owl_cls)
+        self._link(owl_cls, sup)
+        self._invalidate(owl_cls, ancestors=True)
+
+    def forget(self, owl_cls: owl.ThingClass) -> None:
+        """Remove a destroyed class."""
+        self._invalidate(owl_cls, ancestors=True)
+        for sup in self._parents.pop(owl_cls, ()):
+            self._children[sup].discard(owl_cls)
+        for r in self._own.pop(owl_cls, ()):
+            self._declaring[r.property].discard(owl_cls)
+        self._children.pop(owl_cls, None)
+
+    def ancestors(self, owl_cls: owl.ThingClass) -> ty.FrozenSet[owl.ThingClass]:
+        """`owl_cls` and its told named superclasses (and equivalent classes), transitively."""
+        if owl_cls in self._ancestors:
+            return self._ancestors[owl_cls]
+        result, pending = {owl_cls}, [owl_cls]
+        while pending:
+            cls = pending.pop()
+            self.track(cls)
+            for sup in self._parents[cls]:
+                if sup in result:
+                    continue
+                if sup in self._ancestors:
+                    result |= self._ancestors[sup]
+                else:
+                    result.add(sup)
+                    pending.append(sup)
+        ancestors = self._ancestors[owl_cls] = frozenset(result)
+        return ancestors
+
+    def restrictions(self, owl_cls: owl.ThingClass) -> ty.FrozenSet[owl.Restriction]:
+        """Restrictions on `owl_cls` or any of its ancestors."""
+        if owl_cls not in self._restrictions:
+            self._restrictions[owl_cls] = frozenset(r for a in self.ancestors(owl_cls) for r in self._own[a])
+        return self._restrictions[owl_cls]
+
+    def cardinalities(self, owl_cls: owl.ThingClass) -> ty.Dict[owl.PropertyClass, Cardinality]:
+        """Effective cardinality of every property restricted on `owl_cls` or any of its ancestors."""
+        if owl_cls not in self._cardinalities:
+            cardinalities: ty.Dict[owl.PropertyClass, Cardinality] = {}
+            for r in self.restrictions(owl_cls):
+                _merge_restriction(cardinalities, r)
+            self._cardinalities[owl_cls] = cardinalities
+        return self._cardinalities[owl_cls]
+
+    def cardinality(self, owl_cls: owl.ThingClass, prop: owl.PropertyClass) -> Cardinality:
+        """Effective cardinality of `prop` on `owl_cls` (unbounded if unrestricted)."""
+        return self.cardinalities(owl_cls).get(prop, Cardinality())
+
+    def properties(self) -> ty.Set[owl.PropertyClass]:
+        """Every property restricted by some indexed class."""
+        return {prop for prop, classes in self._declaring.items() if classes}
+
+    def classes_restricting(self, prop: owl.PropertyClass) -> ty.Dict[owl.ThingClass, Cardinality]:
+        """Every indexed class that restricts `prop` itself or inherits a restriction on it, with its cardinality."""
+        if prop not in self._by_property:
+            classes: ty.Dict[owl.ThingClass, Cardinality] = {}
+            pending = list(self._declaring.get(prop, ()))
+            while pending:
+                owl_cls = pending.pop()
+                if owl_cls not in classes:
+                    classes[owl_cls] = self.cardinality(owl_cls, prop)
+                    pending.extend(self._children.get(owl_cls, ()))
+            self._by_property[prop] = classes
+        return self._by_property[prop]
+
+
 class OntologyProperty:
     def __init__(self, name: str, owl_prop: owl.PropertyClass):
         self.name = name
@@ -28,99 +196,233 @@ class OntologyClass:
         self.owl_cls: owl.ThingClass = owl_cls
         self.ontology: 'Ontology' = ontology
 
+    def _add_restriction(self, restriction: owl.Restriction) -> None:
+        self.ontology._add_is_a(self.owl_cls, restriction)
+        self.ontology.index.add_restriction(self.owl_cls, restriction)
+
+    @mutator
     def add_disjoint_class(self, other: 'OntologyClass') -> None:
         """Declare this class to be disjoint with `other`."""
         with self.ontology.owl_ontology:
             owl.AllDisjoint([self.owl_cls, other.owl_cls])
 
+    @mutator
     def add_equivalent_class(self, other: 'OntologyClass') -> None:
         """Declare this class equivalent to `other`."""
-        with self.ontology.own_ontology:
+        with self.ontology.owl_ontology:
             self.owl_cls.equivalent_to.append(other.owl_cls)
+        self.ontology.index.add_superclass(self.owl_cls, other.owl_cls)
+        self.ontology.index.add_superclass(other.owl_cls, self.owl_cls)
 
+    @mutator
     def add_superclass(self, supercls: 'OntologyClass') -> None:
         """Add a superclass."""
-        with self.ontology.owl_ontology:
-            self.owl_cls.is_a.append(supercls.owl_cls)
+        self.ontology._add_is_a(self.owl_cls, supercls.owl_cls)
+        self.ontology.index.add_superclass(self.owl_cls, supercls.owl_cls)
 
+    @mutator
     def add_min_cardinality(self, prop: owl.PropertyClass, cardinality: int, range_type: ty.Optional[owl.ThingClass] = None) -> None:
         """Add a minimum cardinality restriction."""
-        with self.ontology.owl_ontology:
-            restriction = prop.min(cardinality, range_type)
-            self.owl_cls.is_a.append(restriction)
+        self._add_restriction(prop.min(cardinality, range_type))
 
+    @mutator
     def add_max_cardinality(self, prop: owl.PropertyClass, cardinality: int, range_type: ty.Optional[owl.ThingClass] = None) -> None:
         """Add a maximum cardinality restriction."""
-        with self.ontology.owl_ontology:
-            restriction = prop.max(cardinality, range_type)
-            self.owl_cls.is_a.append(restriction)
+        self._add_restriction(prop.max(cardinality, range_type))
 
+    @mutator
     def add_exactly_cardinality(self, prop: owl.PropertyClass, cardinality: int, range_type: ty.Optional[owl.ThingClass] = None) -> None:
         """Add an exact cardinality restriction."""
-        with self.ontology.owl_ontology:
-            restriction = prop.exactly(cardinality, range_type)
-            self.owl_cls.is_a.append(restriction)
+        self._add_restriction(prop.exactly(cardinality, range_type))
 
+    @mutator
     def add_has_value(self, prop: owl.PropertyClass, value: ty.Any) -> None:
         """Add a hasValue restriction."""
-        with self.ontology.owl_ontology:
-            restriction = prop.value(value)
-            self.owl_cls.is_a.append(restriction)
+        self._add_restriction(prop.value(value))
 
+    @mutator
     def add_only(self, prop: owl.PropertyClass, range_type: owl.ThingClass) -> None:
         """Add an AllValuesFrom (only) restriction."""
-        with self.ontology.owl_ontology:
-            restriction = prop.only(range_type)
-            self.owl_cls.is_a.append(restriction)
+        self._add_restriction(prop.only(range_type))
 
+    @mutator
     def add_some(self, prop: owl.PropertyClass, range_type: owl.ThingClass) -> None:
         """Add a SomeValuesFrom (some) restriction."""
-        with self.ontology.owl_ontology:
-            restriction = prop.some(range_type)
-            self.owl_cls.is_a.append(restriction)
+        self._add_restriction(prop.some(range_type))
 
-    @cached_property
-    def restrictions(self) -> ty.Set[owl.Restriction]:
-        return {r for a in self.owl_cls.ancestors() for r in a.is_a if isinstance(r, owl.Restriction)}
+    @property
+    def restrictions(self) -> ty.FrozenSet[owl.Restriction]:
+        """All restrictions on this class or any of its ancestors."""
+        return self.ontology.index.restrictions(self.owl_cls)
 
-    @cached_property
+    @property
     def declared_properties(self) -> ty.Set[owl.PropertyClass]:
         """Set of all properties used in restrictions on this class or any of its ancestors."""
-        return {r.property for r in self.restrictions}
+        return set(self.cardinalities)
 
-    @cached_property
+    @property
     def cardinalities(self) -> ty.Dict[owl.PropertyClass, Cardinality]:
         """
-        Constructs map of each property (inherited or explicitly declared) to a (min, max) cardinality tuple
-        based on the smallest min and largest max restriction for each property.
+        Map of each property (inherited or explicitly declared) to a (min, max) cardinality
+        based on the largest min and smallest max restriction for each property.
         """
-        cardinality_map: ty.DefaultDict[owl.PropertyClass, Cardinality] = collections.defaultdict(Cardinality)
-
-        for r in self.restrictions:
-            cardinality = cardinality_map[r.property]
+        return self.ontology.index.cardinalities(self.owl_cls)
 
-            if r.type == owl.MIN and r.cardinality > cardinality.min:
-                cardinality.min = r.cardinality
-            elif r.type == owl.MAX and cardinality.max is not None and r.cardinality < cardinality.max:
-                cardinality.max = r.cardinality
-            elif r.type == owl.EXACTLY:
-                cardinality.min = cardinality.max = r.cardinality
-
-        return cardinality_map
-
-    @cached_property
+    @property
     def required_properties(self) -> ty.Set[owl.PropertyClass]:
         """All properties with a min cardinality restriction >= 1"""
         return {p for p, card in self.cardinalities.items() if card.min >= 1}
 
 
+# Bump whenever the snapshot layout or its metadata changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+CORE_CLASSES = {
+    "observable": "Observable",
+    "measurement_system": "MeasurementSystem",
+    "unit": "Unit",
+    "integer_value_type": "IntegerValueType",
+    "float_value_type": "FloatValueType",
+    "double_value_type": "DoubleValueType",
+    "string_value_type": "StringValueType",
+    "enumeration_value_type": "EnumerationValueType",
+}
+CORE_PROPERTIES = {"has_unit": "hasUnit", "has_value_type": "hasValueType"}
+
+
+def _snapshot_metadata_path(path: ty.Union[str, Path]) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".json")
+
+
+class _Batch:
+    """
+    What `Ontology.batch()` has queued: the superclasses and restrictions of each class, and the triples owlready2
+    would have added to the ontology one `INSERT` at a time.
+    """
+    _WRITERS = ("_add_obj_triple_raw_spo", "_add_data_triple_raw_spod")
+    _FLUSHING = ("_set_obj_triple_raw_spo", "_del_obj_triple_raw_spo", "_set_data_triple_raw_spod", "_del_data_triple_raw_spod")
+
+    def __init__(self, owl_ontology: owl.Ontology):
+        self.owl_ontology = owl_ontology
+        self.is_a: ty.Dict[owl.EntityClass, list] = {}
+        self.objs: ty.List[ty.Tuple[int, int, int]] = []
+        self.datas: ty.List[ty.Tuple[int, int, ty.Any, ty.Any]] = []
+        # the ontology's own triple methods, restored by close() (see also owlready2.observe)
+        self._saved = {name: getattr(owl_ontology, name) for name in self._WRITERS + self._FLUSHING}
+        owl_ontology._add_obj_triple_raw_spo = self._add_obj
+        owl_ontology._add_data_triple_raw_spod = self._add_data
+        for name in self._FLUSHING:
+            setattr(owl_ontology, name, self._flushing(self._saved[name]))
+
+    def _add_obj(self, s, p, o):
+        if s is None or p is None or o is None:
+            raise ValueError
+        self.objs.append((s, p, o))
+
+    def _add_data(self, s, p, o, d):
+        if s is None or p is None or o is None or d is None:
+            raise ValueError
+        self.datas.append((s, p, o, d))
+
+    def _flushing(self, method):
+        """Wrap a method that replaces or deletes triples, so it sees the queued ones in the quadstore."""
+        def wrapper(*args):
+            self.write_triples()
+            return method(*args)
+        return wrapper
+
+    def write_triples(self) -> None:
+        """Insert the queued triples with one statement per table."""
+        graph = self.owl_ontology.graph
+        if self.objs:
+            graph.db.executemany(f"INSERT OR IGNORE INTO objs VALUES ({graph.c}, ?, ?, ?)", self.objs)
+        if self.datas:
+            graph.db.executemany(f"INSERT OR IGNORE INTO datas VALUES ({graph.c}, ?, ?, ?, ?)", self.datas)
+        graph.parent.nb_added_triples += len(self.objs) + len(self.datas)
+        self.objs, self.datas = [], []
+        if graph.parent.nb_added_triples > 1000:
+            graph.parent.analyze()
+
+    def write(self) -> None:
+        """Attach the queued superclasses and restrictions (one `is_a` update per class), then write all triples."""
+        is_a, self.is_a = self.is_a, {}
+        with self.owl_ontology:
+            for owl_cls, bases in is_a.items():
+                owl_cls.is_a.extend(bases)
+        self.write_triples()
+
+    def close(self) -> None:
+        try:
+            self.write()
+        finally:
+            for name, method in self._saved.items():
+                setattr(self.owl_ontology, name, method)
+
+
 class Ontology:
-    """Abstracts owlready2 ontology with basic ontology operations."""
-    def __init__(self, iri: str = "http://example.org/ontology.owl"):
+    """
+    Abstracts owlready2 ontology with basic ontology operations.
+
+    Each ontology lives in its own owlready2 World (quadstore) unless an existing `world` is given, so
+    separate models never share classes. owlready2 keeps a reference to every World it opens, so a World
+    is only released by `close()` (or by leaving the `with` block), not by dropping the ontology. With
+    `filename`, the World is backed by that SQLite file instead of memory, and `close()` writes it out.
+
+    If the ontology already contains the core classes (e.g. it was loaded from a file or snapshot),
+    they are wrapped as they are instead of being defined again.
+    """
+    def __init__(
+            self,
+            iri: str = "http://example.org/ontology.owl",
+            world: ty.Optional[owl.World] = None,
+            reasoner: ty.Any = None,
+            filename: ty.Optional[str] = None,
+    ):
+        if world is not None and filename is not None:
+            raise ValueError("Pass either an existing world or a filename for a new one, not both")
         # Generic
         self.iri: str = iri
-        self.owl_ontology: owl.Ontology =  owl.get_ontology(iri)
+        # Incremented by every change made through this API (see `mutator`)
+        self.revision: int = 0
+        self.filename = filename
+        if world is None:
+            world = owl.World(filename=filename) if filename is not None else owl.World()
+        self.world: owl.World = world
+        self.owl_ontology: owl.Ontology = self.world.get_ontology(iri)
+        self.index = RestrictionIndex()
+        # Reasoner backend name or instance, None for the default (see pydmsd.ontology.backends)
+        self.reasoner = reasoner
+        # Working copy of a loaded snapshot, removed by close()
+        self._temporary_file: ty.Optional[str] = None
+        # Axioms queued by batch()
+        self._batch: ty.Optional[_Batch] = None
+
+        if all(self.owl_ontology[name] is not None for name in {**CORE_CLASSES, **CORE_PROPERTIES}.values()):
+            self._wrap_core()
+        else:
+            self._define_core()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _wrap_core(self):
+        for attribute, name in CORE_CLASSES.items():
+            setattr(self, attribute, self.get_class(name))
+        for attribute, name in CORE_PROPERTIES.items():
+            setattr(self, attribute, self.owl_ontology[name])
+        self.value_types = [
+            self.integer_value_type,
+            self.float_value_type,
+            self.double_value_type,
+            self.string_value_type,
+            self.enumeration_value_type
+        ]
 
+    def _define_core(self):
         # Expand core OWL semantics to name Conceptual, Logical, and Platform concerns
         # Conceptual
         self.observable = self.define_class("Observable")
@@ -150,54 +452,178 @@ class Ontology:
             range_=self.value_types
         )
 
+    @contextlib.contextmanager
+    def batch(self) -> ty.Iterator['Ontology']:
+        """
+        Build many classes, properties and restrictions at once:
+
+            with ontology.batch():
+                for name in names:
+                    cls = ontology.define_class(name)
+                    ...
+
+        Within the block, the superclasses and restrictions added by `OntologyClass.add_*` are queued per class
+        and attached with a single update of each class when the block ends, new classes and properties are created
+        without first looking them up in the quadstore, and every triple is queued and then inserted in one pass.
+        Building is much faster, but until the block ends owlready2 (and so any reasoner) does not see the
+        queued axioms; the restriction index, and so `OntologyClass.cardinalities` etc., is always current.
+
+        Everything built so far is written even if the block raises. Nested blocks join the outermost one.
+        """
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = _Batch(self.owl_ontology)
+        try:
+            with self.owl_ontology:
+                yield self
+        finally:
+            batch, self._batch = self._batch, None
+            batch.close()
+
+    def _add_is_a(self, owl_entity: owl.EntityClass, base) -> None:
+        """Append `base` to `owl_entity.is_a`, or queue it while building a batch."""
+        if self._batch is not None:
+            self._batch.is_a.setdefault(owl_entity, []).append(base)
+        else:
+            with self.owl_ontology:
+                owl_entity.is_a.append(base)
+
+    def _new_entity(self, name: str, base: owl.EntityClass) -> owl.EntityClass:
+        """Create the class or property `name` in this ontology, with a shortcut for new names in a batch."""
+        if self._batch is None or self.world._abbreviate(self.owl_ontology.base_iri + name, False) is not None:
+            with self.owl_ontology:
+                return types.new_class(name, (base,))
+        # an IRI the World has never seen cannot name an existing entity, so skip owlready2's search for one
+        with owl.LOADING, self.owl_ontology:
+            entity = types.new_class(name, (base,))
+        self.owl_ontology._add_obj_triple_spo(entity.storid, owl.rdf_type, entity._owl_type)
+        entity._add_is_a_triple(base)
+        return entity
+
+    @mutator
     def destroy(self, ontology_class):
+        if self._batch is not None:
+            self._batch.write()
+        self.index.forget(ontology_class.owl_cls)
         owl.destroy_entity(ontology_class.owl_cls)
 
+    def scratch(self) -> 'ScratchOntology':
+        """A disposable child ontology for temporary classes (see `ScratchOntology`)."""
+        return ScratchOntology(self)
+
+    def close(self) -> None:
+        """Release the World, first writing it to `filename` if it is file-backed."""
+        if self.filename is not None and self._temporary_file is None:
+            self.world.save()
+        self.world.close()
+        if self._temporary_file is not None:
+            os.remove(self._temporary_file)
+            self._temporary_file = None
+
     def save(self, path, format="rdfxml"):
         """Save the ontology to a file at `path` (default RDF/XML format)."""
         self.owl_ontology.save(file=path, format=format)
 
     @classmethod
-    def load(cls, path):
-        """Load an ontology from a file at `path`."""
-        owl_ontology = owl.get_ontology(path).load()
-        return cls(
-            iri=owl_ontology.base_iri,
-            owl_ontology=owl_ontology
+    def load(cls, path, reasoner=None):
+        """Load an ontology from a file at `path` (any format owlready2 can parse) into a new World."""
+        world = owl.World()
+        owl_ontology = world.get_ontology(Path(path).resolve().as_uri()).load()
+        iri = owl_ontology.base_iri[:-1] if owl_ontology.base_iri.endswith("#") else owl_ontology.base_iri
+        return cls(iri=iri, world=world, reasoner=reasoner)
+
+    def save_snapshot(self, path) -> None:
+        """
+        Save the whole World as an SQLite quadstore at `path`, with pydmsd metadata next to it
+        in `<path>.json`. Loading a snapshot skips parsing entirely (see `load_snapshot`).
+        """
+        self.world.graph.commit()
+        target = sqlite3.connect(str(path))
+        try:
+            self.world.graph.db.backup(target)
+        finally:
+            target.close()
+        metadata = {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "owlready2": owl.VERSION,
+            "iri": self.iri,
+            "reasoner": self.reasoner if isinstance(self.reasoner, str) else None,
+        }
+        _snapshot_metadata_path(path).write_text(json.dumps(metadata, indent=2))
+
+    @classmethod
+    def load_snapshot(cls, path, filename: ty.Optional[str] = None) -> 'Ontology':
+        """
+        Restore an ontology saved with `save_snapshot`. The snapshot itself is left untouched: its quadstore
+        is copied to `filename` (by default a temporary file, removed again by `close()`) and opened in place.
+        """
+        metadata = json.loads(_snapshot_metadata_path(path).read_text())
+        if metadata.get("format") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"{path} is a format {metadata.get('format')} snapshot, expected {SNAPSHOT_FORMAT_VERSION}")
+
+        temporary = filename is None
+        if temporary:
+            handle, filename = tempfile.mkstemp(suffix=".sqlite3")
+            os.close(handle)
+        shutil.copyfile(path, filename)
+        ontology = cls(
+            iri=metadata["iri"],
+            world=owl.World(filename=filename),
+            reasoner=metadata["reasoner"],
         )
+        ontology.filename = filename
+        if temporary:
+            ontology._temporary_file = filename
+        return ontology
 
     # Generic
+    def get_class(self, name) -> OntologyClass:
+        """Wrap the existing class `name` of this ontology (e.g. one loaded from a file)."""
+        owl_cls = self.owl_ontology[name]
+        if not isinstance(owl_cls, owl.ThingClass):
+            raise KeyError(f"No class named {name} in {self.iri}")
+        return OntologyClass(name, owl_cls, self)
+
+    @mutator
     def define_class(self, name, parent=None):
         """Define a new ontology class."""
-        with self.owl_ontology:
-            bases = (parent.owl_cls,) if parent else (owl.Thing,)
-            owl_cls = types.new_class(name, bases=bases)
+        owl_cls = self._new_entity(name, parent.owl_cls if parent else owl.Thing)
+        self.index.track(owl_cls)
         return OntologyClass(name, owl_cls, self)
 
+    @mutator
     def define_object_property(self, name, domain=None, range_=None):
         """Define a new object property. Range will be the union of classes in `range_`"""
+        obj_prop = self._new_entity(name, owl.ObjectProperty)
         with self.owl_ontology:
-            obj_prop = types.new_class(name, (owl.ObjectProperty,))
             if domain:
                 obj_prop.domain = [domain.owl_cls]
             if range_:
                 obj_prop.range = [owl.Or([cls.owl_cls for cls in range_])] if isinstance(range_, list) else [range_.owl_cls]
         return obj_prop
 
+    @mutator
     def define_data_property(self, name, domain=None, range_=None):
         """Define a new data property."""
+        data_prop = self._new_entity(name, owl.DataProperty)
         with self.owl_ontology:
-            data_prop = types.new_class(name, (owl.DataProperty,))
             if domain:
                 data_prop.domain = [domain.owl_cls]
             if range_:
                 data_prop.range = [range_] if not isinstance(range_, list) else range_
             return data_prop
 
+    @mutator
     def declare_all_disjoint(self, classes):
-        """Declare all classes in `classes` to be disjoint."""
+        """Declare all classes in `classes` to be disjoint. Repeated declarations are ignored."""
+        owl_classes = [cls.owl_cls for cls in classes]
+        if self._batch is not None:
+            self._batch.write()
+        if any(set(axiom.entities) == set(owl_classes) for axiom in self.owl_ontology.disjoints()):
+            return
         with self.owl_ontology:
-            owl.AllDisjoint([cls.owl_cls for cls in classes])
+            owl.AllDisjoint(owl_classes)
 
     # Conceptual
     def define_observable(self, name):
@@ -217,4 +643,58 @@ class Ontology:
         ms.add_superclass(observable)
         ms.add_exactly_cardinality(self.has_unit, 1, unit.owl_cls)
         ms.add_only(self.has_unit, unit.owl_cls)
-        return ms
\ No newline at end of file
+        return ms
+
+
+def _reload_class(owl_cls: owl.ThingClass) -> None:
+    """Make owlready2's in-memory superclasses and equivalent classes of `owl_cls` match the quadstore again."""
+    owl_cls._equivalent_to = None
+    world = owl_cls.namespace.world
+    told = list(world._get_obj_triples_sp_o(owl_cls.storid, owl.rdfs_subclassof))
+    if [getattr(sup, "storid", None) for sup in owl_cls.is_a] == told:
+        return
+    with owl.LOADING:
+        owl_cls.is_a.reinit([world._to_python(o, default_to_none=True) for o in told] or [owl.Thing])
+
+
+class ScratchOntology(Ontology):
+    """
+    A disposable child ontology that imports `parent`, for the temporary classes of a query (such as closed world
+    intersections). It shares the parent's World and restriction index, so its classes can refer to the model's,
+    and reasoning on it sees the whole model. The reasoner's inferences are recorded in the scratch ontology too.
+
+    `close()` (or leaving the `with` block) drops the scratch ontology with everything in it, so the parent is
+    never changed. Each scratch ontology has a unique IRI, so concurrent queries never clash.
+    """
+    def __init__(self, parent: Ontology):
+        self.parent = parent
+        self.iri = f"{parent.iri}/scratch/{uuid.uuid4().hex}"
+        self.revision = 0
+        self.filename = None
+        self.world = parent.world
+        self.owl_ontology = self.world.get_ontology(self.iri)
+        self.owl_ontology.imported_ontologies.append(parent.owl_ontology)
+        self.index = parent.index
+        self.reasoner = parent.reasoner
+        self._temporary_file = None
+        self._batch = None
+
+    def close(self) -> None:
+        """Drop the scratch ontology, its classes and the inferences recorded in it."""
+        if self.owl_ontology is None:
+            return
+        for owl_cls in self.owl_ontology.classes():
+            self.index.forget(owl_cls)
+        subjects = self.world.graph.execute("SELECT DISTINCT s FROM quads WHERE c=?", (self.owl_ontology.graph.c,))
+        touched = [self.world._entities.get(s) for s, in subjects]
+        touched = [e for e in touched if isinstance(e, owl.ThingClass) and e.namespace.ontology is not self.owl_ontology]
+        self.owl_ontology.destroy()
+        self.owl_ontology = None
+        for owl_cls in touched:
+            _reload_class(owl_cls)
+
+    def save(self, path, format="rdfxml"):
+        raise TypeError("Scratch ontologies are temporary and cannot be saved")
+
+    def save_snapshot(self, path) -> None:
+        raise TypeError("Scratch ontologies are temporary and cannot be saved")
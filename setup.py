@@ -8,5 +8,7 @@ setup(name='PyDMSD',
       url='https://www.github.com/wscrosswy',
       packages=['pydmsd'],
       python_requires=">=3.9",
+      # the warm reasoner daemon (pydmsd.ontology.daemon) hosts the JVM through JPype
+      extras_require={"daemon": ["JPype1"]},
       entry_points={"console_scripts": ["pydmsd=pydmsd.main:main"]}
      )
\ No newline at end of file
@@ -0,0 +1,62 @@
+import functools
+
+import pytest
+
+from pydmsd.ontology.types import Cardinality, Ontology
+
+
+@pytest.fixture
+def new_ontology():
+    """Factory for ontologies, each in its own World. The Worlds are closed after the test."""
+    ontologies = []
+
+    def new(iri="http://example.org/test.owl", **kwargs):
+        ontology = Ontology(iri, **kwargs)
+        ontologies.append(ontology)
+        return ontology
+
+    yield new
+    for ontology in ontologies:
+        ontology.close()
+
+
+def _restrict(ontology_class, prop, cardinality: Cardinality, range_type) -> None:
+    if cardinality.min == cardinality.max:
+        ontology_class.add_exactly_cardinality(prop, cardinality.min, range_type)
+        return
+    if cardinality.min:
+        ontology_class.add_min_cardinality(prop, cardinality.min, range_type)
+    if cardinality.max is not None:
+        ontology_class.add_max_cardinality(prop, cardinality.max, range_type)
+
+
+@pytest.fixture
+def message_model(new_ontology):
+    """
+    Factory for the small model most tests start from: an observable, a property ranging over it, and one
+    message class per keyword argument restricting the property to that `Cardinality` (qualified by the
+    observable if `qualified`). Returns the model, the observable, the property and the message classes:
+
+        model, Pressure, tire_pressure, (CarMessage, MotorcycleMessage) = message_model(
+            "Pressure", "tirePressure", CarMessage=Cardinality(4, 4), MotorcycleMessage=Cardinality(2, 2),
+        )
+    """
+    def build(observable: str, prop: str, qualified: bool = False, iri="http://example.org/test.owl", **messages):
+        model = new_ontology(iri)
+        observable_class = model.define_observable(observable)
+        owl_prop = model.define_object_property(prop, range_=observable_class)
+        classes = []
+        for name, cardinality in messages.items():
+            classes.append(model.define_class(name))
+            _restrict(classes[-1], owl_prop, cardinality, observable_class.owl_cls if qualified else None)
+        return model, observable_class, owl_prop, classes
+
+    return build
+
+
+@pytest.fixture
+def vehicle_model(message_model):
+    """Factory for a `message_model` of car and motorcycle messages, with 4 and 2 tire pressures."""
+    return functools.partial(
+        message_model, "Pressure", "tirePressure", CarMessage=Cardinality(4, 4), MotorcycleMessage=Cardinality(2, 2),
+    )
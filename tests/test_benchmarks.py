@@ -0,0 +1,60 @@
+import json
+import random
+
+import attrs
+
+from benchmarks import compare, differential, run
+from benchmarks.generate import GENERATORS, ModelSpec
+from pydmsd.ontology import reasoner
+
+
+def test_generated_models_are_reproducible():
+    spec = ModelSpec(entities=4, characteristics=3, depth=2, conflict_rate=0.5, seed=7)
+    for generate in GENERATORS.values():
+        first, second = generate(spec), generate(spec)
+        assert first.conflicts == second.conflicts and len(first.conflicts) == 2
+        assert [sorted(map(str, a.ontology_class.restrictions)) for a, _ in first.pairs] == \
+               [sorted(map(str, a.ontology_class.restrictions)) for a, _ in second.pairs]
+
+
+def test_only_conflicting_pairs_are_incompatible():
+    spec = ModelSpec(entities=5, characteristics=4, depth=2, conflict_rate=0.4, seed=3)
+    for generate in GENERATORS.values():
+        synthetic = generate(spec)
+        verdicts = [reasoner.check_compatibility(a, b, reasoner="python") for a, b in synthetic.pairs]
+        assert {i for i, compatible in enumerate(verdicts) if not compatible} == synthetic.conflicts
+
+
+def test_benchmark_results_are_comparable():
+    spec = attrs.evolve(run.SCENARIOS["small"], entities=2)
+    result = run.run_benchmark("face", spec, "tiny", reasoner_name="python", repeat=1)
+    results = json.loads(json.dumps({**run.environment(), "benchmarks": [result]}))
+
+    assert result["correct"]
+    assert set(result["median"]) == set(run.PHASES)
+    rows = compare.compare(results, results)
+    assert [(name, phase) for name, phase, _, _ in rows] == [("face-tiny", phase) for phase in run.PHASES]
+
+
+def test_fast_paths_agree_with_reference():
+    results = differential.run_differential(trials=5, seed=1, paths=["structural"], reference="python")
+
+    assert results["disagreements"] == []
+    assert results["paths"]["structural"]["agree"] > 0
+
+
+def test_disagreements_are_minimized(monkeypatch):
+    monkeypatch.setitem(differential.PATHS, "always_compatible", lambda ontology, pairs: [True] * len(pairs))
+
+    results = differential.run_differential(trials=5, seed=1, paths=["always_compatible"], reference="python")
+    assert results["disagreements"]
+    assert all(disagreement["expected"] is False for disagreement in results["disagreements"])
+
+    first = results["disagreements"][0]
+    case = differential.random_case(random.Random(f"1-{first['trial']}"))
+    minimal = differential.minimize(case, tuple(first["pair"]), "always_compatible", reference="python")
+    assert len(minimal.axioms) == first["axioms"]
+    for k in range(len(minimal.axioms)):
+        smaller = attrs.evolve(minimal, axioms=minimal.axioms[:k] + minimal.axioms[k + 1:])
+        assert differential.decide(smaller, "python")[0] == [True]
+    exec(compile(minimal.source(), "<reproducer>", "exec"), {})
@@ -0,0 +1,30 @@
+from pydmsd.ontology.types import Ontology
+from pydmsd.ontology import reasoner
+
+
+def test_compatibility_matrix():
+    model = Ontology("http://example.org/test_compatibility_matrix.owl")
+
+    CarMessage = model.define_class("CarMessage")
+    MotorcycleMessage = model.define_class("MotorcycleMessage")
+    VehicleMessage = model.define_class("VehicleMessage")
+
+    Pressure = model.define_observable("Pressure")
+    tire_pressure = model.define_object_property("tirePressure", range_=Pressure)
+
+    CarMessage.add_exactly_cardinality(tire_pressure, 4)
+    MotorcycleMessage.add_exactly_cardinality(tire_pressure, 2)
+    VehicleMessage.add_min_cardinality(tire_pressure, 2)
+
+    matrix = reasoner.check_compatibility_matrix([CarMessage, MotorcycleMessage, VehicleMessage])
+
+    assert matrix.names == ["CarMessage", "MotorcycleMessage", "VehicleMessage"]
+    assert not matrix["CarMessage", "MotorcycleMessage"]
+    assert not matrix[MotorcycleMessage, CarMessage]
+    assert matrix[CarMessage, VehicleMessage]
+    assert matrix[MotorcycleMessage, VehicleMessage]
+    assert all(matrix.values[i][i] for i in range(3))
+    assert matrix.incompatible_pairs() == [("CarMessage", "MotorcycleMessage")]
+
+    # temporary intersection classes are cleaned up
+    assert model.owl_ontology.search_one(iri="*cwi_*") is None
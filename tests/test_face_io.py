@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from pydmsd.face import io as face_io
+from pydmsd.face.types import FaceDataModel
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.diff import diff_models
+from pydmsd.ontology.types import Cardinality, Ontology
+
+SPEC = {
+    "observables": ["RotorSpeed"],
+    "units": ["Hertz"],
+    "measurement_systems": [{"name": "RotorSpeedHertz", "observable": "RotorSpeed", "unit": "Hertz"}],
+    "entities": [
+        # specializations may come before the entity they specialize
+        {"name": "Helicopter_A", "specializes": "RotorCraft",
+         "characteristics": [{"name": "blades", "type": "RotorSpeed", "lower": 4, "upper": "*"}]},
+        {"name": "Helicopter_B", "specializes": "RotorCraft"},
+        {"name": "RotorCraft",
+         "characteristics": [{"name": "rotorSpeed", "type": "RotorSpeed", "lower": 1, "upper": 1},
+                             {"name": "blades", "type": "RotorSpeed", "upper": 2}]},
+    ],
+}
+
+CSV = """kind,name,entity,specializes,type,observable,unit,lower,upper
+observable,RotorSpeed,,,,,,,
+unit,Hertz,,,,,,,
+measurement_system,RotorSpeedHertz,,,,RotorSpeed,Hertz,,
+entity,Helicopter_A,,RotorCraft,,,,,
+characteristic,blades,Helicopter_A,,RotorSpeed,,,4,*
+entity,Helicopter_B,,RotorCraft,,,,,
+entity,RotorCraft,,,,,,,
+characteristic,rotorSpeed,RotorCraft,,RotorSpeed,,,1,1
+characteristic,blades,RotorCraft,,RotorSpeed,,,,2
+"""
+
+
+def test_load_json_and_csv(tmp_path):
+    (tmp_path / "model.json").write_text(json.dumps(SPEC))
+    (tmp_path / "model.csv").write_text(CSV)
+    iri = "http://example.org/test_face_io.owl"
+    from_json = face_io.load(tmp_path / "model.json", FaceDataModel(Ontology(iri)))
+    from_csv = face_io.load(tmp_path / "model.csv", FaceDataModel(Ontology(iri)))
+    assert not diff_models(from_json, from_csv)
+
+    model = from_json
+    assert set(model.entities) == {"RotorCraft", "Helicopter_A", "Helicopter_B"}
+    assert set(model.observables) == {"RotorSpeed"} and set(model.units) == {"Hertz"}
+    assert model.measurement_systems["RotorSpeedHertz"].name == "RotorSpeedHertz"
+    rotor_speed = model.entities["RotorCraft"].characteristics["rotorSpeed"]
+    helicopter_b = model.entities["Helicopter_B"]
+    assert helicopter_b.ontology_class.cardinalities[rotor_speed] == Cardinality(1, 1)
+
+    assert reasoner.check_compatibility(helicopter_b, model.entities["RotorCraft"], reasoner="python")
+    # Helicopter_A needs at least 4 blades, but inherits at most 2
+    assert not reasoner.check_compatibility(model.entities["Helicopter_A"], helicopter_b, reasoner="python")
+
+
+def test_characteristic_typed_by_measurement_system():
+    spec = {**SPEC, "entities": [
+        {"name": "Rotor", "characteristics": [{"name": "speed", "type": "RotorSpeedHertz", "lower": 1, "upper": 1}]},
+    ]}
+    with face_io.build_model(spec) as model:
+        speed = model.entities["Rotor"].characteristics["speed"]
+        assert speed.range == [model.measurement_systems["RotorSpeedHertz"].owl_cls]
+
+
+@pytest.mark.parametrize("entities, message", [
+    ([{"name": "A", "specializes": "B"}, {"name": "B", "specializes": "A"}], "cycle"),
+    ([{"name": "A", "specializes": "Missing"}], "unknown entity"),
+    ([{"name": "A", "characteristics": [{"name": "x", "type": "Missing"}]}], "unknown type"),
+    ([{"name": "RotorSpeed"}], "more than once"),
+])
+def test_invalid_specifications(entities, message):
+    with pytest.raises(ValueError, match=message):
+        face_io.build_model({"observables": ["RotorSpeed"], "entities": entities})
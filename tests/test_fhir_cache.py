@@ -0,0 +1,181 @@
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+from pydmsd.fhir import cache as fhir_cache
+from pydmsd.fhir.cache import OfflineCacheMiss, PinnedVersionUnavailable, StructureDefinitionCache
+from pydmsd.fhir.download import fetch_many
+from pydmsd.fhir.fhir_types import FhirDataModel
+
+PATIENT = {
+    "resourceType": "StructureDefinition",
+    "url": "http://example.org/fhir/StructureDefinition/Patient",
+    "version": "1.0.0",
+    "name": "Patient",
+    "type": "Patient",
+    "snapshot": {"element": [
+        {"path": "Patient", "min": 0, "max": "*"},
+        {"path": "Patient.active", "min": 0, "max": "1", "type": [{"code": "boolean"}]},
+        {"path": "Patient.birthDate", "min": 1, "max": "1", "type": [{"code": "date"}]},
+    ]},
+}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path != "/StructureDefinition/Patient":
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(PATIENT).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _uri(server):
+    return f"http://127.0.0.1:{server.server_port}/StructureDefinition/Patient"
+
+
+def test_cache_revalidates_with_etag(server, tmp_path):
+    with StructureDefinitionCache(tmp_path, max_age=0) as cache:
+        assert cache.get(_uri(server)) == PATIENT
+        assert cache.get(_uri(server)) == PATIENT
+    assert server.requests == [("/StructureDefinition/Patient", None), ("/StructureDefinition/Patient", '"v1"')]
+
+    # fresh entries and pinned versions are served without any request
+    with StructureDefinitionCache(tmp_path) as cache:
+        cache.get(_uri(server))
+        assert cache.get(PATIENT["url"] + "|1.0.0") == PATIENT
+    assert len(server.requests) == 2
+    assert len(list((tmp_path / "objects").iterdir())) == 1
+
+
+def test_offline_cache(server, tmp_path):
+    with StructureDefinitionCache(tmp_path / "cache", offline=True) as cache:
+        with pytest.raises(OfflineCacheMiss):
+            cache.get(_uri(server))
+    assert not server.requests
+
+    fhir_cache.main(["--cache-dir", str(tmp_path / "cache"), "seed", _uri(server)])
+    server.shutdown()
+
+    with StructureDefinitionCache(tmp_path / "cache", offline=True) as cache:
+        model = FhirDataModel(cache=cache)
+        patient = model.create_resource_from_uri(_uri(server))
+    assert patient.ontology_class.required_properties == {model.ontology.owl_ontology["birthDate"]}
+
+
+def test_import_files(tmp_path, capsys):
+    path = tmp_path / "StructureDefinition-Patient.json"
+    path.write_text(json.dumps(PATIENT))
+    fhir_cache.main(["--cache-dir", str(tmp_path / "cache"), "import", str(path)])
+    fhir_cache.main(["--cache-dir", str(tmp_path / "cache"), "list"])
+    assert capsys.readouterr().out.split() == [PATIENT["url"], PATIENT["url"] + "|1.0.0"]
+
+
+class _ProfileHandler(http.server.BaseHTTPRequestHandler):
+    """Serves `server.definitions` by path, slowly, failing the first `server.failures[path]` requests."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        if self.server.failures.get(self.path, 0) > 0:
+            self.server.failures[self.path] -= 1
+            self.send_error(503)
+            return
+        if self.path not in self.server.definitions:
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.definitions[self.path]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def profile_server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ProfileHandler)
+    httpd.requests, httpd.failures, httpd.delay = [], {}, 0.2
+    base = f"http://127.0.0.1:{httpd.server_port}"
+    httpd.definitions = {
+        f"/profile{i}": {**PATIENT, "url": f"{base}/profile{i}", "name": f"Profile{i}", "baseDefinition": f"{base}/base"}
+        for i in range(8)
+    }
+    httpd.definitions["/base"] = {**PATIENT, "url": f"{base}/base", "baseDefinition": f"{base}/missing"}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, base
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_many_concurrently_with_retries_and_prefetch(profile_server, tmp_path):
+    server, base = profile_server
+    server.failures["/profile3"] = 2
+    uris = [f"{base}/profile{i}" for i in range(8)]
+
+    with StructureDefinitionCache(tmp_path, backoff=0.01) as cache:
+        start = time.perf_counter()
+        definitions = fetch_many(uris, cache)
+        elapsed = time.perf_counter() - start
+
+        assert list(definitions) == uris
+        assert definitions[f"{base}/profile3"]["name"] == "Profile3"
+        assert elapsed < 8 * server.delay  # one at a time would take at least 8 delays
+        # the shared base was prefetched once; its missing base was only logged
+        assert server.requests.count("/base") == 1
+        assert cache.entry(f"{base}/base") is not None
+        assert server.requests.count("/profile3") == 3
+
+        # everything needed is cached now
+        cache.offline = True
+        model = FhirDataModel(cache=cache)
+        assert [r.ontology_class.name for r in model.create_resources_from_uris(uris[:2])] == ["Profile0", "Profile1"]
+
+
+
+def test_pinned_dependency_is_fetched_from_its_canonical_uri(profile_server, tmp_path):
+    server, base = profile_server
+    server.delay = 0
+    server.definitions["/profile0"]["baseDefinition"] = f"{base}/base|1.0.0"
+
+    with StructureDefinitionCache(tmp_path) as cache:
+        cache.get_many([f"{base}/profile0"])
+        assert server.requests == ["/profile0", "/base", "/missing"]
+        # stored as the pinned version and as the latest one
+        assert cache.entry(f"{base}/base|1.0.0").digest == cache.entry(f"{base}/base").digest
+
+        with pytest.raises(PinnedVersionUnavailable):
+            cache.get(f"{base}/profile1|2.0.0")
+        assert cache.entry(f"{base}/profile1|2.0.0") is None
+        assert cache.entry(f"{base}/profile1|1.0.0") is not None
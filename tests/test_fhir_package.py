@@ -0,0 +1,70 @@
+import io
+import json
+import tarfile
+
+import pytest
+
+from pydmsd.fhir import download, package as fhir_package
+from pydmsd.fhir.fhir_types import FhirDataModel
+
+BASE = "http://example.org/fhir/StructureDefinition/"
+
+
+def _definition(name, elements):
+    return {
+        "resourceType": "StructureDefinition",
+        "url": BASE + name,
+        "version": "2.0.0",
+        "name": name,
+        "type": "Patient",
+        "extension": [{"url": "http://example.org/fhir/StructureDefinition/standards-status", "valueCode": "trial-use"}],
+        "snapshot": {"element": [{"path": "Patient", "min": 0, "max": "*"}] + [
+            {"path": f"Patient.{element}", "min": low, "max": high, "type": [{"code": "string"}]}
+            for element, low, high in elements
+        ]},
+    }
+
+
+FILES = {
+    "StructureDefinition-patient-a.json": _definition("PatientA", [("name", 1, "1")]),
+    "StructureDefinition-patient-b.json": _definition("PatientB", [("name", 0, "0")]),
+    "ValueSet-genders.json": {"resourceType": "ValueSet", "url": "http://example.org/fhir/ValueSet/genders"},
+    "example/Patient-example.json": {"resourceType": "Patient", "id": "example"},
+}
+
+
+def _write_package(path, with_index):
+    files = {"package.json": {"name": "example.fhir.core", "version": "2.0.0"}, **FILES}
+    if with_index:
+        files[".index.json"] = {"index-version": 1, "files": [
+            {"filename": name, "resourceType": content["resourceType"], "url": content.get("url"),
+             "version": content.get("version")}
+            for name, content in FILES.items() if "/" not in name
+        ]}
+    with tarfile.open(path, "w:gz") as archive:
+        for name, content in files.items():
+            data = json.dumps(content).encode()
+            info = tarfile.TarInfo(f"package/{name}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.mark.parametrize("with_index", [True, False])
+def test_load_package_parses_on_demand(tmp_path, monkeypatch, with_index):
+    path = _write_package(tmp_path / "example.fhir.core-2.0.0.tgz", with_index)
+    parsed = []
+    parse = fhir_package.parse_structuredefinition
+    monkeypatch.setattr(fhir_package, "parse_structuredefinition", lambda sd: parsed.append(sd["url"]) or parse(sd))
+    monkeypatch.setattr(download, "download_fhir_structuredefinition", lambda *args: pytest.fail("downloaded"))
+
+    model = FhirDataModel()
+    package = model.load_package(path)
+    assert (package.name, package.version) == ("example.fhir.core", "2.0.0")
+    assert package.urls == [BASE + "PatientA", BASE + "PatientB"]
+    assert BASE + "PatientA|2.0.0" in package and BASE + "PatientA|1.0.0" not in package
+    assert not parsed
+
+    patient_a = model.create_resource_from_uri(BASE + "PatientA")
+    assert parsed == [BASE + "PatientA"]
+    assert patient_a.ontology_class.required_properties == {model.ontology.owl_ontology["name"]}
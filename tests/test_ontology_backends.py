@@ -0,0 +1,94 @@
+import owlready2 as owl
+import pytest
+
+from pydmsd.ontology.types import Ontology
+from pydmsd.ontology import reasoner
+from pydmsd.ontology import backends
+from pydmsd.ontology.backends import DaemonBackend, HermitBackend, PythonBackend, get_backend
+from pydmsd.ontology.pyreasoner import FragmentReasoner, UnsupportedConstruct
+
+
+@pytest.fixture
+def sensor_model(new_ontology):
+    """Factory for sensor messages whose readings are temperatures, humidities, one of either, or one of each."""
+    def build(reasoner_backend=None):
+        model = new_ontology(reasoner=reasoner_backend)
+        Temperature = model.define_observable("Temperature")
+        Humidity = model.define_observable("Humidity")
+        model.declare_all_disjoint([Temperature, Humidity])
+        reading = model.define_object_property("reading")
+        Thermometer = model.define_class("Thermometer")
+        Thermometer.add_min_cardinality(reading, 1, Temperature.owl_cls)
+        Hygrometer = model.define_class("Hygrometer")
+        Hygrometer.add_only(reading, Humidity.owl_cls)
+        SingleSensor = model.define_class("SingleSensor")
+        SingleSensor.add_max_cardinality(reading, 1)
+        DualSensor = model.define_class("DualSensor")
+        DualSensor.add_min_cardinality(reading, 1, Temperature.owl_cls)
+        DualSensor.add_min_cardinality(reading, 1, Humidity.owl_cls)
+        return model, [Thermometer, Hygrometer, SingleSensor, DualSensor]
+
+    return build
+
+
+def test_python_backend_matches_hermit(sensor_model):
+    _, classes = sensor_model()
+    matrix = reasoner.check_compatibility_matrix(classes, reasoner=PythonBackend(fallback=None))
+
+    assert matrix == reasoner.check_compatibility_matrix(classes, reasoner="hermit")
+    assert matrix.incompatible_pairs() == [
+        ("Thermometer", "Hygrometer"), ("Hygrometer", "DualSensor"), ("SingleSensor", "DualSensor"),
+    ]
+
+
+def test_backend_selected_per_ontology(monkeypatch, sensor_model):
+    _, (Thermometer, Hygrometer, _, _) = sensor_model("python")
+
+    def fail(self, ontology, classes=None, deadline=None):
+        raise AssertionError("HermiT should not run")
+    monkeypatch.setattr(HermitBackend, "run", fail)
+
+    assert not reasoner.check_compatibility(Thermometer, Hygrometer)
+    with pytest.raises(AssertionError):
+        reasoner.check_compatibility(Thermometer, Hygrometer, reasoner="hermit")
+
+
+def test_unsupported_construct_falls_back_to_hermit(sensor_model):
+    model, (Thermometer, Hygrometer, _, _) = sensor_model()
+    with model.owl_ontology:
+        Thermometer.owl_cls.equivalent_to.append(Hygrometer.owl_cls | model.observable.owl_cls)
+
+    with pytest.raises(UnsupportedConstruct):
+        FragmentReasoner(model.world)
+    assert reasoner.check_compatibility(Thermometer, Thermometer, reasoner="python")
+
+
+def test_fragment_reasoner_follows_cycles():
+    model = Ontology("http://example.org/test_backends_cycle.owl", world=owl.World())
+    parent = model.define_object_property("parent")
+    Node = model.define_class("Node")
+    Node.add_exactly_cardinality(parent, 1, Node.owl_cls)
+    Leaf = model.define_class("Leaf", parent=Node)
+    Leaf.add_only(parent, Leaf.owl_cls)
+    Root = model.define_class("Root", parent=Node)
+    Root.add_max_cardinality(parent, 0)
+
+    assert FragmentReasoner(model.world).unsatisfiable([Node.owl_cls, Leaf.owl_cls, Root.owl_cls]) == [Root.owl_cls]
+
+
+def test_get_backend():
+    assert isinstance(get_backend(None), HermitBackend)
+    assert isinstance(get_backend("python"), PythonBackend)
+    assert isinstance(get_backend("daemon"), DaemonBackend)
+    with pytest.raises(ValueError):
+        get_backend("fact++")
+
+
+def test_daemon_backend_by_name_without_a_daemon(monkeypatch, sensor_model):
+    monkeypatch.setattr(backends, "shared_daemon", lambda: None)
+    _, (Thermometer, Hygrometer, _, _) = sensor_model()
+
+    # falls back to a one-shot HermiT run; the planner prices it with the daemon's costs
+    assert not reasoner.check_compatibility(Thermometer, Hygrometer, reasoner="daemon")
+    plan = reasoner.plan_compatibility(Thermometer, Hygrometer, reasoner="daemon")
+    assert {step.backend for step in plan.steps} - {None} == {"daemon"}
@@ -0,0 +1,107 @@
+import owlready2 as owl
+
+from pydmsd.ontology import reasoner
+from pydmsd.ontology import cache as verdict_cache
+from pydmsd.ontology.cache import VerdictCache, class_fingerprint, verdict_key
+
+
+def test_cached_verdict_skips_reasoner(tmp_path, monkeypatch, vehicle_model):
+    _, _, _, (CarMessage, MotorcycleMessage) = vehicle_model()
+
+    with VerdictCache(tmp_path / "verdicts.sqlite3") as cache:
+        assert not reasoner.check_compatibility(CarMessage, MotorcycleMessage, cache=cache)
+        explanation = reasoner.explain_incompatibilities(CarMessage, MotorcycleMessage, cache=cache)
+
+    def fail(ontology):
+        raise AssertionError("reasoner should not run on a cache hit")
+    monkeypatch.setattr(reasoner, "run_reasoner", fail)
+
+    with VerdictCache(tmp_path / "verdicts.sqlite3") as cache:
+        assert not reasoner.check_compatibility(CarMessage, MotorcycleMessage, cache=cache)
+        assert reasoner.explain_incompatibilities(CarMessage, MotorcycleMessage, cache=cache) == explanation
+        assert reasoner.decide_compatibility(CarMessage, MotorcycleMessage, cache=cache).tier == reasoner.DecisionTier.CACHED
+
+
+def test_fingerprint_tracks_relevant_axioms(vehicle_model):
+    model, Pressure, tire_pressure, (CarMessage, MotorcycleMessage) = vehicle_model()
+    Speed = model.define_observable("Speed")
+    before = class_fingerprint(CarMessage)
+    unrelated = class_fingerprint(MotorcycleMessage)
+
+    # a change to the range of a restricted property changes the fingerprint
+    Speed.add_disjoint_class(Pressure)
+    assert class_fingerprint(CarMessage) != before
+    before = class_fingerprint(CarMessage)
+
+    CarMessage.add_max_cardinality(tire_pressure, 5)
+    assert class_fingerprint(CarMessage) != before
+    assert class_fingerprint(MotorcycleMessage) != unrelated  # shares the property, so it also sees the disjointness
+    assert class_fingerprint(model.define_class("Unrelated")) != class_fingerprint(model.define_class("Unrelated2"))
+
+
+def test_fingerprint_covers_defined_classes_and_pairs_share_a_key(tmp_path, vehicle_model):
+    model, _, tire_pressure, (CarMessage, MotorcycleMessage) = vehicle_model()
+    with model.owl_ontology:
+        Wheeled = owl.types.new_class("Wheeled", (owl.Thing,))
+        Wheeled.equivalent_to.append(tire_pressure.min(1))
+    before = class_fingerprint(CarMessage)
+
+    # nothing refers to Wheeled, but every class with a tire pressure is now unsatisfiable through it
+    with model.owl_ontology:
+        Wheeled.is_a.append(owl.Nothing)
+    assert class_fingerprint(CarMessage) != before
+
+    with VerdictCache(tmp_path / "verdicts.sqlite3") as cache:
+        assert not reasoner.check_compatibility(CarMessage, MotorcycleMessage, cache=cache)
+        assert len(cache) == 1
+        assert cache.get(*verdict_key(MotorcycleMessage, CarMessage)).is_compatible is False
+
+
+def test_eviction_and_invalidation(tmp_path):
+    path = tmp_path / "verdicts.sqlite3"
+    with VerdictCache(path, max_entries=2, environment="v1") as cache:
+        cache.put_verdict("a", "b", True)
+        cache.put_verdict("a", "c", False)
+        cache.get("a", "b")
+        cache.put_verdict("b", "c", True)
+        assert len(cache) == 2
+        assert cache.get("a", "c") is None
+        assert cache.get("a", "b").is_compatible
+
+    with VerdictCache(path, environment="v1") as cache:
+        assert len(cache) == 2
+
+    with VerdictCache(path, environment="v2") as cache:
+        assert len(cache) == 0
+
+
+def test_lookups_and_inserts_below_the_limit_only_write_the_entry(tmp_path):
+    with VerdictCache(tmp_path / "verdicts.sqlite3", max_entries=3, environment="v1") as cache:
+        statements = []
+        cache._connection.set_trace_callback(statements.append)
+        cache.put_verdict("a", "b", True)
+        cache.put_verdict("a", "c", False)
+        for _ in range(10):
+            assert cache.get("a", "b").is_compatible
+        assert not any(s.startswith(("DELETE", "UPDATE")) for s in statements)
+
+        cache.put_verdict("b", "c", True)
+        cache.put_verdict("c", "d", True)
+        assert len(cache) == 3
+        assert cache.get("a", "c") is None  # the recorded lookups of (a, b) were written before evicting
+        assert cache.get("a", "b").is_compatible
+
+
+def test_environment_covers_every_deciding_module(tmp_path, monkeypatch):
+    package = tmp_path / "ontology"
+    package.mkdir()
+    for name in verdict_cache.VERDICT_MODULES:
+        (package / f"{name}.py").write_text(f"# {name}\n")
+    monkeypatch.setattr(verdict_cache, "__file__", str(package / "cache.py"))
+    before = verdict_cache.environment_fingerprint()
+
+    # e.g. a change to how the in-process reasoner or the intersection classes work
+    for name in ("pyreasoner", "types"):
+        (package / f"{name}.py").write_text("# changed\n")
+        assert verdict_cache.environment_fingerprint() != before
+        before = verdict_cache.environment_fingerprint()
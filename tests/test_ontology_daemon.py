@@ -0,0 +1,83 @@
+import functools
+
+import pytest
+
+from pydmsd.ontology.types import Cardinality
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.budget import ReasonerTimeout
+from pydmsd.ontology.daemon import DaemonUnavailable, ReasonerDaemon
+
+pytest.importorskip("jpype")
+
+
+@pytest.fixture(scope="module")
+def daemon():
+    try:
+        daemon = ReasonerDaemon()
+    except DaemonUnavailable as e:
+        pytest.skip(str(e))
+    yield daemon
+    daemon.close()
+
+
+@pytest.fixture
+def aircraft_model(message_model):
+    """Factory for a `message_model` of aircraft messages with different numbers of altitudes."""
+    return functools.partial(
+        message_model, "Altitude", "altitude",
+        FixedWingMessage=Cardinality(1, 1), BalloonMessage=Cardinality(2, 2), GliderMessage=Cardinality(1),
+    )
+
+
+def test_daemon_matches_one_shot_reasoner(daemon, aircraft_model):
+    _, _, _, classes = aircraft_model()
+
+    assert reasoner.check_compatibility_matrix(classes, reasoner=daemon) == reasoner.check_compatibility_matrix(classes)
+
+
+def test_daemon_follows_model_changes(daemon, aircraft_model):
+    model, _, altitude, (FixedWingMessage, BalloonMessage, _) = aircraft_model()
+    assert not reasoner.check_compatibility(FixedWingMessage, BalloonMessage, reasoner=daemon)
+
+    # only the changed triples are sent, and the removed restriction must no longer count
+    BalloonMessage.owl_cls.is_a.remove(altitude.exactly(2))
+    BalloonMessage.add_max_cardinality(altitude, 3)
+    assert reasoner.check_compatibility(FixedWingMessage, BalloonMessage, reasoner=daemon)
+
+
+def test_daemon_reasons_over_scratch_ontologies(daemon, caplog, aircraft_model):
+    model, _, altitude, (FixedWingMessage, BalloonMessage, _) = aircraft_model()
+
+    # a scratch ontology imports its model, which the daemon must not try to load
+    with model.scratch() as scratch:
+        Both = scratch.define_class("Both", parent=FixedWingMessage)
+        Both.add_exactly_cardinality(altitude, 2)
+        satisfiable = daemon.is_satisfiable(scratch.world, [Both.owl_cls.iri, FixedWingMessage.owl_cls.iri])
+    assert satisfiable == {Both.owl_cls.iri: False, FixedWingMessage.owl_cls.iri: True}
+
+    with caplog.at_level("WARNING"):
+        assert not reasoner.check_compatibility(FixedWingMessage, BalloonMessage, reasoner=daemon)
+    assert "falling back" not in caplog.text
+
+
+def test_falls_back_when_daemon_dies(aircraft_model):
+    try:
+        daemon = ReasonerDaemon()
+    except DaemonUnavailable as e:
+        pytest.skip(str(e))
+    _, _, _, (FixedWingMessage, BalloonMessage, _) = aircraft_model()
+    daemon.close()
+
+    assert not reasoner.check_compatibility(FixedWingMessage, BalloonMessage, reasoner=daemon)
+
+
+def test_timeout_stops_daemon_without_fallback(aircraft_model):
+    try:
+        daemon = ReasonerDaemon()
+    except DaemonUnavailable as e:
+        pytest.skip(str(e))
+    _, _, _, (FixedWingMessage, BalloonMessage, _) = aircraft_model()
+
+    with pytest.raises(ReasonerTimeout):
+        reasoner.check_compatibility(FixedWingMessage, BalloonMessage, reasoner=daemon, timeout=0.005)
+    daemon.close()
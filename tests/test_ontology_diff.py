@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.diff import diff_models, recheck
+from pydmsd.ontology.reasoner import CompatibilityMatrix, DecisionTier, check_compatibility_matrix
+from pydmsd.ontology.types import Cardinality
+
+
+@pytest.fixture
+def vehicle_versions(message_model):
+    """Factory for the successive versions of a vehicle model, with the same IRI so they can be diffed."""
+    def build(version):
+        model, _, speed, (Vehicle,) = message_model(
+            "Speed", "speed", iri="http://example.org/test_diff.owl", Vehicle=Cardinality(0, 1),
+        )
+        Heading = model.define_observable("Heading")
+        heading = model.define_object_property("heading", range_=Heading)
+        Car = model.define_class("Car", parent=Vehicle)
+        Car.add_min_cardinality(speed, 1)
+        Truck = model.define_class("Truck", parent=Vehicle)
+        Compass = model.define_class("Compass")
+        Compass.add_min_cardinality(heading, 1)
+        Radar = model.define_class("Radar")
+        Radar.add_max_cardinality(heading, 1)
+        classes = [Vehicle, Car, Truck, Compass, Radar]
+        if version == 2:
+            # one field added to the base class
+            Vehicle.add_min_cardinality(heading, 1)
+        if version == 3:
+            Boat = model.define_class("Boat")
+            Boat.add_max_cardinality(heading, 0)
+            classes.append(Boat)
+        return model, classes
+
+    return build
+
+
+def test_diff_finds_direct_and_inherited_changes(vehicle_versions):
+    v1, _ = vehicle_versions(1)
+    v2, _ = vehicle_versions(2)
+    v3, _ = vehicle_versions(3)
+
+    diff = diff_models(v1, v2)
+    assert diff.modified == {"Vehicle"}
+    assert diff.inherited == {"Car", "Truck"}
+    assert not diff.added and not diff.removed
+    assert not diff_models(v1, vehicle_versions(1)[0])
+
+    diff = diff_models(v1, v3)
+    assert diff.added == {"Boat"}
+    assert diff.changed == {"Boat"}
+
+
+def test_recheck_only_decides_changed_pairs(monkeypatch, vehicle_versions):
+    v1, classes1 = vehicle_versions(1)
+    v2, classes2 = vehicle_versions(2)
+    previous = CompatibilityMatrix.from_dict(json.loads(json.dumps(check_compatibility_matrix(classes1).as_dict())))
+
+    runs = []
+    run_reasoner = reasoner.run_reasoner
+    monkeypatch.setattr(reasoner, "run_reasoner", lambda *args, **kwargs: runs.append(args) or run_reasoner(*args, **kwargs))
+    result = recheck(classes2, diff_models(v1, v2), previous)
+
+    assert len(runs) == 1
+    assert all({"Vehicle", "Car", "Truck"} & set(pair) for pair in result.rechecked)
+    assert ("Compass", "Radar") not in result.rechecked
+    assert result.matrix.tier("Compass", "Radar") == DecisionTier.CACHED
+    assert result.matrix.values == check_compatibility_matrix(classes2).values
+    assert not previous["Vehicle", "Compass"] and result.matrix["Vehicle", "Compass"]
+    assert set(result.explanations) == set(result.matrix.incompatible_pairs())
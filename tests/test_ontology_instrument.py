@@ -0,0 +1,37 @@
+import json
+import logging
+
+from pydmsd.ontology import instrument, reasoner
+
+
+def test_stats_separate_model_construction_from_reasoning(vehicle_model):
+    with instrument.collect() as stats:
+        _, _, _, (CarMessage, MotorcycleMessage) = vehicle_model()
+        assert not reasoner.check_compatibility(CarMessage, MotorcycleMessage)
+
+    assert not instrument.enabled()
+    assert stats["model.define_class"].count >= 3  # including the intersection class
+    assert stats["model.add_exactly_cardinality"].count == 2
+    assert stats["intersection.build"].count == 1
+    assert stats["intersection.destroy"].count == 1
+    run = stats["reasoner.run"]
+    assert run.count == 1 and run.totals["classes"] >= 3 and run.totals["restrictions"] >= 2
+    # HermiT's time splits into the JVM and owlready2's handling of its input and output
+    assert 0 < stats["reasoner.jvm"].seconds <= run.seconds
+    assert stats["reasoner.jvm"].seconds + stats["reasoner.parse"].seconds <= run.seconds
+    assert "reasoner.run" in str(stats)
+
+
+def test_logging_and_trace_file_sinks(tmp_path, caplog, vehicle_model):
+    trace = instrument.TraceFile(tmp_path / "trace.json")
+    with caplog.at_level(logging.DEBUG, logger="pydmsd"):
+        with instrument.sink(instrument.LoggingSink()), instrument.sink(trace):
+            _, _, _, (CarMessage, MotorcycleMessage) = vehicle_model()
+            reasoner.check_compatibility(CarMessage, MotorcycleMessage, reasoner="python")
+    trace.close()
+
+    assert any(record.getMessage().startswith("reasoner.run took") for record in caplog.records)
+    events = json.loads((tmp_path / "trace.json").read_text())
+    run = next(event for event in events if event["name"] == "reasoner.run")
+    assert run["ph"] == "X" and run["args"]["backend"] == "python"
+    assert not any(event["name"] == "reasoner.jvm" for event in events)
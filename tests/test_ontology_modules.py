@@ -0,0 +1,66 @@
+import gc
+
+import owlready2 as owl
+import pytest
+
+from pydmsd.face.types import FaceDataModel
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.modules import extract_module
+
+
+@pytest.fixture
+def helicopter_model(new_ontology):
+    """Helicopters whose rotor speeds are measured in disjoint units, among unrelated entities."""
+    model = FaceDataModel(new_ontology())
+
+    Helicopter = model.create_entity("Helicopter")
+    RotorSpeed = model.create_observable("RotorSpeed")
+    rotorSpeed = Helicopter.create_characteristic(name="rotorSpeed", lower_bound=1, upper_bound=1, value_type=RotorSpeed)
+    Helicopter_A = Helicopter.create_specialization("Helicopter_A")
+    Helicopter_B = Helicopter.create_specialization("Helicopter_B")
+
+    Hertz = model.create_unit("Hertz")
+    RotationsPerMinute = model.create_unit("RotationsPerMinute")
+    Hertz.ontology_class.add_disjoint_class(RotationsPerMinute.ontology_class)
+    RotorSpeedHertz = model.create_measurement_system("RotorSpeedHertz", observable=RotorSpeed, unit=Hertz)
+    RotorSpeedRPM = model.create_measurement_system("RotorSpeedRPM", observable=RotorSpeed, unit=RotationsPerMinute)
+    Helicopter_A.ontology_class.add_only(rotorSpeed, RotorSpeedHertz.owl_cls)
+    Helicopter_B.ontology_class.add_only(rotorSpeed, RotorSpeedRPM.owl_cls)
+
+    for i in range(20):
+        model.create_entity(f"Unrelated_{i}")
+
+    return model, Helicopter_A, Helicopter_B
+
+
+def test_module_contains_only_relevant_entities(helicopter_model):
+    model, Helicopter_A, Helicopter_B = helicopter_model
+
+    with extract_module([Helicopter_A.ontology_class, Helicopter_B.ontology_class]) as module:
+        names = {owl_cls.name for owl_cls in module.ontology.owl_ontology.classes()}
+        assert module.ontology.world is not model.ontology.world
+
+    assert {"Helicopter_A", "Helicopter_B", "Helicopter", "RotorSpeedRPM", "Hertz", "RotationsPerMinute"} <= names
+    assert not any(name.startswith("Unrelated") for name in names)
+
+
+def test_module_reasoning_matches_full_reasoning(helicopter_model):
+    model, Helicopter_A, Helicopter_B = helicopter_model
+
+    assert not reasoner.check_compatibility(Helicopter_A, Helicopter_B, module=True)
+    assert not reasoner.check_compatibility(Helicopter_A, Helicopter_B)
+    assert reasoner.check_compatibility(Helicopter_A, Helicopter_A, module=True)
+    # the model itself is never touched by module reasoning
+    assert model.ontology.owl_ontology.search_one(iri="*cwi_*") is None
+
+
+def test_module_worlds_are_released(helicopter_model):
+    model, Helicopter_A, Helicopter_B = helicopter_model
+    gc.collect()
+    worlds = len(owl.WORLDS)
+
+    for _ in range(3):
+        reasoner.check_compatibility(Helicopter_A, Helicopter_B, module=True)
+    reasoner.check_compatibility_matrix([Helicopter_A, Helicopter_B], module=True)
+    gc.collect()
+    assert len(owl.WORLDS) == worlds
@@ -0,0 +1,35 @@
+from pydmsd.ontology.types import Ontology
+from pydmsd.ontology import parallel, reasoner
+
+
+def test_parallel_matrix_matches_serial():
+    model = Ontology("http://example.org/test_parallel.owl")
+
+    Pressure = model.define_observable("Pressure")
+    tire_pressure = model.define_object_property("tirePressure", range_=Pressure)
+
+    CarMessage = model.define_class("CarMessage")
+    MotorcycleMessage = model.define_class("MotorcycleMessage")
+    VehicleMessage = model.define_class("VehicleMessage")
+    TrikeMessage = model.define_class("TrikeMessage", parent=VehicleMessage)
+    CarMessage.add_exactly_cardinality(tire_pressure, 4)
+    MotorcycleMessage.add_exactly_cardinality(tire_pressure, 2)
+    VehicleMessage.add_min_cardinality(tire_pressure, 2)
+    TrikeMessage.add_only(tire_pressure, Pressure.owl_cls)
+    classes = [CarMessage, MotorcycleMessage, VehicleMessage, TrikeMessage]
+
+    matrix = parallel.check_compatibility_matrix_parallel(classes, processes=2)
+
+    assert matrix == reasoner.check_compatibility_matrix(classes)
+    assert matrix.incompatible_pairs() == [("CarMessage", "MotorcycleMessage")]
+    assert parallel.check_compatibility_matrix_parallel(classes, processes=2, reasoner="python") == matrix
+
+
+def test_serialized_ontology_loads_into_private_world():
+    model = Ontology("http://example.org/test_serialize.owl")
+    model.define_class("Message")
+
+    copy = parallel.load_serialized_ontology(parallel.serialize_ontology(model), model.iri)
+
+    assert copy.world is not model.world
+    assert copy.get_class("Message").owl_cls is not model.get_class("Message").owl_cls
@@ -1,6 +1,20 @@
+import concurrent.futures
+import functools
+import time
+
+import owlready2 as owl
 import pytest
-from pydmsd.ontology.types import Cardinality
-from pydmsd.ontology.reasoner import _cardinalities_overlap
+from pydmsd.ontology import instrument, reasoner
+from pydmsd.ontology.budget import ReasonerTimeout
+from pydmsd.ontology.cache import VerdictCache, verdict_key
+from pydmsd.ontology.types import Cardinality, Ontology
+from pydmsd.ontology.reasoner import (
+    DecisionTier,
+    Verdict,
+    _cardinalities_overlap,
+    check_compatibility_matrix,
+    decide_compatibility,
+)
 
 
 @pytest.mark.parametrize(
@@ -40,3 +54,237 @@ from pydmsd.ontology.reasoner import _cardinalities_overlap
 )
 def test_cardinalities_overlap(card1: Cardinality, card2: Cardinality, expected: bool):
     assert _cardinalities_overlap(card1, card2) == expected
+
+
+@pytest.fixture
+def rotorcraft_model(message_model):
+    """Factory for a `message_model` whose RotorCraft needs at least one rotor speed."""
+    return functools.partial(message_model, "RotorSpeed", "rotorSpeed", qualified=True, RotorCraft=Cardinality(1))
+
+
+def test_structural_tier_cardinality_conflict(rotorcraft_model):
+    model, _, rotor_speed, (RotorCraft,) = rotorcraft_model()
+    Helicopter = model.define_class("Helicopter", parent=RotorCraft)
+    Quadrotor = model.define_class("Quadrotor", parent=RotorCraft)
+    Helicopter.add_exactly_cardinality(rotor_speed, 1)
+    Quadrotor.add_exactly_cardinality(rotor_speed, 4)
+
+    result = decide_compatibility(Helicopter, Quadrotor)
+    assert not result
+    assert result.tier == DecisionTier.STRUCTURAL
+    assert any("rotorSpeed" in reason for reason in result.reasons)
+
+
+def test_structural_tier_missing_required_property(rotorcraft_model):
+    model, RotorSpeed, _, (RotorCraft,) = rotorcraft_model()
+    Glider = model.define_class("Glider")
+
+    result = decide_compatibility(RotorCraft, Glider)
+    assert not result
+    assert result.tier == DecisionTier.STRUCTURAL
+
+
+def test_structural_tier_compatible(rotorcraft_model):
+    model, _, rotor_speed, (RotorCraft,) = rotorcraft_model()
+    Helicopter = model.define_class("Helicopter", parent=RotorCraft)
+    Helicopter.add_max_cardinality(rotor_speed, 2)
+
+    result = decide_compatibility(RotorCraft, Helicopter)
+    assert result
+    assert result.tier == DecisionTier.STRUCTURAL
+
+
+def test_structural_tier_defers_to_reasoner(rotorcraft_model):
+    model, RotorSpeed, rotor_speed, (RotorCraft,) = rotorcraft_model()
+    Helicopter = model.define_class("Helicopter", parent=RotorCraft)
+    Helicopter.add_only(rotor_speed, RotorSpeed.owl_cls)
+
+    result = decide_compatibility(RotorCraft, Helicopter)
+    assert result
+    assert result.tier == DecisionTier.REASONER
+
+    matrix = check_compatibility_matrix([RotorCraft, Helicopter], structural=True)
+    assert matrix[RotorCraft, Helicopter]
+    assert matrix.tier(RotorCraft, Helicopter) == DecisionTier.REASONER
+
+
+@pytest.mark.parametrize("backend", ["hermit", "python"])
+def test_timeout_gives_unknown_verdict(backend, rotorcraft_model):
+    model, RotorSpeed, rotor_speed, (RotorCraft,) = rotorcraft_model()
+    Helicopter = model.define_class("Helicopter", parent=RotorCraft)
+    Helicopter.add_only(rotor_speed, RotorSpeed.owl_cls)
+
+    with pytest.raises(ReasonerTimeout):
+        reasoner.check_compatibility(RotorCraft, Helicopter, reasoner=backend, timeout=1e-6)
+    assert not [c for c in model.owl_ontology.classes() if c.name.startswith("cwi_")]
+
+    result = decide_compatibility(RotorCraft, Helicopter, reasoner=backend, timeout=1e-6)
+    assert result.verdict == Verdict.UNKNOWN
+    assert result.is_compatible is None
+    assert any("did not finish" in reason for reason in result.reasons)
+    with pytest.raises(ValueError):
+        bool(result)
+
+    assert decide_compatibility(RotorCraft, Helicopter, reasoner=backend, timeout=60).verdict == Verdict.COMPATIBLE
+
+
+def test_concurrent_hermit_runs_keep_their_own_deadlines(rotorcraft_model):
+    pairs = []
+    for name in ("bounded", "unbounded"):
+        model, RotorSpeed, rotor_speed, (RotorCraft,) = rotorcraft_model()
+        Helicopter = model.define_class("Helicopter", parent=RotorCraft)
+        Helicopter.add_only(rotor_speed, RotorSpeed.owl_cls)
+        pairs.append((RotorCraft, Helicopter))
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        timed_out = pool.submit(decide_compatibility, *pairs[0], reasoner="hermit", timeout=0.5)
+        # start the other run while the bounded run's JVM is still starting, long before it times out
+        time.sleep(0.2)
+        finished = pool.submit(decide_compatibility, *pairs[1], reasoner="hermit")
+        assert timed_out.result().verdict == Verdict.UNKNOWN
+        assert finished.result().verdict == Verdict.COMPATIBLE
+
+
+def test_find_compatible_prunes_with_property_index(monkeypatch):
+    model = Ontology("http://example.org/test_find_compatible.owl", world=owl.World())
+    Position = model.define_observable("Position")
+    Velocity = model.define_observable("Velocity")
+    position = model.define_object_property("position", range_=Position)
+    velocity = model.define_object_property("velocity", range_=Velocity)
+    Track = model.define_class("Track")
+    Track.add_exactly_cardinality(position, 1)
+    Track.add_max_cardinality(velocity, 1)
+    PositionReport = model.define_class("PositionReport")
+    PositionReport.add_min_cardinality(position, 1)
+    PositionOnly = model.define_class("PositionOnly", parent=PositionReport)
+    DualPosition = model.define_class("DualPosition", parent=PositionReport)
+    DualPosition.add_min_cardinality(position, 2)
+    VelocityReport = model.define_class("VelocityReport")
+    VelocityReport.add_exactly_cardinality(velocity, 1)
+    Kinematics = model.define_class("Kinematics", parent=PositionReport)
+    Kinematics.add_exactly_cardinality(velocity, 1)
+    candidates = [PositionReport, PositionOnly, DualPosition, VelocityReport, Kinematics]
+
+    assert model.index.classes_restricting(velocity) == {
+        Track.owl_cls: Cardinality(0, 1),
+        VelocityReport.owl_cls: Cardinality(1, 1),
+        Kinematics.owl_cls: Cardinality(1, 1),
+    }
+    expected = [c for c in candidates if reasoner.check_compatibility(Track, c, reasoner="python")]
+
+    reasoned = []
+    reasoner_pass = reasoner._reasoner_pass
+    monkeypatch.setattr(reasoner, "_reasoner_pass", lambda classes, pairs, backend=None: (
+        reasoned.extend(classes[j].name for _, j in pairs) or reasoner_pass(classes, pairs, backend)
+    ))
+    assert reasoner.find_compatible(Track, candidates, reasoner="python") == expected
+    assert expected == [PositionReport, PositionOnly, Kinematics]
+    assert "VelocityReport" not in reasoned
+
+
+def test_find_compatible_sees_inherited_restrictions_of_loaded_models(tmp_path):
+    model = Ontology("http://example.org/test_find_compatible_loaded.owl")
+    Fix = model.define_observable("Fix")
+    fix = model.define_object_property("fix", range_=Fix)
+    Target = model.define_class("Target")
+    Target.add_min_cardinality(fix, 1)
+    Report = model.define_class("Report")
+    Report.add_min_cardinality(fix, 1)
+    model.define_class("FixReport", parent=Report)
+    model.save(str(tmp_path / "model.owl"))
+    model.close()
+
+    loaded = Ontology.load(tmp_path / "model.owl", reasoner="python")
+    Target, FixReport = loaded.get_class("Target"), loaded.get_class("FixReport")
+    # FixReport's restriction is inherited from a class that was never looked up
+    assert [c.name for c in reasoner.find_compatible(Target, [FixReport])] == ["FixReport"]
+    assert reasoner.check_compatibility(Target, FixReport)
+    loaded.close()
+
+
+def test_planner_picks_cheapest_sound_strategy(tmp_path, monkeypatch):
+    model = Ontology("http://example.org/test_planner.owl", world=owl.World())
+    Pressure = model.define_observable("Pressure")
+    tire_pressure = model.define_object_property("tirePressure", range_=Pressure)
+    CarMessage = model.define_class("CarMessage")
+    MotorcycleMessage = model.define_class("MotorcycleMessage")
+    VehicleMessage = model.define_class("VehicleMessage")
+    CarMessage.add_exactly_cardinality(tire_pressure, 4)
+    MotorcycleMessage.add_exactly_cardinality(tire_pressure, 2)
+    VehicleMessage.add_min_cardinality(tire_pressure, 1)
+    VehicleMessage.add_only(tire_pressure, Pressure.owl_cls)
+
+    # settled structurally, without running any reasoner
+    plan = reasoner.plan_compatibility(CarMessage, MotorcycleMessage)
+    assert plan.strategy == reasoner.Strategy.STRUCTURAL
+    monkeypatch.setattr(reasoner, "run_reasoner", lambda *args, **kwargs: pytest.fail("reasoner ran"))
+    assert plan.execute().tier == DecisionTier.STRUCTURAL
+    monkeypatch.undo()
+
+    # `only` needs a reasoner: the in-process one is cheapest unless a backend is chosen explicitly
+    plan = reasoner.plan_compatibility(CarMessage, VehicleMessage)
+    assert (plan.strategy, plan.chosen.backend) == (reasoner.Strategy.FULL, "python")
+    assert plan.features.quantified and plan.features.module_size < plan.features.ontology_size
+    assert plan.execute().is_compatible
+    plan = reasoner.plan_compatibility(CarMessage, VehicleMessage, reasoner="hermit")
+    assert (plan.strategy, plan.chosen.backend) == (reasoner.Strategy.MODULE, "hermit")
+    assert "structural" in reasoner.explain_plan(CarMessage, VehicleMessage)
+
+    with VerdictCache(tmp_path / "verdicts.sqlite3") as cache:
+        cache.put_verdict(*verdict_key(CarMessage, VehicleMessage), True)
+        plan = reasoner.plan_compatibility(CarMessage, VehicleMessage, cache=cache, reasoner="hermit")
+        assert plan.strategy == reasoner.Strategy.CACHED
+        assert plan.execute().tier == DecisionTier.CACHED
+
+
+def test_checks_never_change_the_model(rotorcraft_model):
+    model, RotorSpeed, rotor_speed, (RotorCraft,) = rotorcraft_model()
+    Helicopter = model.define_class("Helicopter", parent=RotorCraft)
+    Helicopter.add_only(rotor_speed, RotorSpeed.owl_cls)
+    Glider = model.define_class("Glider")
+    Glider.add_max_cardinality(rotor_speed, 0)
+    triples = sorted(model.owl_ontology.get_triples())
+    revision = model.revision
+
+    # the same pair from several threads: each check builds its intersection in its own scratch ontology
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        verdicts = list(pool.map(
+            lambda pair: reasoner.check_compatibility(*pair, reasoner="python"),
+            [(RotorCraft, Helicopter), (Helicopter, RotorCraft), (RotorCraft, Glider), (Glider, RotorCraft)],
+        ))
+    assert verdicts == [True, True, False, False]
+    assert check_compatibility_matrix([RotorCraft, Helicopter, Glider])[Helicopter, Glider] is False
+
+    assert sorted(model.owl_ontology.get_triples()) == triples
+    assert model.revision == revision
+    assert list(model.world.ontologies) == ["http://anonymous/", model.owl_ontology.base_iri]
+
+
+@pytest.mark.parametrize("backend", ["hermit", "python"])
+def test_find_unsatisfiable_classes_in_one_run(backend, rotorcraft_model):
+    model, RotorSpeed, rotor_speed, (RotorCraft,) = rotorcraft_model()
+    Drone = model.define_class("Drone", parent=RotorCraft)
+    Drone.add_max_cardinality(rotor_speed, 0)
+    QuadCopter = model.define_class("QuadCopter", parent=Drone)
+    Fixed = model.define_class("Fixed")
+    Rotating = model.define_class("Rotating")
+    model.declare_all_disjoint([Fixed, Rotating])
+    Gyro = model.define_class("Gyro", parent=Fixed)
+    Gyro.add_superclass(Rotating)
+    triples = sorted(model.owl_ontology.get_triples())
+
+    with instrument.collect() as stats:
+        found = reasoner.find_unsatisfiable_classes(model, reasoner=backend)
+    assert stats["reasoner.run"].count == 1
+
+    assert [result.name for result in found] == ["Drone", "Gyro", "QuadCopter"]
+    drone, gyro, quadcopter = found
+    assert drone.reasons == [
+        "Characteristic rotorSpeed has conflicting cardinality restrictions: "
+        "Drone requires min 1, but Drone requires max 0."
+    ]
+    assert drone.inherited_from == []
+    assert gyro.reasons == ["Fixed is explicitly declared disjoint with Rotating."]
+    assert quadcopter.inherited_from == ["Drone"]
+    assert "specializes unsatisfiable Drone" in str(quadcopter)
+    assert sorted(model.owl_ontology.get_triples()) == triples
+
@@ -0,0 +1,60 @@
+import owlready2 as owl
+import pytest
+
+from pydmsd.ontology.types import Cardinality, Ontology
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.session import CompatibilitySession
+
+
+@pytest.fixture
+def ship_model(message_model):
+    """A `message_model` of ship messages that need a heading, ferry messages specializing them, and buoy messages."""
+    model, _, heading, (ShipMessage, BuoyMessage) = message_model(
+        "Heading", "heading", ShipMessage=Cardinality(1), BuoyMessage=Cardinality(),
+    )
+    FerryMessage = model.define_class("FerryMessage", parent=ShipMessage)
+    return model, ShipMessage, FerryMessage, BuoyMessage, heading
+
+
+def test_session_classifies_once(monkeypatch, ship_model):
+    model, ShipMessage, FerryMessage, BuoyMessage, _ = ship_model
+    calls = []
+    run_reasoner = reasoner.run_reasoner
+    monkeypatch.setattr(reasoner, "run_reasoner", lambda *args, **kwargs: calls.append(args) or run_reasoner(*args, **kwargs))
+
+    with CompatibilitySession(model) as session:
+        session.register([(ShipMessage, FerryMessage), (ShipMessage, BuoyMessage)])
+        assert session.check_compatibility(ShipMessage, FerryMessage)
+        assert not session.check_compatibility(BuoyMessage, ShipMessage)
+        assert session.is_subclass(FerryMessage, ShipMessage)
+        assert not session.is_subclass(ShipMessage, FerryMessage)
+    assert len(calls) == session.runs == 1
+    assert model.owl_ontology.search_one(iri="*cwi_*") is None
+
+
+def test_session_invalidated_by_mutation(ship_model):
+    model, ShipMessage, FerryMessage, _, heading = ship_model
+
+    with CompatibilitySession(model, reasoner="python") as session:
+        assert session.check_compatibility(ShipMessage, FerryMessage)
+        assert not session.stale
+        FerryMessage.add_max_cardinality(heading, 0)
+        assert session.stale
+        assert not session.check_compatibility(ShipMessage, FerryMessage)
+        assert not session.check_compatibility(ShipMessage, FerryMessage)
+    assert session.runs == 2
+
+
+def test_session_decides_model_classes_with_python_backend():
+    model = Ontology("http://example.org/test_session_python_unsatisfiable.owl", world=owl.World())
+    prop = model.define_object_property("prop")
+    Broken = model.define_class("Broken")
+    Broken.add_min_cardinality(prop, 2)
+    Broken.add_max_cardinality(prop, 1)
+    Fine = model.define_class("Fine")
+
+    with CompatibilitySession(model, reasoner="python") as session:
+        assert not session.check_compatibility(Broken, Broken)
+        assert not session.is_satisfiable(Broken)
+        assert session.is_satisfiable(Fine)
+        assert not session.check_compatibility(Broken, Fine)
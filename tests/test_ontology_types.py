@@ -1,3 +1,13 @@
+import gc
+import weakref
+
+import owlready2 as owl
+import pytest
+
+from pydmsd.face.types import FaceDataModel
+from pydmsd.fhir.fhir_types import FhirDataModel
+from pydmsd.ontology import reasoner
+from pydmsd.ontology.diff import diff_models
 from pydmsd.ontology.types import Ontology, Cardinality
 
 
@@ -15,3 +25,180 @@ def test_ontology_class():
 
     dp_a_duplicate = ontology.define_data_property(name="DataProperty_A")
     assert dp_a == dp_a_duplicate
+
+
+def test_cardinalities_combine_min_and_max():
+    ontology = Ontology("http://example.org/test_cardinalities.owl")
+    cls_a = ontology.define_class("Class_A")
+    cls_b = ontology.define_class(name="Class_B", parent=cls_a)
+    prop = ontology.define_object_property(name="prop_A")
+    cls_a.add_min_cardinality(prop, 1)
+    cls_a.add_max_cardinality(prop, 3)
+    cls_b.add_exactly_cardinality(prop, 2)
+
+    assert cls_a.cardinalities == {prop: Cardinality(1, 3)}
+    assert cls_b.cardinalities == {prop: Cardinality(2, 2)}
+
+
+def test_cardinalities_follow_later_changes():
+    ontology = Ontology("http://example.org/test_restriction_index.owl")
+    cls_a = ontology.define_class("Class_A")
+    cls_b = ontology.define_class(name="Class_B", parent=cls_a)
+    cls_c = ontology.define_class("Class_C")
+    prop = ontology.define_object_property(name="prop_A")
+    assert cls_b.cardinalities == {}
+
+    cls_a.add_min_cardinality(prop, 1)
+    assert cls_b.required_properties == {prop}
+
+    cls_c.add_max_cardinality(prop, 2)
+    cls_b.add_superclass(cls_c)
+    assert cls_b.cardinalities == {prop: Cardinality(1, 2)}
+    assert ontology.get_class("Class_B").cardinalities == {prop: Cardinality(1, 2)}
+    assert cls_a.cardinalities == {prop: Cardinality(1, None)}
+
+
+def test_ontologies_do_not_share_classes():
+    first = Ontology()
+    second = Ontology()
+    first_message = first.define_class("Message")
+    second_message = second.define_class("Message")
+    first_message.add_min_cardinality(first.has_unit, 1)
+
+    assert first.world is not second.world
+    assert first_message.owl_cls is not second_message.owl_cls
+    assert second_message.cardinalities == {}
+    with pytest.raises(ValueError):
+        reasoner.check_compatibility(first_message, second_message)
+
+
+def test_file_backed_ontology(tmp_path):
+    filename = str(tmp_path / "model.sqlite3")
+    ontology = Ontology("http://example.org/test_file_backed.owl", filename=filename)
+    ontology.define_class("Message")
+    ontology.close()
+
+    world = owl.World(filename=filename)
+    assert world["http://example.org/test_file_backed.owl#Message"] is not None
+    world.close()
+
+
+def test_closing_a_data_model_releases_its_world():
+    worlds = []
+    for model_type in (FaceDataModel, FhirDataModel):
+        with model_type() as model:
+            model.ontology.define_class("Message")
+            worlds.append(weakref.ref(model.ontology.world))
+        del model
+    gc.collect()
+    assert all(world() is None for world in worlds)
+
+
+def test_load_rdfxml(tmp_path):
+    ontology = Ontology("http://example.org/test_load.owl")
+    message = ontology.define_class("Message")
+    message.add_exactly_cardinality(ontology.has_unit, 1)
+    ontology.save(str(tmp_path / "model.owl"))
+
+    loaded = Ontology.load(tmp_path / "model.owl")
+    assert loaded.iri == ontology.iri
+    assert loaded.revision == 0  # core classes were wrapped, not redefined
+    assert [cls.name for cls in loaded.value_types] == [cls.name for cls in ontology.value_types]
+    assert loaded.get_class("Message").required_properties == {loaded.has_unit}
+
+
+def test_snapshot_round_trip(tmp_path):
+    ontology = Ontology("http://example.org/test_snapshot.owl", reasoner="python")
+    ontology.define_observable("Speed")
+    ontology.define_class("Message").add_min_cardinality(ontology.has_unit, 1, ontology.unit.owl_cls)
+    ontology.save_snapshot(tmp_path / "model.sqlite3")
+
+    restored = Ontology.load_snapshot(tmp_path / "model.sqlite3")
+    assert restored.reasoner == "python"
+    assert restored.unit.owl_cls.iri == ontology.unit.owl_cls.iri
+    assert restored.get_class("Speed").owl_cls in restored.observable.owl_cls.subclasses()
+    assert restored.get_class("Message").cardinalities == {restored.has_unit: Cardinality(1, None)}
+
+    # changes go to a private working copy, not to the snapshot
+    restored.define_class("Draft")
+    restored.close()
+    reopened = Ontology.load_snapshot(tmp_path / "model.sqlite3")
+    assert reopened.owl_ontology["Draft"] is None
+    reopened.close()
+
+
+def test_scratch_ontology_leaves_model_unchanged():
+    ontology = Ontology("http://example.org/test_scratch.owl", world=owl.World())
+    Speed = ontology.define_observable("Speed")
+    speed = ontology.define_object_property("speed", range_=Speed)
+    Vehicle = ontology.define_class("Vehicle")
+    Vehicle.add_min_cardinality(speed, 1, Speed.owl_cls)
+    Moving = ontology.define_class("Moving")
+    Moving.owl_cls.equivalent_to.append(speed.some(Speed.owl_cls))
+    triples = sorted(ontology.owl_ontology.get_triples())
+    revision = ontology.revision
+
+    with ontology.scratch() as scratch:
+        Car = scratch.define_class("Car", parent=Vehicle)
+        Car.add_max_cardinality(speed, 0)
+        reasoner.run_reasoner(scratch, "hermit")
+        assert owl.Nothing in Car.owl_cls.equivalent_to
+        assert Moving.owl_cls in Vehicle.owl_cls.is_a  # inferred, recorded in the scratch ontology
+        assert Car.cardinalities == {speed: Cardinality(1, 0)}
+
+    assert sorted(ontology.owl_ontology.get_triples()) == triples
+    assert ontology.revision == revision
+    assert Moving.owl_cls not in Vehicle.owl_cls.is_a
+    assert ontology.world.search_one(iri="*Car") is None
+
+
+def _build_vehicle(ontology):
+    speed = ontology.define_object_property("speed", range_=ontology.define_observable("Speed"))
+    weight = ontology.define_data_property("weight", range_=int)
+    vehicle = ontology.define_class("Vehicle")
+    vehicle.add_max_cardinality(speed, 1)
+    vehicle.add_exactly_cardinality(weight, 1)
+    car = ontology.define_class("Car", parent=vehicle)
+    car.add_min_cardinality(speed, 2)
+    assert car.cardinalities == {speed: Cardinality(2, 1), weight: Cardinality(1, 1)}
+    truck = ontology.define_class("Truck")
+    ontology.declare_all_disjoint([car, truck])
+    truck.add_superclass(vehicle)
+    truck.add_only(speed, ontology.observable.owl_cls)
+    return vehicle, car, truck
+
+
+def test_batch_builds_the_same_model():
+    iri = "http://example.org/test_batch.owl"
+    expected = Ontology(iri)
+    _build_vehicle(expected)
+
+    ontology = Ontology(iri)
+    with ontology.batch():
+        vehicle, car, truck = _build_vehicle(ontology)
+        with ontology.batch():
+            assert ontology.define_class("Vehicle").owl_cls is vehicle.owl_cls
+        # queued, so only the restriction index sees them yet
+        assert truck.owl_cls.is_a == [owl.Thing]
+        assert truck.cardinalities[ontology.owl_ontology["speed"]] == Cardinality(0, 1)
+
+    assert not diff_models(expected, ontology)
+    count = "SELECT COUNT(*) FROM {} WHERE c=?"
+    for table in ("objs", "datas"):
+        assert (ontology.world.graph.execute(count.format(table), (ontology.owl_ontology.graph.c,)).fetchone()
+                == expected.world.graph.execute(count.format(table), (expected.owl_ontology.graph.c,)).fetchone())
+    assert not reasoner.check_compatibility(car, ontology.define_class("Vehicle"), reasoner="python")
+    # later changes are written straight away again
+    assert ontology.owl_ontology._add_obj_triple_raw_spo == ontology.owl_ontology.graph._add_obj_triple_raw_spo
+
+
+def test_batch_writes_what_was_built_before_an_error():
+    ontology = Ontology("http://example.org/test_batch_error.owl")
+    prop = ontology.define_object_property("prop")
+    with pytest.raises(RuntimeError):
+        with ontology.batch():
+            cls = ontology.define_class("Built")
+            cls.add_min_cardinality(prop, 1)
+            raise RuntimeError
+    assert ontology.owl_ontology["Built"] is cls.owl_cls
+    assert len(cls.owl_cls.is_a) == 2